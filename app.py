@@ -1,9 +1,13 @@
+import threading
+
 from flask import Flask, current_app, session, request, redirect, url_for
 from flask_login import LoginManager
 from pymongo import MongoClient
 from cryptography.fernet import Fernet
 
 from config import Config
+from services.metrics import MongoCommandMetrics
+from services.profiler import SlowCommandLogger, init_profiling
 from translations import get_text
 
 login_manager = LoginManager()
@@ -27,28 +31,17 @@ def create_app():
     app.config.from_object(Config)
 
     # MongoDB
-    mongo_client = MongoClient(app.config['MONGO_URI'], serverSelectionTimeoutMS=5000)
+    mongo_client = MongoClient(app.config['MONGO_URI'], serverSelectionTimeoutMS=5000,
+                               event_listeners=[MongoCommandMetrics(), SlowCommandLogger()])
     db = mongo_client[app.config['MONGO_DB']]
 
     # Store on app so it survives debug reloader
     app.extensions['mongo_client'] = mongo_client
     app.extensions['mongo_db'] = db
 
-    # Create indexes (deferred - only runs when MongoDB is available)
-    def _ensure_indexes():
-        try:
-            db.users.create_index('username', unique=True)
-            db.projects.create_index('db_key', unique=True)
-            db.api_keys.create_index('provider')
-            db.keywords.create_index('project_id')
-            db.blog_titles.create_index('project_id')
-            db.ads_titles.create_index('project_id')
-            db.articles.create_index('project_id')
-            db.articles.create_index([('project_id', 1), ('is_published', 1)])
-        except Exception as e:
-            print(f"[WARN] Could not create indexes: {e}")
-
-    _ensure_indexes()
+    # Declared indexes, created off the startup path (see models/indexes.py)
+    from models.indexes import ensure_indexes
+    threading.Thread(target=ensure_indexes, args=(db,), name='lagos-indexes', daemon=True).start()
 
     # Fernet encryption for API keys
     fernet_key = app.config['FERNET_KEY']
@@ -74,6 +67,10 @@ def create_app():
     from routes.api_keys import api_keys_bp
     from routes.content import content_bp
     from routes.publishing import publishing_bp
+    from routes.metrics import metrics_bp
+    from routes.profiling import profiling_bp
+    from routes.api import api_bp
+    from routes.feeds import feeds_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
@@ -81,6 +78,13 @@ def create_app():
     app.register_blueprint(api_keys_bp, url_prefix='/api-keys')
     app.register_blueprint(content_bp, url_prefix='/content')
     app.register_blueprint(publishing_bp, url_prefix='/publishing')
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(profiling_bp, url_prefix='/profiling')
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    app.register_blueprint(feeds_bp, url_prefix='/feeds')
+
+    # On-demand request profiling (?_profile=cprofile|sample, admins only)
+    init_profiling(app)
 
     # Language context processor
     @app.context_processor
@@ -0,0 +1,259 @@
+"""Offline benchmark suite for the generation, assembly, stats and publishing paths.
+
+Runs against a local mongod (``BENCH_MONGO_URI``, database ``lagos_bench`` which is
+dropped first). Projects run in simulation mode: AI calls go to the simulated
+provider and WordPress posts to the bundled stub, both using ``--profile``
+(``instant`` by default, i.e. no latency or faults).
+
+    python -m benchmarks.run                      # run everything
+    python -m benchmarks.run --only assemble_html --only project_stats
+    python -m benchmarks.run --save-baseline      # write benchmarks/baseline.json
+    python -m benchmarks.run --compare            # exit 1 if a median regressed past --tolerance
+    python -m benchmarks.run --only pipeline --profile flaky --latency-scale 0.01
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def _measure(fn, repeat, items=1):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    median = statistics.median(samples)
+    return {
+        'median': median,
+        'min': min(samples),
+        'max': max(samples),
+        'repeat': repeat,
+        'items': items,
+        'items_per_sec': items / median if median else 0.0,
+    }
+
+
+class BenchContext:
+    def __init__(self, app, scale, profile):
+        self.app = app
+        self.db = app.extensions['mongo_db']
+        self.fernet = app.extensions['fernet']
+        self.scale = scale
+        self.profile = profile
+
+    def project(self, name):
+        from models.project import create_project, get_project
+        pid = create_project(self.db, {
+            'name': name,
+            'db_key': f'{name}-{time.monotonic_ns()}',
+            'company_name': 'شرکت نمونه',
+            'business_field': 'طراحی سایت',
+            'services_products': 'طراحی وب‌سایت، سئو، تولید محتوا',
+            'about_company': 'ارائه خدمات دیجیتال مارکتینگ',
+            'keyword': 'طراحی سایت-سئو-تولید محتوا',
+            'simulation': {'enabled': True, 'profile': self.profile},
+        })
+        return get_project(self.db, pid)
+
+    def generator(self):
+        from services.content_generator import ContentGenerator
+        return ContentGenerator(self.db, self.fernet)
+
+    def publisher(self):
+        from services.wordpress_publisher import WordPressPublisher
+        return WordPressPublisher(self.db)
+
+    def seed_supplementary(self, project):
+        gen = self.generator()
+        gen.generate_bein_paragraphs(project)
+        gen.generate_info_blocks(project)
+        gen.generate_bullet_items(project)
+
+    def seed_articles(self, project, count):
+        from models.content import add_blog_titles
+        add_blog_titles(self.db, str(project['_id']), [f'عنوان آزمایشی {i}' for i in range(count)], 'سئو')
+        gen = self.generator()
+        return [gen.generate_article(project) for _ in range(count)]
+
+
+@benchmark('startup')
+def bench_startup(ctx):
+    # Fresh interpreter each run: create_app must not wait on MongoDB or import provider SDKs
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, SCHEDULER_ENABLED='0')
+    command = [sys.executable, '-c', 'from app import create_app; create_app()']
+    return _measure(lambda: subprocess.run(command, cwd=root, env=env, check=True), repeat=5)
+
+
+@benchmark('pipeline')
+def bench_pipeline(ctx):
+    project = ctx.project('bench-pipeline')
+    gen = ctx.generator()
+
+    def run():
+        # run_full_pipeline logs and records failed steps instead of raising; a failed step must fail the run
+        failed = {step: result for step, result in gen.run_full_pipeline(project).items()
+                  if isinstance(result, str) and result.startswith('Error:')}
+        if failed:
+            raise RuntimeError(f"pipeline steps failed: {failed}")
+    return _measure(run, repeat=3)
+
+
+@benchmark('assemble_html')
+def bench_assemble_html(ctx):
+    from models.content import get_article
+    project = ctx.project('bench-assemble')
+    ctx.seed_supplementary(project)
+    article = get_article(ctx.db, ctx.seed_articles(project, 1)[0])
+    publisher = ctx.publisher()
+    calls = 100 * ctx.scale
+
+    def run():
+        for _ in range(calls):
+            publisher._assemble_html(article, project)
+    return _measure(run, repeat=5, items=calls)
+
+
+@benchmark('project_stats')
+def bench_project_stats(ctx):
+    from models.article_body import encode_body
+    from models.content import get_project_stats
+    project = ctx.project('bench-stats')
+    pid = str(project['_id'])
+    now = datetime.now(timezone.utc)
+    n = 10000 * ctx.scale
+    ctx.db.keywords.insert_many([{'project_id': pid, 'text': f'kw {i}', 'is_title_generated': i % 3 == 0,
+                                  'created_at': now} for i in range(n)])
+    ctx.db.blog_titles.insert_many([{'project_id': pid, 'content': f'title {i}', 'keyword': f'kw {i}',
+                                     'is_article_generated': i % 2 == 0, 'created_at': now} for i in range(n // 2)])
+    ctx.db.articles.insert_many([{'project_id': pid, 'article_title': f'article {i}', **encode_body([]),
+                                  'is_published': i % 4 == 0, 'created_at': now} for i in range(n // 5)])
+    return _measure(lambda: get_project_stats(ctx.db, pid), repeat=20)
+
+
+@benchmark('dashboard')
+def bench_dashboard(ctx):
+    from models.user import User
+    for i in range(5):
+        ctx.seed_supplementary(ctx.project(f'bench-dashboard-{i}'))
+    User.create(ctx.db, 'bench', 'bench')
+    client = ctx.app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    def run():
+        response = client.get('/')
+        assert response.status_code == 200, response.status_code
+    return _measure(run, repeat=20)
+
+
+@benchmark('bulk_publish')
+def bench_bulk_publish(ctx):
+    project = ctx.project('bench-publish')
+    ctx.seed_supplementary(project)
+    count = 20 * ctx.scale
+    ctx.seed_articles(project, count)
+    publisher = ctx.publisher()
+
+    def run():
+        while publisher.publish_article(project):
+            pass
+    return _measure(run, repeat=1, items=count)
+
+
+def _print_results(results, baseline=None):
+    print(f"{'benchmark':<16}{'median':>12}{'items/s':>14}{'vs baseline':>14}")
+    for name, r in results.items():
+        delta = ''
+        if baseline and name in baseline:
+            delta = f"{(r['median'] / baseline[name]['median'] - 1) * 100:+.1f}%"
+        print(f"{name:<16}{r['median'] * 1000:>10.2f}ms{r['items_per_sec']:>14.1f}{delta:>14}")
+
+
+def _regressions(results, baseline, tolerance):
+    return [name for name, r in results.items()
+            if name in baseline and r['median'] > baseline[name]['median'] * (1 + tolerance)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS), help='run only these benchmarks')
+    parser.add_argument('--scale', type=int, default=1, help='multiply dataset sizes')
+    parser.add_argument('--profile', default='instant', help='simulator fault profile (name or name:seed)')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='multiply simulated latencies')
+    parser.add_argument('--save-baseline', action='store_true', help=f'write results to {BASELINE_PATH}')
+    parser.add_argument('--compare', action='store_true', help='compare against the stored baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed median slowdown (0.2 = 20%%)')
+    parser.add_argument('--output', help='also write results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    from cryptography.fernet import Fernet
+    os.environ['MONGO_URI'] = os.getenv('BENCH_MONGO_URI', 'mongodb://localhost:27017/')
+    os.environ['MONGO_DB'] = 'lagos_bench'
+    os.environ['SCHEDULER_ENABLED'] = '0'
+    os.environ.setdefault('FERNET_KEY', Fernet.generate_key().decode())
+
+    from models.api_key import create_api_key
+    from services.simulation.http_stub import get_simulator
+
+    with ExitStack() as stack:
+        from services.simulation.provider import SimulatedProvider
+        SimulatedProvider.latency_scale = args.latency_scale
+        get_simulator(latency_scale=args.latency_scale)
+
+        from app import create_app
+        app = create_app()
+        stack.enter_context(app.app_context())
+
+        db = app.extensions['mongo_db']
+        db.client.drop_database(db.name)
+        create_api_key(db, app.extensions['fernet'], 'simulated', args.profile, 'bench')
+
+        ctx = BenchContext(app, args.scale, args.profile)
+        results = {}
+        for name in args.only or BENCHMARKS:
+            print(f"running {name}...", file=sys.stderr)
+            results[name] = BENCHMARKS[name](ctx)
+
+    baseline = None
+    if args.compare:
+        if not os.path.exists(BASELINE_PATH):
+            parser.error(f'no baseline at {BASELINE_PATH}; run with --save-baseline first')
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)['results']
+
+    _print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({'created_at': datetime.now(timezone.utc).isoformat(), 'results': results}, f, indent=2)
+        print(f"baseline written to {BASELINE_PATH}")
+    if baseline:
+        regressed = _regressions(results, baseline, args.tolerance)
+        if regressed:
+            print(f"regressed beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,6 +9,67 @@ class Config:
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
     MONGO_DB = os.getenv('MONGO_DB', 'lagos')
     FERNET_KEY = os.getenv('FERNET_KEY', '')  # Generated on first run if empty
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # Bearer token for /metrics; the endpoint is off if empty
+    SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', '200'))  # Mongo commands slower than this are logged
+
+    # Provider endpoint overrides, e.g. to point the SDKs at the bundled simulator
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', '')
+    ANTHROPIC_BASE_URL = os.getenv('ANTHROPIC_BASE_URL', '')
+    GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT', '')
+
+    # Scheduler leadership: one process across all workers/hosts runs the jobs
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', '1') == '1'  # 0 = never campaign (web-only node)
+    LEADER_LEASE_SECONDS = int(os.getenv('LEADER_LEASE_SECONDS', '15'))
+    SCHEDULER_MISFIRE_GRACE_SECONDS = int(os.getenv('SCHEDULER_MISFIRE_GRACE_SECONDS', '600'))  # older missed runs are skipped
+
+    # Scheduler load shaping
+    SCHEDULER_MAX_CONCURRENT = int(os.getenv('SCHEDULER_MAX_CONCURRENT', '4'))  # project jobs running at once
+    SCHEDULER_JITTER_SECONDS = int(os.getenv('SCHEDULER_JITTER_SECONDS', '60'))  # capped at 10% of the interval
+    PROVIDER_MAX_CONCURRENT = int(os.getenv('PROVIDER_MAX_CONCURRENT', '4'))  # in-flight calls per provider
+    PROVIDER_CONCURRENCY = os.getenv('PROVIDER_CONCURRENCY', '')  # per-provider overrides, e.g. "openai=8,claude=2"
+
+    # Hedged provider calls: fire a backup request once the primary passes its p95 latency
+    HEDGE_REQUESTS = os.getenv('HEDGE_REQUESTS', '0') == '1'
+    HEDGE_MIN_DELAY_SECONDS = float(os.getenv('HEDGE_MIN_DELAY_SECONDS', '2'))  # never hedge earlier than this
+    HEDGE_BUDGET = float(os.getenv('HEDGE_BUDGET', '0.1'))  # max fraction of calls that may be hedged
+
+    # Near-duplicate detection (estimated Jaccard similarity of 3-gram shingles)
+    DEDUP_TITLE_THRESHOLD = float(os.getenv('DEDUP_TITLE_THRESHOLD', '0.75'))  # new blog titles at/above are skipped
+    DEDUP_ARTICLE_THRESHOLD = float(os.getenv('DEDUP_ARTICLE_THRESHOLD', '0.5'))  # articles at/above are flagged
+    DEDUP_REFRESH_SECONDS = int(os.getenv('DEDUP_REFRESH_SECONDS', '30'))  # pick up other processes' inserts
+    # Signatures held in memory per process, over all projects (about 3 KB each); least recently used indexes go first
+    DEDUP_MAX_SIGNATURES = int(os.getenv('DEDUP_MAX_SIGNATURES', '50000'))
+
+    # Article bodies are stored compressed: 'zlib', or 'zstd' with the optional zstandard package
+    ARTICLE_BODY_CODEC = os.getenv('ARTICLE_BODY_CODEC', 'zlib')
+
+    # Background project deletion
+    PURGE_CHUNK_SIZE = int(os.getenv('PURGE_CHUNK_SIZE', '1000'))  # documents per delete
+    PURGE_PAUSE_SECONDS = float(os.getenv('PURGE_PAUSE_SECONDS', '0.1'))  # minimum pause between chunks
+
+    # Dashboard generation actions run on this many background threads per process
+    GENERATION_WORKERS = int(os.getenv('GENERATION_WORKERS', '2'))
+
+    # Publishing at exact times (articles' publish_at)
+    PUBLISH_HORIZON_HOURS = int(os.getenv('PUBLISH_HORIZON_HOURS', '24'))  # how far ahead interval slots are filled
+    PUBLISH_POLL_SECONDS = int(os.getenv('PUBLISH_POLL_SECONDS', '30'))  # longest the timer sleeps between checks
+
+    # Image library: uploads are converted to WebP at each size (name:max width) in a process pool
+    IMAGE_SIZES = os.getenv('IMAGE_SIZES', 'large:1200,medium:768,thumb:320')  # the largest goes into posts
+    IMAGE_WEBP_QUALITY = int(os.getenv('IMAGE_WEBP_QUALITY', '80'))
+    IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '2'))  # conversion processes per web process
+    IMAGE_MAX_UPLOAD_MB = int(os.getenv('IMAGE_MAX_UPLOAD_MB', '20'))  # per file
+
+    # Article quality scores (0-100, see services/quality.py); lower-scoring articles are never published
+    QUALITY_MIN_SCORE = float(os.getenv('QUALITY_MIN_SCORE', '40'))  # 0 turns the gate off
+
+    # RSS/Atom feeds at /feeds/<project_id>/rss.xml and atom.xml
+    FEED_ITEMS = int(os.getenv('FEED_ITEMS', '20'))  # latest published articles kept in each feed
+    FEED_CACHE_SECONDS = int(os.getenv('FEED_CACHE_SECONDS', '60'))  # in-process cache and client max-age
+
+    # Internal links to earlier published articles, inserted when an article is published
+    INTERNAL_LINKS_MAX = int(os.getenv('INTERNAL_LINKS_MAX', '5'))  # per article; 0 turns linking off
+    INTERNAL_LINKS_REFRESH_SECONDS = int(os.getenv('INTERNAL_LINKS_REFRESH_SECONDS', '30'))  # other processes' publishes
 
     # Color palette for article headings
     HEADING_COLORS = [
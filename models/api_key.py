@@ -2,9 +2,6 @@ from datetime import datetime, timezone
 from bson import ObjectId
 
 
-PROVIDERS = ['gemini', 'openai', 'claude']
-
-
 def create_api_key(db, fernet, provider, key, name=''):
     encrypted = fernet.encrypt(key.encode()).decode()
     doc = {
@@ -46,6 +43,11 @@ def toggle_api_key(db, key_id):
         )
 
 
+def get_active_providers(db):
+    """Names of providers that have at least one active key."""
+    return db.api_keys.distinct('provider', {'is_active': True})
+
+
 def get_next_key(db, fernet, provider):
     """Round-robin key selection: pick the least-recently-used active key."""
     key_doc = db.api_keys.find_one(
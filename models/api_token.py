@@ -0,0 +1,56 @@
+"""Bearer tokens for the JSON API (/api/v1).
+
+Only a SHA-256 of each token is stored. Tokens carry 256 random bits, so a
+plain hash is as good as a salted slow one here, and checking a request is
+one indexed lookup on ``token_hash``. The token itself is shown once, when it
+is created.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+TOKEN_PREFIX = 'lgs_'
+# last_used_at is rewritten at most this often per token, not on every request
+LAST_USED_RESOLUTION = timedelta(minutes=1)
+
+
+def _hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_api_token(db, name=''):
+    """Create a token; returns (token_id, token). The token cannot be recovered later."""
+    token = TOKEN_PREFIX + secrets.token_urlsafe(32)
+    doc = {
+        'name': name or 'API token',
+        'token_hash': _hash(token),
+        'hint': token[:len(TOKEN_PREFIX) + 4],
+        'is_active': True,
+        'last_used_at': None,
+        'created_at': datetime.now(timezone.utc),
+    }
+    result = db.api_tokens.insert_one(doc)
+    return str(result.inserted_id), token
+
+
+def get_all_api_tokens(db):
+    return list(db.api_tokens.find({}, {'token_hash': 0}).sort('created_at', -1))
+
+
+def find_api_token(db, token):
+    """The active token document for a presented token, or None."""
+    if not token.startswith(TOKEN_PREFIX):
+        return None
+    doc = db.api_tokens.find_one({'token_hash': _hash(token), 'is_active': True}, {'token_hash': 0})
+    if doc:
+        now = datetime.now(timezone.utc)
+        last = doc.get('last_used_at')
+        if last is None or last.replace(tzinfo=timezone.utc) < now - LAST_USED_RESOLUTION:
+            db.api_tokens.update_one({'_id': doc['_id']}, {'$set': {'last_used_at': now}})
+    return doc
+
+
+def revoke_api_token(db, token_id):
+    db.api_tokens.delete_one({'_id': ObjectId(token_id)})
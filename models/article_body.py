@@ -0,0 +1,116 @@
+"""Compressed storage of article bodies (chapters and FAQ).
+
+An article's chapters and FAQ are stored as one compressed blob:
+
+    body          zlib- or zstd-compressed UTF-8 JSON {"chapters": [...], "faq": "..."}
+    body_codec    'zlib' or 'zstd'
+    body_version  format version of the JSON inside (currently 1)
+    chapter_count  kept beside the blob so listings never need to decode it
+
+Persian HTML compresses 4-6x, and listings, stats and queue queries no longer
+page full article bodies through the cache. Only the paths that show or publish
+an article decode the blob (``get_article`` and ``article_body``). Documents
+written before this change still carry plain ``chapters``/``faq`` fields and
+read transparently until migrated:
+
+    python -m models.article_body            # compress every legacy article body
+"""
+import json
+import logging
+import sys
+import zlib
+
+from bson import Binary
+from pymongo import UpdateOne
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+BODY_VERSION = 1
+CODECS = ('zlib', 'zstd')
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("The zstd body codec needs the 'zstandard' package (pip install zstandard)") from None
+    return zstandard
+
+
+def encode_body(chapters, faq='', codec=None):
+    """Fields to store for an article body: body, body_codec, body_version, chapter_count."""
+    codec = codec or Config.ARTICLE_BODY_CODEC
+    raw = json.dumps({'chapters': chapters or [], 'faq': faq or ''},
+                     ensure_ascii=False, separators=(',', ':')).encode()
+    if codec == 'zstd':
+        blob = _zstandard().ZstdCompressor(level=9).compress(raw)
+    elif codec == 'zlib':
+        blob = zlib.compress(raw, 6)
+    else:
+        raise ValueError(f"Unknown article body codec: {codec}")
+    return {'body': Binary(blob), 'body_codec': codec, 'body_version': BODY_VERSION,
+            'chapter_count': len(chapters or [])}
+
+
+def decode_body(doc):
+    """(chapters, faq) from a stored blob."""
+    codec, blob = doc.get('body_codec', 'zlib'), bytes(doc['body'])
+    if doc.get('body_version', BODY_VERSION) != BODY_VERSION:
+        raise ValueError(f"Unsupported article body version {doc.get('body_version')}")
+    raw = _zstandard().ZstdDecompressor().decompress(blob) if codec == 'zstd' else zlib.decompress(blob)
+    data = json.loads(raw)
+    return data.get('chapters', []), data.get('faq', '')
+
+
+def article_body(article):
+    """(chapters, faq) of an article document, compressed or legacy."""
+    if article.get('body') is not None:
+        return decode_body(article)
+    return article.get('chapters', []), article.get('faq', '')
+
+
+def with_body(article):
+    """The article with ``chapters`` and ``faq`` filled in (decoded once, in place)."""
+    if article is not None and 'chapters' not in article:
+        article['chapters'], article['faq'] = article_body(article)
+    return article
+
+
+# Leaves the body out of documents fetched for listings
+LISTING_PROJECTION = {'body': 0, 'chapters': 0, 'faq': 0}
+
+
+def migrate_article_bodies(db, batch_size=200, codec=None):
+    """Compress the body of every article that still stores plain chapters; returns the count.
+
+    Safe to interrupt and re-run: each batch is written with its plain fields unset.
+    """
+    migrated = 0
+    while True:
+        docs = list(db.articles.find({'body': {'$exists': False}}, {'chapters': 1, 'faq': 1})
+                    .limit(batch_size))
+        if not docs:
+            break
+        db.articles.bulk_write([
+            UpdateOne({'_id': d['_id'], 'body': {'$exists': False}},
+                      {'$set': encode_body(d.get('chapters', []), d.get('faq', ''), codec),
+                       '$unset': {'chapters': '', 'faq': ''}})
+            for d in docs
+        ], ordered=False)
+        migrated += len(docs)
+        logger.info(f"Compressed {migrated} article bodies")
+    return migrated
+
+
+def main():
+    from pymongo import MongoClient
+    logging.basicConfig(level=logging.INFO)
+    db = MongoClient(Config.MONGO_URI)[Config.MONGO_DB]
+    print(f"{migrate_article_bodies(db)} article(s) migrated")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,40 @@
 from datetime import datetime, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models.article_body import encode_body, with_body, LISTING_PROJECTION
+from models.feed import add_feed_item
+from text_utils import normalize_keyword
 
 
 # --- Keywords ---
 def add_keywords(db, project_id, keywords):
-    docs = [{
-        'project_id': project_id,
-        'text': kw.strip(),
-        'is_title_generated': False,
-        'created_at': datetime.now(timezone.utc),
-    } for kw in keywords if kw.strip()]
-    if docs:
-        db.keywords.insert_many(docs)
-    return len(docs)
+    """Upsert keywords on (project_id, norm); returns how many were new.
+
+    Keywords that normalize to an existing one (Arabic/Persian letter variants,
+    ZWNJ, spacing, case) are left untouched, so re-adding seeds is a no-op.
+    """
+    now = datetime.now(timezone.utc)
+    ops = {}
+    for kw in keywords:
+        text = kw.strip()
+        norm = normalize_keyword(text)
+        if norm and norm not in ops:
+            ops[norm] = UpdateOne(
+                {'project_id': project_id, 'norm': norm},
+                {'$setOnInsert': {'text': text, 'is_title_generated': False, 'created_at': now}},
+                upsert=True,
+            )
+    if not ops:
+        return 0
+    try:
+        return db.keywords.bulk_write(list(ops.values()), ordered=False).upserted_count
+    except BulkWriteError as e:
+        # Two writers upserting the same new keyword: the loser gets E11000, which is fine
+        if any(err['code'] != 11000 for err in e.details['writeErrors']):
+            raise
+        return e.details['nUpserted']
 
 
 def get_random_keyword(db, project_id, title_generated=False):
@@ -32,14 +54,17 @@ def mark_keyword_title_generated(db, keyword_id):
 
 
 # --- Blog Titles ---
-def add_blog_titles(db, project_id, titles, keyword):
+def add_blog_titles(db, project_id, titles, keyword, minhashes=None):
+    """Insert titles; ``minhashes`` optionally gives each title's packed signature (see services.dedup)."""
+    minhashes = minhashes or [None] * len(titles)
     docs = [{
         'project_id': project_id,
         'content': t.strip(),
         'keyword': keyword,
         'is_article_generated': False,
+        'minhash': m,
         'created_at': datetime.now(timezone.utc),
-    } for t in titles if t.strip()]
+    } for t, m in zip(titles, minhashes) if t.strip()]
     if docs:
         db.blog_titles.insert_many(docs)
     return len(docs)
@@ -98,10 +123,14 @@ def create_article(db, project_id, data):
         'article_title': data.get('article_title', ''),
         'slug': data.get('slug', ''),
         'tag': data.get('tag', ''),
-        'chapters': data.get('chapters', []),
-        'faq': data.get('faq', ''),
+        **encode_body(data.get('chapters', []), data.get('faq', '')),
         'reference': data.get('reference', ''),
+        'minhash': data.get('minhash'),
+        'duplicate_of': data.get('duplicate_of'),
+        'similarity': data.get('similarity'),
+        'quality': data.get('quality'),
         'is_published': False,
+        'publish_at': None,
         'wp_post_id': None,
         'wp_post_url': None,
         'published_at': None,
@@ -111,9 +140,21 @@ def create_article(db, project_id, data):
     return str(result.inserted_id)
 
 
-def get_random_unpublished_article(db, project_id):
+def _min_quality(min_score):
+    """Filter leaving out articles scored below ``min_score``; unscored ones pass."""
+    return {'quality.score': {'$not': {'$lt': min_score}}} if min_score else {}
+
+
+def get_random_unpublished_article(db, project_id, min_score=0):
+    """Random unscheduled, unpublished article, skipping near-duplicates and ones scored below ``min_score``.
+
+    Articles with a ``publish_at`` are left to the publish timer, which may
+    already have claimed them. The body is left encoded; read it with
+    models.article_body.article_body.
+    """
     pipeline = [
-        {'$match': {'project_id': project_id, 'is_published': False}},
+        {'$match': {'project_id': project_id, 'is_published': False, 'publish_at': None, 'duplicate_of': None,
+                    **_min_quality(min_score)}},
         {'$sample': {'size': 1}}
     ]
     results = list(db.articles.aggregate(pipeline))
@@ -121,26 +162,174 @@ def get_random_unpublished_article(db, project_id):
 
 
 def mark_article_published(db, article_id, wp_post_id, wp_post_url):
-    db.articles.update_one(
+    """Record a WordPress post for an article and add it to the project's feed."""
+    article = db.articles.find_one_and_update(
         {'_id': ObjectId(article_id)},
         {'$set': {
             'is_published': True,
             'wp_post_id': wp_post_id,
             'wp_post_url': wp_post_url,
             'published_at': datetime.now(timezone.utc),
-        }}
+        }},
+        projection={'minhash': 0},
+        return_document=ReturnDocument.AFTER,
     )
+    if article:
+        add_feed_item(db, article)
+
+
+# --- Publish scheduling ---
+def set_publish_at(db, article_id, when, slot='manual', interval=None):
+    """Schedule an unpublished article for ``when`` (None unschedules it).
+
+    ``slot`` is 'manual' for a time picked by hand or 'auto' for one filled in
+    from the project's publish interval (``interval`` minutes).
+    """
+    db.articles.update_one(
+        {'_id': ObjectId(article_id), 'is_published': False},
+        {'$set': {'publish_at': when, 'publish_slot': slot if when else None,
+                  'publish_interval': interval, 'publish_attempts': 0, 'publish_error': None}},
+    )
+
+
+def get_next_publish_at(db):
+    """Earliest publish_at of any unpublished article, or None."""
+    doc = db.articles.find_one({'is_published': False, 'publish_at': {'$ne': None}}, {'publish_at': 1},
+                               sort=[('publish_at', 1)])
+    return doc['publish_at'] if doc else None
+
+
+def claim_due_articles(db, now, until, limit=100):
+    """Move due articles' publish_at to ``until`` so no other pass takes them; returns the claimed docs.
+
+    A claim that is never resolved (the process died) simply comes due again at ``until``.
+    """
+    claimed = []
+    due = db.articles.find({'is_published': False, 'publish_at': {'$lte': now}},
+                           {'project_id': 1, 'publish_at': 1, 'publish_attempts': 1}).sort('publish_at', 1).limit(limit)
+    for doc in due:
+        result = db.articles.update_one({'_id': doc['_id'], 'is_published': False, 'publish_at': doc['publish_at']},
+                                        {'$set': {'publish_at': until}})
+        if result.modified_count:
+            claimed.append(doc)
+    return claimed
+
+
+def record_publish_failure(db, article_id, retry_at, error):
+    """Count a failed publish and retry at ``retry_at`` (None gives up and unschedules the article)."""
+    db.articles.update_one(
+        {'_id': ObjectId(article_id)},
+        {'$set': {'publish_at': retry_at, 'publish_error': str(error)[:500],
+                  **({} if retry_at else {'publish_slot': None})},
+         '$inc': {'publish_attempts': 1}},
+    )
+
+
+def get_auto_slots(db, project_id):
+    """Unpublished articles holding an interval-filled slot, earliest first."""
+    return list(db.articles.find(
+        {'project_id': project_id, 'is_published': False, 'publish_slot': 'auto', 'publish_at': {'$ne': None}},
+        {'publish_at': 1, 'publish_interval': 1},
+    ).sort('publish_at', 1))
+
+
+def clear_auto_slots(db, project_id, keep_interval=None):
+    """Unschedule interval-filled slots, except those filled at ``keep_interval`` minutes."""
+    query = {'project_id': project_id, 'is_published': False, 'publish_slot': 'auto'}
+    if keep_interval is not None:
+        query['publish_interval'] = {'$ne': keep_interval}
+    return db.articles.update_many(query, {'$set': {'publish_at': None, 'publish_slot': None}}).modified_count
+
+
+def get_unscheduled_articles(db, project_id, limit, min_score=0):
+    """Oldest unpublished, unscheduled articles that are neither near-duplicates nor scored below ``min_score``."""
+    return list(db.articles.find(
+        {'project_id': project_id, 'is_published': False, 'publish_at': None, 'duplicate_of': None,
+         **_min_quality(min_score)},
+        {'_id': 1},
+    ).sort('created_at', 1).limit(limit))
 
 
 def get_articles(db, project_id, published=None, limit=50):
     query = {'project_id': project_id}
     if published is not None:
         query['is_published'] = published
-    return list(db.articles.find(query).sort('created_at', -1).limit(limit))
+    return list(db.articles.find(query, LISTING_PROJECTION).sort('created_at', -1).limit(limit))
 
 
 def get_article(db, article_id):
-    return db.articles.find_one({'_id': ObjectId(article_id)})
+    """One article with its body decoded into ``chapters`` and ``faq``."""
+    return with_body(db.articles.find_one({'_id': ObjectId(article_id)}))
+
+
+# --- API listings and bulk updates ---
+def get_page(db, collection, project_id, query=None, after=None, limit=100, projection=None):
+    """One page of a project's documents in ``_id`` order, after the ``after`` id.
+
+    Paging never repeats a document. Picking up new documents with the last id
+    seen is best effort: an ObjectId starts with its creating process's clock
+    in whole seconds, so a document inserted by another process or host in the
+    same second as the last one seen (or with a clock running behind) can sort
+    before it and be skipped. Sync clients should overlap, resuming from an id
+    they saw a few seconds before the last one, and drop ids they already have.
+    """
+    query = {**(query or {}), 'project_id': project_id}
+    if after:
+        query['_id'] = {'$gt': ObjectId(after)}
+    return list(db[collection].find(query, projection).sort('_id', 1).limit(limit))
+
+
+def bulk_update(db, collection, project_id, updates):
+    """Apply (document id, {field: value}) updates to one project's documents; returns (matched, modified)."""
+    ops = [UpdateOne({'_id': ObjectId(doc_id), 'project_id': project_id}, {'$set': fields})
+           for doc_id, fields in updates if fields]
+    if not ops:
+        return 0, 0
+    result = db[collection].bulk_write(ops, ordered=False)
+    return result.matched_count, result.modified_count
+
+
+# --- Near-duplicate signatures ---
+def get_minhash_docs(db, collection, project_id, since=None):
+    """Signatures of a project's signed titles or articles, oldest first, optionally from ``since`` on."""
+    query = {'project_id': project_id, 'minhash': {'$ne': None}}
+    if since is not None:
+        query['created_at'] = {'$gte': since}
+    return db[collection].find(query, {'minhash': 1, 'content': 1, 'created_at': 1}).sort('created_at', 1)
+
+
+def get_link_targets(db, project_id, after=None):
+    """Published articles of a project that can be linked to, in (published_at, _id) order.
+
+    ``after`` is the (published_at, _id) of the last article seen; only those
+    after it are returned, so a top-up never re-reads the ones it has. Articles
+    without ``published_at`` have no place in that order and are left out.
+    """
+    query = {'project_id': project_id, 'is_published': True, 'published_at': {'$ne': None}}
+    if after is not None:
+        published_at, article_id = after
+        query['$or'] = [{'published_at': {'$gt': published_at}},
+                        {'published_at': published_at, '_id': {'$gt': article_id}}]
+    projection = {'article_title': 1, 'tag': 1, 'wp_post_url': 1, 'published_at': 1}
+    return db.articles.find(query, projection).sort([('published_at', 1), ('_id', 1)])
+
+
+def get_unsigned_docs(db, collection, project_id=None, after=None, limit=500):
+    """Up to ``limit`` titles or articles saved without a signature, in ``_id`` order after ``after``."""
+    query = {'minhash': None}
+    if project_id:
+        query['project_id'] = project_id
+    if after is not None:
+        query['_id'] = {'$gt': after}
+    projection = {'content': 1} if collection == 'blog_titles' else {'body': 1, 'body_codec': 1, 'body_version': 1,
+                                                                      'chapters': 1, 'faq': 1}
+    return list(db[collection].find(query, projection).sort('_id', 1).limit(limit))
+
+
+def set_minhashes(db, collection, updates):
+    """Store backfilled signatures: ``updates`` is a list of (document id, packed signature)."""
+    db[collection].bulk_write([UpdateOne({'_id': doc_id}, {'$set': {'minhash': sig}})
+                               for doc_id, sig in updates], ordered=False)
 
 
 # --- Ads Content ---
@@ -228,3 +417,22 @@ def get_project_stats(db, project_id):
         'info_blocks': db.info_blocks.count_documents({'project_id': project_id}),
         'bullet_items': db.bullet_items.count_documents({'project_id': project_id}),
     }
+
+
+def get_queue_depths(db):
+    """Pending work per project: {project_id: {queue_name: count}}, one aggregation per queue."""
+    queues = [
+        ('articles_unpublished', 'articles', {'is_published': False}),
+        ('blog_titles_unused', 'blog_titles', {'is_article_generated': False}),
+        ('ads_titles_unused', 'ads_titles', {'is_generated': False}),
+        ('keywords_unused', 'keywords', {'is_title_generated': False}),
+    ]
+    depths = {}
+    for queue, col, match in queues:
+        pipeline = [
+            {'$match': match},
+            {'$group': {'_id': '$project_id', 'count': {'$sum': 1}}},
+        ]
+        for row in db[col].aggregate(pipeline):
+            depths.setdefault(row['_id'], {})[queue] = row['count']
+    return depths
@@ -0,0 +1,207 @@
+"""Per-project RSS 2.0 and Atom feeds of published articles, stored pre-rendered.
+
+A ``feeds`` document holds a project's last ``FEED_ITEMS`` published
+articles and both renderings of them, with an ETag for each. Publishing an
+article pushes one item onto it (``add_feed_item``, called from
+``mark_article_published``) and re-renders. Serving a feed never touches
+``articles``. A project without a feed document gets one built from its
+latest published articles the first time the feed is requested.
+
+The push bumps ``version``, and the rendering is saved only if ``version`` is
+unchanged, so two publishes racing on one project cannot leave an older
+rendering behind.
+"""
+import hashlib
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import Config
+from models.article_body import article_body
+
+SUMMARY_CHARS = 300
+
+_TAG = re.compile(r'<[^>]+>')
+_SPACE = re.compile(r'\s+')
+
+
+def _utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _summary(article):
+    chapters, _ = article_body(article)
+    text = _SPACE.sub(' ', _TAG.sub(' ', chapters[0].get('content', '') if chapters else '')).strip()
+    return text if len(text) <= SUMMARY_CHARS else text[:SUMMARY_CHARS].rsplit(' ', 1)[0] + '…'
+
+
+def feed_item(article):
+    """The feed entry for a published article document (with its body)."""
+    return {
+        'article_id': str(article['_id']),
+        'title': article.get('article_title', ''),
+        'link': article.get('wp_post_url') or '',
+        'tag': article.get('tag', ''),
+        'summary': _summary(article),
+        'published_at': article.get('published_at') or datetime.now(timezone.utc),
+    }
+
+
+def _channel(project):
+    wp_url = (project.get('wordpress') or {}).get('url', '').rstrip('/')
+    return {
+        'title': project.get('name', ''),
+        'link': wp_url,
+        'description': project.get('about_company') or project.get('business_field') or project.get('name', ''),
+        'lang': project.get('lang') or 'fa',
+    }
+
+
+def render_rss(channel, items):
+    updated = _utc(items[0]['published_at']) if items else datetime.now(timezone.utc)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0"><channel>',
+        f"<title>{escape(channel['title'])}</title>",
+        f"<link>{escape(channel['link'])}</link>",
+        f"<description>{escape(channel['description'])}</description>",
+        f"<language>{escape(channel['lang'])}</language>",
+        f"<lastBuildDate>{format_datetime(updated)}</lastBuildDate>",
+    ]
+    for item in items:
+        guid = (f"<guid>{escape(item['link'])}</guid>" if item['link']
+                else f"<guid isPermaLink=\"false\">{item['article_id']}</guid>")
+        parts += [
+            '<item>',
+            f"<title>{escape(item['title'])}</title>",
+            f"<link>{escape(item['link'])}</link>" if item['link'] else '',
+            guid,
+            f"<category>{escape(item['tag'])}</category>" if item['tag'] else '',
+            f"<description>{escape(item['summary'])}</description>",
+            f"<pubDate>{format_datetime(_utc(item['published_at']))}</pubDate>",
+            '</item>',
+        ]
+    parts.append('</channel></rss>')
+    return '\n'.join(p for p in parts if p)
+
+
+def render_atom(channel, project_id, items):
+    updated = _utc(items[0]['published_at']) if items else datetime.now(timezone.utc)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f"<feed xmlns=\"http://www.w3.org/2005/Atom\" xml:lang={quoteattr(channel['lang'])}>",
+        f"<id>urn:lagos:project:{project_id}</id>",
+        f"<title>{escape(channel['title'])}</title>",
+        f"<subtitle>{escape(channel['description'])}</subtitle>",
+        f"<link href={quoteattr(channel['link'])}/>" if channel['link'] else '',
+        f"<updated>{updated.isoformat()}</updated>",
+        f"<author><name>{escape(channel['title'])}</name></author>",
+    ]
+    for item in items:
+        parts += [
+            '<entry>',
+            f"<id>urn:lagos:article:{item['article_id']}</id>",
+            f"<title>{escape(item['title'])}</title>",
+            f"<link href={quoteattr(item['link'])}/>" if item['link'] else '',
+            f"<category term={quoteattr(item['tag'])}/>" if item['tag'] else '',
+            f"<updated>{_utc(item['published_at']).isoformat()}</updated>",
+            f"<summary>{escape(item['summary'])}</summary>",
+            '</entry>',
+        ]
+    parts.append('</feed>')
+    return '\n'.join(p for p in parts if p)
+
+
+def _etag(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:20]
+
+
+def _render(db, feed, project):
+    """Render a feed document's items and save them, unless a newer version has been saved meanwhile."""
+    channel = _channel(project)
+    rss = render_rss(channel, feed['items'])
+    atom = render_atom(channel, feed['project_id'], feed['items'])
+    updated_at = _utc(feed['items'][0]['published_at']) if feed['items'] else datetime.now(timezone.utc)
+    rendered = {'rss': rss, 'atom': atom, 'etags': {'rss': _etag(rss), 'atom': _etag(atom)},
+                'updated_at': updated_at}
+    db.feeds.update_one({'_id': feed['_id'], 'version': feed['version']}, {'$set': rendered})
+    return {**feed, **rendered}
+
+
+def add_feed_item(db, article):
+    """Put a just-published article at the top of its project's feed."""
+    project_id = article['project_id']
+    project = db.projects.find_one({'_id': ObjectId(project_id)})
+    if not project:
+        return None
+    feed = db.feeds.find_one_and_update(
+        {'project_id': project_id},
+        {'$pull': {'items': {'article_id': str(article['_id'])}}},
+        projection={'_id': 1},
+    )
+    if not feed:
+        # First publish since feeds exist: the rebuild already includes this article
+        return rebuild_feed(db, project_id, project)
+    feed = db.feeds.find_one_and_update(
+        {'_id': feed['_id']},
+        {'$push': {'items': {'$each': [feed_item(article)], '$sort': {'published_at': -1},
+                             '$slice': Config.FEED_ITEMS}},
+         '$inc': {'version': 1}},
+        projection={'rss': 0, 'atom': 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    return _render(db, feed, project)
+
+
+def rebuild_feed(db, project_id, project=None):
+    """Build a project's feed from its latest published articles; None if the project is gone."""
+    project = project or db.projects.find_one({'_id': ObjectId(project_id), 'deleted_at': None})
+    if not project:
+        return None
+    articles = db.articles.find({'project_id': project_id, 'is_published': True}).sort('published_at', -1)
+    items = [feed_item(a) for a in articles.limit(Config.FEED_ITEMS)]
+    update = {'$set': {'items': items}, '$inc': {'version': 1}}
+    try:
+        feed = db.feeds.find_one_and_update({'project_id': project_id}, update, projection={'rss': 0, 'atom': 0},
+                                            upsert=True, return_document=ReturnDocument.AFTER)
+    except DuplicateKeyError:
+        # Another request created it first; ours is built from the same articles
+        feed = db.feeds.find_one_and_update({'project_id': project_id}, update, projection={'rss': 0, 'atom': 0},
+                                            return_document=ReturnDocument.AFTER)
+    return _render(db, feed, project)
+
+
+def refresh_feed_channel(db, project):
+    """Re-render a project's feed after its name, site or description changed."""
+    feed = db.feeds.find_one({'project_id': str(project['_id'])}, {'rss': 0, 'atom': 0})
+    if feed:
+        _render(db, feed, project)
+
+
+def _project_live(db, project_id):
+    return db.projects.count_documents({'_id': ObjectId(project_id), 'deleted_at': None}, limit=1) > 0
+
+
+def get_feed_etags(db, project_id):
+    """Just the ETags and modification time: what a conditional request needs; None once the project is deleted."""
+    if not _project_live(db, project_id):
+        return None
+    return db.feeds.find_one({'project_id': project_id}, {'etags': 1, 'updated_at': 1})
+
+
+def get_feed(db, project_id, fmt):
+    """The stored rendering for ``fmt`` ('rss' or 'atom') with its ETag, building the feed if missing.
+
+    None if the project does not exist or is being deleted, whatever feed document is left.
+    """
+    if not _project_live(db, project_id):
+        return None
+    feed = db.feeds.find_one({'project_id': project_id}, {fmt: 1, 'etags': 1, 'updated_at': 1})
+    if feed and fmt in feed:
+        return feed
+    return rebuild_feed(db, project_id)
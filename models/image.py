@@ -0,0 +1,148 @@
+"""Per-project image library used for chapter images.
+
+Each image is an ``images`` document with its ``tags`` and a ``rand`` key in
+[0, 1). Picking n random images for a tag is one range scan of the
+``(project_id, tags, rand)`` index from a random point, not an ``$sample`` or
+``ORDER BY RAND()``. The images picked get a new ``rand``, so the next post
+starting nearby does not get the same run of images.
+
+Uploaded images are stored as WebP renditions in ``image_files``, one document
+per (image, size). Images imported as links (the legacy ``link_image``
+table) only carry a ``url`` and are used as is.
+"""
+import random
+from datetime import datetime, timezone
+
+from bson import Binary, ObjectId
+from pymongo import UpdateOne
+
+# Fields returned for listings and picks; never the renditions themselves
+IMAGE_PROJECTION = {'project_id': 1, 'tags': 1, 'alt': 1, 'url': 1, 'filename': 1, 'sizes': 1,
+                    'state': 1, 'error': 1, 'wp_media': 1, 'created_at': 1}
+
+
+def _tags(tags):
+    return sorted({t.strip() for t in tags if t and t.strip()})
+
+
+def add_image_links(db, project_id, urls, tags, alt=''):
+    """Add images hosted elsewhere by URL; returns how many were new for the project."""
+    now = datetime.now(timezone.utc)
+    tags = _tags(tags)
+    ops = {}
+    for url in urls:
+        url = url.strip()
+        if url.startswith(('http://', 'https://')) and url not in ops:
+            ops[url] = UpdateOne(
+                {'project_id': project_id, 'url': url},
+                {'$setOnInsert': {'alt': alt, 'state': 'ready', 'rand': random.random(), 'created_at': now},
+                 '$addToSet': {'tags': {'$each': tags}}},
+                upsert=True,
+            )
+    if not ops:
+        return 0
+    return db.images.bulk_write(list(ops.values()), ordered=False).upserted_count
+
+
+def add_pending_image(db, project_id, filename, tags, alt=''):
+    """Record an upload waiting for its renditions; it has no ``rand`` yet, so it is never picked."""
+    result = db.images.insert_one({
+        'project_id': project_id,
+        'filename': filename,
+        'tags': _tags(tags),
+        'alt': alt,
+        'state': 'processing',
+        'error': '',
+        'created_at': datetime.now(timezone.utc),
+    })
+    return str(result.inserted_id)
+
+
+def store_renditions(db, image_id, renditions):
+    """Save ``[(size, data, width, height)]`` for an upload and make it pickable."""
+    oid = ObjectId(image_id)
+    image = db.images.find_one({'_id': oid}, {'project_id': 1})
+    if not image:
+        return False
+    for size, data, width, height in renditions:
+        db.image_files.replace_one(
+            {'image_id': image_id, 'size': size},
+            {'project_id': image['project_id'], 'image_id': image_id, 'size': size,
+             'data': Binary(data), 'width': width, 'height': height},
+            upsert=True,
+        )
+    sizes = {size: {'width': width, 'height': height, 'bytes': len(data)}
+             for size, data, width, height in renditions}
+    db.images.update_one({'_id': oid}, {'$set': {'sizes': sizes, 'state': 'ready', 'rand': random.random()}})
+    return True
+
+
+def mark_image_failed(db, image_id, error):
+    db.images.update_one({'_id': ObjectId(image_id)}, {'$set': {'state': 'failed', 'error': error}})
+
+
+def fail_stale_uploads(db, before, error):
+    """Mark uploads still processing since before ``before`` as failed; returns how many."""
+    return db.images.update_many({'state': 'processing', 'created_at': {'$lt': before}},
+                                 {'$set': {'state': 'failed', 'error': error}}).modified_count
+
+
+def get_images(db, project_id, tag=None, limit=200):
+    query = {'project_id': project_id}
+    if tag:
+        query['tags'] = tag
+    return list(db.images.find(query, IMAGE_PROJECTION).sort('created_at', -1).limit(limit))
+
+
+def get_image(db, image_id):
+    return db.images.find_one({'_id': ObjectId(image_id)}, IMAGE_PROJECTION)
+
+
+def get_image_tags(db, project_id):
+    """{tag: image count} for a project's ready images."""
+    pipeline = [
+        {'$match': {'project_id': project_id, 'state': 'ready'}},
+        {'$unwind': '$tags'},
+        {'$group': {'_id': '$tags', 'count': {'$sum': 1}}},
+        {'$sort': {'_id': 1}},
+    ]
+    return {row['_id']: row['count'] for row in db.images.aggregate(pipeline)}
+
+
+def get_image_file(db, image_id, size):
+    return db.image_files.find_one({'image_id': image_id, 'size': size})
+
+
+def pick_images(db, project_id, tag, count):
+    """Up to ``count`` distinct random ready images with ``tag``.
+
+    One indexed scan from a random ``rand``; a second scan from the start of
+    the range only when the first runs off the end.
+    """
+    if not tag or count <= 0:
+        return []
+    point = random.random()
+    query = {'project_id': project_id, 'tags': tag}
+    images = list(db.images.find({**query, 'rand': {'$gte': point}}, IMAGE_PROJECTION)
+                  .sort('rand', 1).limit(count))
+    if len(images) < count:
+        images += list(db.images.find({**query, 'rand': {'$lt': point}}, IMAGE_PROJECTION)
+                       .sort('rand', 1).limit(count - len(images)))
+    if images:
+        db.images.bulk_write([UpdateOne({'_id': i['_id']}, {'$set': {'rand': random.random()}})
+                              for i in images], ordered=False)
+    random.shuffle(images)
+    return images
+
+
+def set_image_wp_media(db, image_id, site, media_id, url):
+    """Remember where an upload lives in a WordPress media library, so it is sent only once per site."""
+    db.images.update_one({'_id': ObjectId(image_id)},
+                         {'$set': {'wp_media': {'site': site, 'id': media_id, 'url': url}}})
+
+
+def delete_image(db, project_id, image_id):
+    result = db.images.delete_one({'_id': ObjectId(image_id), 'project_id': project_id})
+    if result.deleted_count:
+        db.image_files.delete_many({'image_id': image_id})
+    return bool(result.deleted_count)
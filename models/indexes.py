@@ -0,0 +1,264 @@
+"""Declared MongoDB indexes and a query-plan check for the query shapes the app uses.
+
+    python -m models.indexes            # create missing indexes
+    python -m models.indexes --check    # also explain() every shape; exit 1 on a COLLSCAN
+
+Equality fields come first and sort fields last, so one index serves both the
+per-project lookups and the cross-project queue-depth aggregation. Indexes are
+never dropped automatically: the check lists undeclared ones so they can be
+removed by hand.
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+INDEX_SPECS = {
+    'users': [
+        IndexModel([('username', ASCENDING)], unique=True),
+    ],
+    'projects': [
+        IndexModel([('db_key', ASCENDING)], unique=True),
+        IndexModel([('updated_at', ASCENDING)]),
+        IndexModel([('created_at', DESCENDING)]),
+        IndexModel([('deleted_at', ASCENDING)], partialFilterExpression={'deleted_at': {'$exists': True}}),
+    ],
+    'api_tokens': [
+        IndexModel([('token_hash', ASCENDING)], unique=True),
+    ],
+    'api_keys': [
+        IndexModel([('provider', ASCENDING), ('is_active', ASCENDING), ('last_used_at', ASCENDING)]),
+        IndexModel([('is_active', ASCENDING), ('provider', ASCENDING)]),
+    ],
+    'keywords': [
+        IndexModel([('is_title_generated', ASCENDING), ('project_id', ASCENDING)]),
+        IndexModel([('project_id', ASCENDING), ('_id', ASCENDING)]),  # API pages
+        IndexModel([('project_id', ASCENDING), ('created_at', DESCENDING)]),
+        # Partial so keywords stored before normalization (no ``norm``) don't collide
+        IndexModel([('project_id', ASCENDING), ('norm', ASCENDING)], unique=True,
+                   partialFilterExpression={'norm': {'$exists': True}}),
+    ],
+    'blog_titles': [
+        IndexModel([('is_article_generated', ASCENDING), ('project_id', ASCENDING)]),
+        IndexModel([('project_id', ASCENDING), ('_id', ASCENDING)]),  # API pages
+        IndexModel([('project_id', ASCENDING), ('created_at', DESCENDING)]),
+    ],
+    'ads_titles': [
+        IndexModel([('is_generated', ASCENDING), ('project_id', ASCENDING)]),
+        IndexModel([('project_id', ASCENDING)]),
+    ],
+    'articles': [
+        IndexModel([('is_published', ASCENDING), ('project_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('project_id', ASCENDING), ('_id', ASCENDING)]),  # API pages
+        IndexModel([('project_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('is_published', ASCENDING), ('publish_at', ASCENDING)]),
+        IndexModel([('project_id', ASCENDING), ('publish_slot', ASCENDING), ('publish_at', ASCENDING)]),
+    ],
+    'article_revisions': [
+        IndexModel([('article_id', ASCENDING), ('rev', ASCENDING)], unique=True),
+        IndexModel([('project_id', ASCENDING)]),
+    ],
+    'ads_content': [IndexModel([('project_id', ASCENDING)])],
+    'bein_paragraphs': [IndexModel([('project_id', ASCENDING)])],
+    'info_blocks': [IndexModel([('project_id', ASCENDING)])],
+    'bullet_items': [IndexModel([('project_id', ASCENDING)])],
+    'images': [
+        IndexModel([('project_id', ASCENDING), ('tags', ASCENDING), ('rand', ASCENDING)]),
+        IndexModel([('project_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('project_id', ASCENDING), ('url', ASCENDING)], unique=True,
+                   partialFilterExpression={'url': {'$exists': True}}),
+        # Only uploads still converting, for the stale-upload sweep
+        IndexModel([('created_at', ASCENDING)], partialFilterExpression={'state': 'processing'}),
+    ],
+    'image_files': [
+        IndexModel([('image_id', ASCENDING), ('size', ASCENDING)], unique=True),
+        IndexModel([('project_id', ASCENDING)]),
+    ],
+    'feeds': [IndexModel([('project_id', ASCENDING)], unique=True)],
+    'profiles': [IndexModel([('created_at', DESCENDING)])],
+    # Import status documents go after a week
+    'import_jobs': [IndexModel([('created_at', ASCENDING)], expireAfterSeconds=7 * 24 * 3600)],
+    'generation_jobs': [
+        IndexModel([('project_id', ASCENDING), ('action', ASCENDING), ('state', ASCENDING)]),
+        # Finished or not, job records go after a week
+        IndexModel([('created_at', ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+    ],
+}
+
+_PID = '000000000000000000000000'
+
+# (caller, collection, filter, sort) for every query on a collection that grows with use
+QUERY_SHAPES = [
+    ('User.find_by_username', 'users', {'username': 'admin'}, None),
+    ('get_all_projects', 'projects', {'deleted_at': None}, [('created_at', DESCENDING)]),
+    ('get_deleting_projects', 'projects', {'deleted_at': {'$exists': True}}, None),
+    ('scheduler._sync_changed_projects', 'projects',
+     {'updated_at': {'$gte': datetime(2024, 1, 1, tzinfo=timezone.utc)}}, [('updated_at', ASCENDING)]),
+    ('get_next_key', 'api_keys', {'provider': 'openai', 'is_active': True}, [('last_used_at', ASCENDING)]),
+    ('get_active_providers', 'api_keys', {'is_active': True}, None),
+    ('get_random_keyword', 'keywords', {'project_id': _PID, 'is_title_generated': False}, None),
+    ('get_project_stats / purge_project', 'keywords', {'project_id': _PID}, None),
+    ('content.keywords', 'keywords', {'project_id': _PID}, [('created_at', DESCENDING)]),
+    ('get_queue_depths', 'keywords', {'is_title_generated': False}, None),
+    ('add_keywords', 'keywords', {'project_id': _PID, 'norm': 'keyword'}, None),
+    ('get_random_blog_title', 'blog_titles', {'project_id': _PID, 'is_article_generated': False}, None),
+    ('content.keywords', 'blog_titles', {'project_id': _PID}, [('created_at', DESCENDING)]),
+    ('get_minhash_docs', 'blog_titles',
+     {'project_id': _PID, 'minhash': {'$ne': None}, 'created_at': {'$gte': datetime(2024, 1, 1, tzinfo=timezone.utc)}},
+     [('created_at', ASCENDING)]),
+    ('get_queue_depths', 'blog_titles', {'is_article_generated': False}, None),
+    ('get_random_ads_title', 'ads_titles', {'project_id': _PID, 'is_generated': False}, None),
+    ('get_project_stats / purge_project', 'ads_titles', {'project_id': _PID}, None),
+    ('get_queue_depths', 'ads_titles', {'is_generated': False}, None),
+    ('get_random_unpublished_article', 'articles',
+     {'project_id': _PID, 'is_published': False, 'publish_at': None, 'duplicate_of': None,
+      'quality.score': {'$not': {'$lt': 40}}}, None),
+    ('get_minhash_docs', 'articles',
+     {'project_id': _PID, 'minhash': {'$ne': None}, 'created_at': {'$gte': datetime(2024, 1, 1, tzinfo=timezone.utc)}},
+     [('created_at', ASCENDING)]),
+    ('get_articles', 'articles', {'project_id': _PID}, [('created_at', DESCENDING)]),
+    ('get_articles(published)', 'articles', {'project_id': _PID, 'is_published': True},
+     [('created_at', DESCENDING)]),
+    ('get_queue_depths', 'articles', {'is_published': False}, None),
+    ('get_next_publish_at', 'articles', {'is_published': False, 'publish_at': {'$ne': None}},
+     [('publish_at', ASCENDING)]),
+    ('claim_due_articles', 'articles',
+     {'is_published': False, 'publish_at': {'$lte': datetime(2024, 1, 1, tzinfo=timezone.utc)}},
+     [('publish_at', ASCENDING)]),
+    ('get_auto_slots', 'articles',
+     {'project_id': _PID, 'is_published': False, 'publish_slot': 'auto', 'publish_at': {'$ne': None}},
+     [('publish_at', ASCENDING)]),
+    ('get_unscheduled_articles', 'articles',
+     {'project_id': _PID, 'is_published': False, 'publish_at': None, 'duplicate_of': None,
+      'quality.score': {'$not': {'$lt': 40}}},
+     [('created_at', ASCENDING)]),
+    ('score_backlog --project', 'articles', {'quality': None, 'project_id': _PID}, None),
+    ('list_revisions', 'article_revisions', {'article_id': _PID}, [('rev', DESCENDING)]),
+    ('get_revision', 'article_revisions', {'article_id': _PID, 'rev': {'$gte': 3, '$lt': 13}}, [('rev', ASCENDING)]),
+    ('purge_project', 'article_revisions', {'project_id': _PID}, None),
+    ('purge_project', 'ads_content', {'project_id': _PID}, None),
+    ('get_random_bein', 'bein_paragraphs', {'project_id': _PID}, None),
+    ('get_random_info', 'info_blocks', {'project_id': _PID}, None),
+    ('get_random_bullet', 'bullet_items', {'project_id': _PID}, None),
+    ('pick_images', 'images', {'project_id': _PID, 'tags': 'tag', 'rand': {'$gte': 0.5}}, [('rand', ASCENDING)]),
+    ('get_images', 'images', {'project_id': _PID}, [('created_at', DESCENDING)]),
+    ('get_images(tag)', 'images', {'project_id': _PID, 'tags': 'tag'}, [('created_at', DESCENDING)]),
+    ('add_image_links', 'images', {'project_id': _PID, 'url': 'https://example.com/a.webp'}, None),
+    ('fail_stale_uploads', 'images',
+     {'state': 'processing', 'created_at': {'$lt': datetime(2024, 1, 1, tzinfo=timezone.utc)}}, None),
+    ('get_image_file', 'image_files', {'image_id': _PID, 'size': 'large'}, None),
+    ('purge_project', 'image_files', {'project_id': _PID}, None),
+    ('get_feed', 'feeds', {'project_id': _PID}, None),
+    ('rebuild_feed', 'articles', {'project_id': _PID, 'is_published': True}, [('published_at', DESCENDING)]),
+    ('get_link_targets', 'articles',
+     {'project_id': _PID, 'is_published': True, 'published_at': {'$ne': None},
+      '$or': [{'published_at': {'$gt': datetime(2024, 1, 1, tzinfo=timezone.utc)}},
+              {'published_at': datetime(2024, 1, 1, tzinfo=timezone.utc), '_id': {'$gt': ObjectId(_PID)}}]},
+     [('published_at', ASCENDING), ('_id', ASCENDING)]),
+    ('get_profiles', 'profiles', {}, [('created_at', DESCENDING)]),
+    ('find_api_token', 'api_tokens', {'token_hash': '0' * 64, 'is_active': True}, None),
+    ('get_page', 'keywords', {'project_id': _PID, '_id': {'$gt': ObjectId(_PID)}}, [('_id', ASCENDING)]),
+    ('get_page', 'blog_titles', {'project_id': _PID, '_id': {'$gt': ObjectId(_PID)}}, [('_id', ASCENDING)]),
+    ('get_page', 'articles', {'project_id': _PID, '_id': {'$gt': ObjectId(_PID)}}, [('_id', ASCENDING)]),
+    ('get_import', 'import_jobs', {'_id': 'abc', 'project_id': _PID}, None),
+    ('submit_job', 'generation_jobs',
+     {'project_id': _PID, 'action': 'full', 'article_id': None, 'state': {'$in': ['queued', 'running']},
+      'updated_at': {'$gte': datetime(2024, 1, 1, tzinfo=timezone.utc)}}, None),
+]
+
+
+def ensure_indexes(db):
+    """Create any declared index that is missing. Safe to call repeatedly and concurrently."""
+    created = 0
+    for collection, models in INDEX_SPECS.items():
+        try:
+            existing = {tuple(info['key']) for info in db[collection].index_information().values()}
+            missing = [m for m in models if tuple(m.document['key'].items()) not in existing]
+            if missing:
+                db[collection].create_indexes(missing)
+                created += len(missing)
+        except ConnectionFailure as e:
+            logger.warning(f"Could not create indexes, MongoDB unavailable: {e}")
+            return created
+        except PyMongoError as e:
+            logger.warning(f"Could not create indexes on {collection}: {e}")
+    if created:
+        logger.info(f"Created {created} index(es)")
+    return created
+
+
+def _plan_stages(plan):
+    """Every ``stage`` name in an explain() plan tree (classic and slot-based engine layouts)."""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+def explain_query_shapes(db):
+    """Explain every declared query shape; returns a list of result dicts."""
+    results = []
+    for caller, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query).limit(50)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning = cursor.explain()['queryPlanner']['winningPlan']
+        stages = _plan_stages(winning)
+        results.append({
+            'caller': caller,
+            'collection': collection,
+            'query': query,
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages,
+            'in_memory_sort': 'SORT' in stages,
+        })
+    return results
+
+
+def undeclared_indexes(db):
+    """Indexes present in the database but not in INDEX_SPECS (``_id`` excluded)."""
+    extra = []
+    for collection, models in INDEX_SPECS.items():
+        declared = {tuple(m.document['key'].items()) for m in models}
+        for name, info in db[collection].index_information().items():
+            if name != '_id_' and tuple(info['key']) not in declared:
+                extra.append((collection, name))
+    return extra
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Create declared MongoDB indexes and verify query plans.')
+    parser.add_argument('--check', action='store_true', help='explain() every query shape; exit 1 on COLLSCAN')
+    args = parser.parse_args(argv)
+
+    from pymongo import MongoClient
+    from config import Config
+    db = MongoClient(Config.MONGO_URI, serverSelectionTimeoutMS=5000)[Config.MONGO_DB]
+    print(f"{ensure_indexes(db)} index(es) created")
+    if not args.check:
+        return 0
+
+    failed = False
+    for r in explain_query_shapes(db):
+        status = 'COLLSCAN' if r['collscan'] else ('SORT' if r['in_memory_sort'] else 'ok')
+        failed = failed or r['collscan']
+        print(f"{status:<9}{r['collection']:<17}{r['caller']:<36}{' > '.join(r['stages'])}")
+    for collection, name in undeclared_indexes(db):
+        print(f"undeclared index {collection}.{name}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
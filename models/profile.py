@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+from bson import ObjectId
+
+
+MAX_PROFILES = 200
+
+
+def save_profile(db, kind, target, mode, duration, report, memory_report='', user=''):
+    doc = {
+        'kind': kind,
+        'target': target,
+        'mode': mode,
+        'duration': duration,
+        'report': report,
+        'memory_report': memory_report,
+        'user': user,
+        'created_at': datetime.now(timezone.utc),
+    }
+    result = db.profiles.insert_one(doc)
+    # Keep only the most recent profiles
+    stale = db.profiles.find({}, {'_id': 1}).sort('created_at', -1).skip(MAX_PROFILES)
+    stale_ids = [d['_id'] for d in stale]
+    if stale_ids:
+        db.profiles.delete_many({'_id': {'$in': stale_ids}})
+    return str(result.inserted_id)
+
+
+def get_profiles(db, limit=50):
+    return list(db.profiles.find({}, {'report': 0, 'memory_report': 0}).sort('created_at', -1).limit(limit))
+
+
+def get_profile(db, profile_id):
+    return db.profiles.find_one({'_id': ObjectId(profile_id)})
+
+
+def delete_profile(db, profile_id):
+    db.profiles.delete_one({'_id': ObjectId(profile_id)})
+
+
+# --- Armed job profiles ---
+def arm_job_profile(db, job_id, mode='cprofile', user=''):
+    """Profile the next run of a scheduler job, in whichever process runs it."""
+    db.profile_triggers.update_one(
+        {'_id': job_id},
+        {'$set': {'mode': mode, 'user': user, 'created_at': datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+
+def pop_job_profile_trigger(db, job_id):
+    return db.profile_triggers.find_one_and_delete({'_id': job_id})
+
+
+def get_job_profile_trigger_ids(db):
+    return [t['_id'] for t in db.profile_triggers.find({}, {'_id': 1})]
+
+
+def get_job_profile_triggers(db):
+    return list(db.profile_triggers.find().sort('created_at', -1))
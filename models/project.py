@@ -1,6 +1,10 @@
 from datetime import datetime, timezone
 from bson import ObjectId
 
+# Collections holding per-project documents keyed by ``project_id`` (the project _id as a string)
+CONTENT_COLLECTIONS = ['keywords', 'blog_titles', 'ads_titles', 'articles', 'article_revisions',
+                       'ads_content', 'bein_paragraphs', 'info_blocks', 'bullet_items', 'images', 'image_files']
+
 
 def default_project():
     return {
@@ -29,6 +33,10 @@ def default_project():
             'bot_token': '',
             'chat_id': '',
         },
+        'simulation': {
+            'enabled': False,
+            'profile': 'healthy',
+        },
         'schedule': {
             'creation_enabled': False,
             'creation_interval_minutes': 60,
@@ -57,12 +65,15 @@ def create_project(db, data):
     return str(result.inserted_id)
 
 
-def get_project(db, project_id):
-    return db.projects.find_one({'_id': ObjectId(project_id)})
+def get_project(db, project_id, include_deleted=False):
+    query = {'_id': ObjectId(project_id)}
+    if not include_deleted:
+        query['deleted_at'] = None
+    return db.projects.find_one(query)
 
 
 def get_all_projects(db):
-    return list(db.projects.find().sort('created_at', -1))
+    return list(db.projects.find({'deleted_at': None}).sort('created_at', -1))
 
 
 def update_project(db, project_id, data):
@@ -70,10 +81,38 @@ def update_project(db, project_id, data):
     db.projects.update_one({'_id': ObjectId(project_id)}, {'$set': data})
 
 
+def soft_delete_project(db, project_id):
+    """Hide a project at once; services.purge removes its content in the background.
+
+    Returns False if the project does not exist or is already being deleted.
+    """
+    now = datetime.now(timezone.utc)
+    result = db.projects.update_one(
+        {'_id': ObjectId(project_id), 'deleted_at': None},
+        {'$set': {'deleted_at': now, 'updated_at': now,
+                  'purge': {'removed': 0, 'total': None, 'collection': None, 'updated_at': now}}},
+    )
+    if result.modified_count == 1:
+        db.feeds.delete_one({'project_id': project_id})
+        return True
+    return False
+
+
+def get_deleting_projects(db):
+    return list(db.projects.find({'deleted_at': {'$exists': True}}, {'name': 1, 'deleted_at': 1, 'purge': 1}))
+
+
+def set_purge_progress(db, project_id, **progress):
+    fields = {f'purge.{k}': v for k, v in progress.items()}
+    fields['purge.updated_at'] = datetime.now(timezone.utc)
+    db.projects.update_one({'_id': ObjectId(project_id)}, {'$set': fields})
+
+
 def delete_project(db, project_id):
+    """Delete a project and its content synchronously (small projects, e.g. a failed import)."""
     oid = ObjectId(project_id)
     db.projects.delete_one({'_id': oid})
     # Clean up related content
-    for col in ['keywords', 'blog_titles', 'ads_titles', 'articles',
-                'ads_content', 'bein_paragraphs', 'info_blocks', 'bullet_items']:
+    for col in CONTENT_COLLECTIONS:
         db[col].delete_many({'project_id': str(oid)})
+    db.feeds.delete_one({'project_id': str(oid)})
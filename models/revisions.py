@@ -0,0 +1,178 @@
+"""Article revision history stored as reverse deltas with periodic snapshots.
+
+The current version of an article always lives in the article document.
+Every time the body is replaced, the outgoing version is written to
+``article_revisions`` under its revision number. It is usually stored as a
+reverse delta: how to rebuild it from the version that replaced it. Every
+``SNAPSHOT_EVERY``-th revision is stored whole instead.
+
+To rebuild revision k, start from the nearest snapshot at or after k (or from
+the current article if there is none) and apply the deltas back down to k.
+That is at most ``SNAPSHOT_EVERY - 1`` deltas.
+
+Deltas are per chapter and per field, over word/tag tokens. An edit touching
+one paragraph of a 50 KB article costs a few hundred bytes once compressed.
+"""
+import difflib
+import json
+import re
+import zlib
+from datetime import datetime, timezone
+
+from bson import Binary, ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from models.article_body import article_body, encode_body
+
+SNAPSHOT_EVERY = 10
+
+_TOKEN = re.compile(r'<[^>]*>|\s+|[^\s<]+')
+
+
+class RevisionConflict(Exception):
+    """The article changed between reading it and saving a new version."""
+
+
+# --- Deltas ---
+def text_delta(new, old):
+    """Ops that turn ``new`` back into ``old``: int n > 0 copies n tokens, n < 0 skips -n, str inserts."""
+    if new == old:
+        return None
+    a, b = _TOKEN.findall(new), _TOKEN.findall(old)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(''.join(b[j1:j2]))
+    return ops
+
+
+def apply_text_delta(new, ops):
+    if ops is None:
+        return new
+    tokens, pos, out = _TOKEN.findall(new), 0, []
+    for op in ops:
+        if isinstance(op, str):
+            out.append(op)
+        elif op > 0:
+            out.extend(tokens[pos:pos + op])
+            pos += op
+        else:
+            pos -= op
+    return ''.join(out)
+
+
+def body_delta(new_chapters, new_faq, old_chapters, old_faq):
+    """Reverse delta of a whole body; each old chapter is diffed against the new chapter at its index."""
+    chapters = []
+    for i, old in enumerate(old_chapters):
+        new = new_chapters[i] if i < len(new_chapters) else {}
+        chapters.append([text_delta(new.get('title', ''), old.get('title', '')),
+                         text_delta(new.get('content', ''), old.get('content', ''))])
+    return {'chapters': chapters, 'faq': text_delta(new_faq, old_faq)}
+
+
+def apply_body_delta(new_chapters, new_faq, delta):
+    chapters = []
+    for i, (title_ops, content_ops) in enumerate(delta['chapters']):
+        new = new_chapters[i] if i < len(new_chapters) else {}
+        chapters.append({'title': apply_text_delta(new.get('title', ''), title_ops),
+                         'content': apply_text_delta(new.get('content', ''), content_ops)})
+    return chapters, apply_text_delta(new_faq, delta['faq'])
+
+
+def _pack(obj):
+    return Binary(zlib.compress(json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode(), 9))
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+# --- Storage ---
+def update_article_body(db, article_id, chapters, faq, reason='edit', extra=None):
+    """Replace an article's body, keeping the outgoing version as a revision; returns the new revision number.
+
+    ``extra`` fields are set on the article in the same update (e.g. a new signature).
+    Raises RevisionConflict if another writer saved a version in the meantime.
+    """
+    article = db.articles.find_one({'_id': ObjectId(article_id)})
+    if not article:
+        raise LookupError(f"Article {article_id} not found")
+    current = article.get('revision', 0)
+    old_chapters, old_faq = article_body(article)
+
+    doc = {
+        'article_id': str(article['_id']),
+        'project_id': article['project_id'],
+        'rev': current,
+        'reason': article.get('revision_reason', 'generated'),
+        'created_at': article.get('revised_at') or article.get('created_at'),
+        'replaced_at': datetime.now(timezone.utc),
+    }
+    if current % SNAPSHOT_EVERY == 0:
+        doc.update(kind='snapshot', data=_pack({'chapters': old_chapters, 'faq': old_faq}))
+    else:
+        doc.update(kind='delta', data=_pack(body_delta(chapters, faq, old_chapters, old_faq)))
+    try:
+        db.article_revisions.insert_one(doc)
+    except DuplicateKeyError:
+        raise RevisionConflict(f"Article {article_id} revision {current} was already saved") from None
+
+    fields = {**encode_body(chapters, faq), 'revision': current + 1, 'revision_reason': reason,
+              'revised_at': doc['replaced_at'], **(extra or {})}
+    unset = {'chapters': '', 'faq': ''}
+    if 'quality' not in fields:
+        # Scored again before it is published
+        unset['quality'] = ''
+    result = db.articles.update_one({'_id': article['_id'], 'revision': article.get('revision')},
+                                    {'$set': fields, '$unset': unset})
+    if not result.matched_count:
+        db.article_revisions.delete_one({'_id': doc['_id']})
+        raise RevisionConflict(f"Article {article_id} changed while saving")
+    return current + 1
+
+
+def list_revisions(db, article_id):
+    """Stored revisions of an article, newest first, without their data."""
+    return list(db.article_revisions.find({'article_id': str(article_id)}, {'data': 0}).sort('rev', -1))
+
+
+def get_revision(db, article_id, rev):
+    """(chapters, faq) of revision ``rev``; the current version is returned for the article's own revision."""
+    article = db.articles.find_one({'_id': ObjectId(article_id)})
+    if not article:
+        raise LookupError(f"Article {article_id} not found")
+    current = article.get('revision', 0)
+    if rev == current:
+        return article_body(article)
+    if not 0 <= rev < current:
+        raise LookupError(f"Article {article_id} has no revision {rev}")
+
+    # Everything from rev up to (and including) the first snapshot at or after it
+    docs = list(db.article_revisions.find({'article_id': str(article_id), 'rev': {'$gte': rev,
+                                                                              '$lt': rev + SNAPSHOT_EVERY}})
+                .sort('rev', 1))
+    chain = []
+    for doc in docs:
+        chain.append(doc)
+        if doc['kind'] == 'snapshot':
+            break
+    if chain and chain[-1]['kind'] == 'snapshot':
+        snapshot = _unpack(chain.pop()['data'])
+        chapters, faq = snapshot['chapters'], snapshot['faq']
+    else:
+        chapters, faq = article_body(article)
+    for doc in reversed(chain):
+        chapters, faq = apply_body_delta(chapters, faq, _unpack(doc['data']))
+    return chapters, faq
+
+
+def restore_revision(db, article_id, rev):
+    """Make revision ``rev`` current again (recorded as a new revision)."""
+    chapters, faq = get_revision(db, article_id, rev)
+    return update_article_body(db, article_id, chapters, faq, reason=f'restore {rev}')
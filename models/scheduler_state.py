@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+# --- Leases ---
+def acquire_lease(db, name, holder, lease_seconds, info=None):
+    """Take or renew the named lease; returns True if ``holder`` owns it afterwards.
+
+    Expiry is computed with the server clock ($$NOW), so hosts with skewed
+    clocks cannot both believe they hold the lease.
+    """
+    fields = {
+        'holder': holder,
+        'expires_at': {'$add': ['$$NOW', int(lease_seconds * 1000)]},
+        'renewed_at': '$$NOW',
+    }
+    if info is not None:
+        fields['info'] = {'$literal': info}
+    try:
+        doc = db.locks.find_one_and_update(
+            {'_id': name, '$or': [{'holder': holder}, {'$expr': {'$lt': ['$expires_at', '$$NOW']}}]},
+            [{'$set': fields}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # Someone else holds an unexpired lease, so the upsert collided with their document
+        return False
+    return bool(doc) and doc.get('holder') == holder
+
+
+def release_lease(db, name, holder):
+    db.locks.delete_one({'_id': name, 'holder': holder})
+
+
+def get_lease(db, name):
+    return db.locks.find_one({'_id': name})
+
+
+# --- Forwarded schedule changes ---
+def enqueue_scheduler_command(db, action, project_id):
+    db.scheduler_commands.insert_one({
+        'action': action,
+        'project_id': project_id,
+        'created_at': datetime.now(timezone.utc),
+    })
+
+
+def take_scheduler_commands(db, limit=500):
+    """Fetch and delete the oldest pending commands, in insertion order."""
+    commands = list(db.scheduler_commands.find().sort('_id', 1).limit(limit))
+    if commands:
+        # Only what was read: ObjectIds from other hosts are not ordered, so a range could take unread ones
+        db.scheduler_commands.delete_many({'_id': {'$in': [c['_id'] for c in commands]}})
+    return commands
+
+
+# --- Incremental job sync ---
+def get_sync_marker(db):
+    """``updated_at`` of the newest project whose schedule the leader has applied."""
+    doc = db.locks.find_one({'_id': 'project_sync'})
+    return doc['synced_at'] if doc else None
+
+
+def set_sync_marker(db, synced_at):
+    db.locks.update_one({'_id': 'project_sync'}, {'$set': {'synced_at': synced_at}}, upsert=True)
@@ -1,18 +1,49 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from bson import ObjectId
 
 
-class User(UserMixin):
+USER_CACHE_SIZE = 256
+USER_CACHE_TTL = 60  # seconds; bounds how long other processes may see a changed user
+
+
+class User:
+    """Dashboard user implementing the Flask-Login user protocol.
+
+    Slotted instead of subclassing UserMixin, since a cached user lives for the
+    cache TTL and one is held per active session.
+    """
+
+    __slots__ = ('id', 'username', 'password_hash', 'email', 'role', 'created_at')
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
     def __init__(self, user_data):
         self.id = str(user_data['_id'])
         self.username = user_data['username']
-        self.password_hash = user_data['password_hash']
+        self.password_hash = user_data.get('password_hash', '')
         self.email = user_data.get('email', '')
         self.role = user_data.get('role', 'admin')
         self.created_at = user_data.get('created_at')
 
+    def get_id(self):
+        return self.id
+
+    def __eq__(self, other):
+        return isinstance(other, User) and self.id == other.id
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        # Equal users (same id) hash alike, so users can key sets and dicts as with UserMixin
+        return hash(self.id)
+
     @staticmethod
     def create(db, username, password, email=''):
         user_doc = {
@@ -24,6 +55,7 @@ class User(UserMixin):
         }
         result = db.users.insert_one(user_doc)
         user_doc['_id'] = result.inserted_id
+        invalidate_user(str(result.inserted_id))
         return User(user_doc)
 
     @staticmethod
@@ -33,14 +65,45 @@ class User(UserMixin):
 
     @staticmethod
     def find_by_id(db, user_id):
-        doc = db.users.find_one({'_id': ObjectId(user_id)})
+        # The password hash is only needed at login, which goes through find_by_username
+        doc = db.users.find_one({'_id': ObjectId(user_id)}, {'password_hash': 0})
         return User(doc) if doc else None
 
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return bool(self.password_hash) and check_password_hash(self.password_hash, password)
+
+
+# --- Session user cache ---
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def invalidate_user(user_id=None):
+    """Drop one cached user (or all of them); call after changing a user document."""
+    with _cache_lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(str(user_id), None)
 
 
 def load_user_by_id(user_id):
+    """Flask-Login user loader: LRU cache with a TTL in front of the users collection."""
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry and entry[0] > now:
+            _cache.move_to_end(user_id)
+            return entry[1]
+
     from app import get_db
-    db = get_db()
-    return User.find_by_id(db, user_id)
+    user = User.find_by_id(get_db(), user_id)
+    with _cache_lock:
+        if user:
+            _cache[user_id] = (now + USER_CACHE_TTL, user)
+            _cache.move_to_end(user_id)
+            while len(_cache) > USER_CACHE_SIZE:
+                _cache.popitem(last=False)
+        else:
+            _cache.pop(user_id, None)
+    return user
@@ -0,0 +1,285 @@
+"""JSON API for integrations, mounted at /api/v1.
+
+Every request needs ``Authorization: Bearer <token>`` with a token created on
+the API keys page. Listings are paged with ``?after=<last id>&limit=N``
+(``next`` in the response is the id to pass on), and ``?fields=a,b`` limits
+the fields returned. GETs carry an ETag and answer ``If-None-Match`` with 304.
+Keywords and titles take bulk creates of up to ``MAX_BULK`` items per call.
+Keywords, titles and articles also take bulk updates of allowed fields.
+"""
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import Blueprint, current_app, g, jsonify, request, abort
+from werkzeug.exceptions import HTTPException
+
+from app import get_db
+from models.api_token import find_api_token
+from models.article_body import LISTING_PROJECTION
+from models.content import get_page, get_article, get_project_stats, bulk_update
+from models.project import get_project, get_all_projects
+from services.importer import add_rows
+from services.jobs import ACTIONS as GENERATION_ACTIONS, submit_job, get_job
+from services.publish_queue import publish_timer
+
+api_bp = Blueprint('api', __name__)
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MAX_BULK = 10000
+
+_SECRET_FIELDS = [('wordpress', 'app_password'), ('telegram', 'bot_token')]
+
+
+def _bool(value):
+    if not isinstance(value, bool):
+        raise ValueError('must be true or false')
+    return value
+
+
+def _text(value):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError('must be a non-empty string')
+    return value.strip()
+
+
+def _publish_at(value):
+    if value is None:
+        return {'publish_at': None, 'publish_slot': None}
+    when = datetime.fromisoformat(value)
+    when = when.replace(tzinfo=timezone.utc) if when.tzinfo is None else when.astimezone(timezone.utc)
+    return {'publish_at': when, 'publish_slot': 'manual', 'publish_attempts': 0, 'publish_error': None}
+
+
+# resource -> collection, readable fields, updatable fields (field -> validator; a dict result is $set as is)
+RESOURCES = {
+    'keywords': ('keywords', ('text', 'norm', 'is_title_generated', 'created_at'),
+                 {'is_title_generated': _bool}),
+    'titles': ('blog_titles', ('content', 'keyword', 'is_article_generated', 'created_at'),
+               {'is_article_generated': _bool, 'keyword': _text}),
+    'articles': ('articles', ('article_title', 'slug', 'tag', 'chapter_count', 'reference', 'revision',
+                              'duplicate_of', 'similarity', 'is_published', 'publish_at', 'publish_slot',
+                              'publish_error', 'wp_post_id', 'wp_post_url', 'published_at', 'created_at'),
+                 {'slug': _text, 'tag': _text, 'publish_at': _publish_at}),
+}
+# Listing filters: query parameter -> field
+FILTERS = {
+    'keywords': {'used': 'is_title_generated'},
+    'titles': {'used': 'is_article_generated'},
+    'articles': {'published': 'is_published'},
+}
+
+
+@api_bp.before_request
+def _authenticate():
+    supplied = request.headers.get('Authorization', '')
+    if not supplied.startswith('Bearer '):
+        abort(401)
+    token = find_api_token(get_db(), supplied.removeprefix('Bearer ').strip())
+    if not token:
+        abort(401)
+    g.api_token = token
+
+
+@api_bp.errorhandler(HTTPException)
+def _error(e):
+    response = jsonify({'error': e.description if e.code != 401 else 'A valid bearer token is required.'})
+    response.status_code = e.code
+    if e.code == 401:
+        response.headers['WWW-Authenticate'] = 'Bearer'
+    return response
+
+
+def _json(value):
+    if isinstance(value, dict):
+        return {('id' if k == '_id' else k): _json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json(v) for v in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(value, bytes):
+        return None
+    return value
+
+
+def _conditional(payload):
+    """JSON response with an ETag; a matching If-None-Match gets an empty 304."""
+    response = jsonify(_json(payload))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def _project_or_404(project_id):
+    try:
+        project = get_project(get_db(), project_id)
+    except InvalidId:
+        project = None
+    if not project:
+        abort(404, description='Project not found.')
+    return project
+
+
+def _fields(allowed):
+    """Requested fields (all readable ones by default); unknown names are a 400."""
+    requested = [f for f in request.args.get('fields', '').split(',') if f]
+    unknown = set(requested) - set(allowed)
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested or list(allowed)
+
+
+def _limit():
+    try:
+        return max(1, min(int(request.args.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        abort(400, description='limit must be a number.')
+
+
+def _body(key):
+    data = request.get_json(silent=True)
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        abort(400, description=f"Expected a JSON object with a '{key}' list.")
+    if len(items) > MAX_BULK:
+        abort(413, description=f"At most {MAX_BULK} {key} per request.")
+    return data, items
+
+
+def _strip_secrets(project):
+    for section, field in _SECRET_FIELDS:
+        if project.get(section, {}).get(field):
+            project[section][field] = ''
+    return project
+
+
+# --- Projects ---
+@api_bp.route('/projects')
+def list_projects():
+    projects = [_strip_secrets(p) for p in get_all_projects(get_db())]
+    requested = [f for f in request.args.get('fields', '').split(',') if f]
+    if requested:
+        projects = [{k: v for k, v in p.items() if k == '_id' or k in requested} for p in projects]
+    return _conditional({'items': projects})
+
+
+@api_bp.route('/projects/<project_id>')
+def project_detail(project_id):
+    project = _strip_secrets(_project_or_404(project_id))
+    project['stats'] = get_project_stats(get_db(), project_id)
+    return _conditional(project)
+
+
+# --- Keywords, titles, articles ---
+@api_bp.route('/projects/<project_id>/<any(keywords, titles, articles):resource>')
+def list_resource(project_id, resource):
+    _project_or_404(project_id)
+    collection, readable, _ = RESOURCES[resource]
+    fields = _fields(readable)
+    query = {}
+    for param, field in FILTERS[resource].items():
+        if param in request.args:
+            query[field] = request.args[param].lower() in ('1', 'true', 'yes')
+    limit = _limit()
+    try:
+        items = get_page(get_db(), collection, project_id, query, request.args.get('after'), limit,
+                         {f: 1 for f in fields})
+    except InvalidId:
+        abort(400, description='after must be an id from a previous page.')
+    return _conditional({'items': items, 'next': items[-1]['_id'] if len(items) == limit else None})
+
+
+@api_bp.route('/projects/<project_id>/articles/<article_id>')
+def article_detail(project_id, article_id):
+    _project_or_404(project_id)
+    fields = _fields(RESOURCES['articles'][1] + ('chapters', 'faq'))
+    db = get_db()
+    try:
+        if 'chapters' in fields or 'faq' in fields:
+            article = get_article(db, article_id)
+        else:
+            article = db.articles.find_one({'_id': ObjectId(article_id)}, LISTING_PROJECTION)
+    except InvalidId:
+        article = None
+    if not article or article['project_id'] != project_id:
+        abort(404, description='Article not found.')
+    return _conditional({k: v for k, v in article.items() if k == '_id' or k in fields})
+
+
+@api_bp.route('/projects/<project_id>/<any(keywords, titles):resource>', methods=['POST'])
+def create_resource(project_id, resource):
+    """Bulk create: {"keywords": ["..."]} or {"titles": ["..." | {"title", "keyword"}], "keyword": "default"}."""
+    _project_or_404(project_id)
+    data, items = _body(resource)
+    if resource == 'keywords':
+        rows = [(k,) for k in items if isinstance(k, str) and k.strip()]
+        kind = 'keywords'
+    else:
+        rows = []
+        for t in items:
+            if isinstance(t, dict) and isinstance(t.get('title'), str):
+                rows.append((t['title'], t.get('keyword') or ''))
+            elif isinstance(t, str):
+                rows.append((t,))
+        kind = 'titles'
+    added = add_rows(get_db(), project_id, kind, rows, str(data.get('keyword', '')))
+    return jsonify({'received': len(items), 'added': added, 'skipped': len(items) - added}), 201
+
+
+@api_bp.route('/projects/<project_id>/<any(keywords, titles, articles):resource>', methods=['PATCH'])
+def update_resource(project_id, resource):
+    """Bulk update: {"updates": [{"id": "...", "<field>": value, ...}]} with the resource's updatable fields."""
+    _project_or_404(project_id)
+    collection, _, updatable = RESOURCES[resource]
+    _, items = _body('updates')
+    updates, errors = [], []
+    for i, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError('must be an object')
+            doc_id = str(ObjectId(item.get('id')))
+            fields = {}
+            for field, value in item.items():
+                if field == 'id':
+                    continue
+                if field not in updatable:
+                    raise ValueError(f"{field} cannot be updated")
+                parsed = updatable[field](value)
+                fields.update(parsed if isinstance(parsed, dict) else {field: parsed})
+            updates.append((doc_id, fields))
+        except (InvalidId, TypeError, ValueError) as e:
+            errors.append({'index': i, 'error': str(e)})
+    if errors:
+        return jsonify({'error': 'Invalid updates; nothing was changed.', 'details': errors[:100]}), 400
+    matched, modified = bulk_update(get_db(), collection, project_id, updates)
+    if resource == 'articles' and any('publish_at' in f for _, f in updates):
+        publish_timer.wake()
+    return jsonify({'matched': matched, 'modified': modified})
+
+
+# --- Generation jobs ---
+@api_bp.route('/projects/<project_id>/jobs', methods=['POST'])
+def create_job(project_id):
+    """Start a generation job: {"action": "keywords" | "titles" | "article" | "ads" | "supplementary" | "full"},
+    or {"action": "regenerate", "article_id": ...}."""
+    _project_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    if data.get('action') not in GENERATION_ACTIONS:
+        abort(400, description=f"action must be one of: {', '.join(GENERATION_ACTIONS)}")
+    try:
+        job_id, created = submit_job(current_app._get_current_object(), project_id, data['action'],
+                                     data.get('article_id') or None)
+    except ValueError as e:
+        abort(400, description=str(e))
+    return jsonify(_json({**get_job(get_db(), job_id), 'created': created})), 202
+
+
+@api_bp.route('/projects/<project_id>/jobs/<job_id>')
+def job_detail(project_id, job_id):
+    job = get_job(get_db(), job_id, project_id)
+    if not job:
+        abort(404, description='Job not found.')
+    return _conditional(job)
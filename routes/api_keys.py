@@ -3,9 +3,11 @@ from flask_login import login_required
 
 from app import get_db, get_fernet
 from models.api_key import (
-    PROVIDERS, create_api_key, get_all_api_keys, get_api_key,
+    create_api_key, get_all_api_keys,
     delete_api_key, toggle_api_key, reset_key_errors,
 )
+from models.api_token import create_api_token, get_all_api_tokens, revoke_api_token
+from services.ai_provider import ProviderRegistry
 from translations import get_text
 
 api_keys_bp = Blueprint('api_keys', __name__)
@@ -24,7 +26,8 @@ def list_keys():
     # Mask actual key values
     for k in keys:
         k['key_masked'] = '***' + k['key'][-8:] if len(k['key']) > 8 else '***'
-    return render_template('api_keys/list.html', keys=keys, providers=PROVIDERS)
+    return render_template('api_keys/list.html', keys=keys, providers=ProviderRegistry.list_providers(),
+                           tokens=get_all_api_tokens(db), new_token=session.pop('new_api_token', None))
 
 
 @api_keys_bp.route('/add', methods=['POST'])
@@ -35,7 +38,7 @@ def add_key():
     key = request.form.get('api_key', '').strip()
     name = request.form.get('name', '').strip()
 
-    if provider not in PROVIDERS:
+    if provider not in ProviderRegistry.list_providers():
         flash(_t('invalid_provider'), 'danger')
     elif not key:
         flash(_t('api_key_required'), 'danger')
@@ -71,3 +74,22 @@ def delete(key_id):
     delete_api_key(db, key_id)
     flash(_t('key_deleted'), 'success')
     return redirect(url_for('api_keys.list_keys'))
+
+
+# --- Tokens for the JSON API (/api/v1) ---
+@api_keys_bp.route('/tokens', methods=['POST'])
+@login_required
+def add_token():
+    _, token = create_api_token(get_db(), request.form.get('name', '').strip())
+    # Shown once on the next page load; only its hash is stored
+    session['new_api_token'] = token
+    flash(_t('api_token_created'), 'success')
+    return redirect(url_for('api_keys.list_keys'))
+
+
+@api_keys_bp.route('/tokens/<token_id>/revoke', methods=['POST'])
+@login_required
+def revoke_token(token_id):
+    revoke_api_token(get_db(), token_id)
+    flash(_t('api_token_revoked'), 'success')
+    return redirect(url_for('api_keys.list_keys'))
@@ -1,8 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from flask_login import login_user, logout_user, login_required
+from flask_login import login_user, logout_user, login_required, current_user
 
 from app import get_db
-from models.user import User
+from models.user import User, invalidate_user
 from translations import get_text
 
 auth_bp = Blueprint('auth', __name__)
@@ -34,6 +34,7 @@ def login():
 @auth_bp.route('/logout')
 @login_required
 def logout():
+    invalidate_user(current_user.id)
     logout_user()
     return redirect(url_for('auth.login'))
 
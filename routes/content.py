@@ -1,10 +1,21 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+import os
+import re
+import tempfile
+
+from flask import (Blueprint, Response, render_template, request, redirect, url_for, flash, session, jsonify,
+                   abort, current_app)
 from flask_login import login_required
 
-from app import get_db, get_fernet
+from app import get_db
+from config import Config
 from models.project import get_project, get_all_projects
 from models.content import get_project_stats, get_articles, get_article
-from services.content_generator import ContentGenerator
+from models.image import add_image_links, get_images, get_image_tags, get_image_file, delete_image
+from models.revisions import RevisionConflict, list_revisions, get_revision, restore_revision
+from services.dedup import resign_article
+from services.images import submit_upload
+from services.importer import KINDS as IMPORT_KINDS, start_import, get_import
+from services.jobs import ACTIONS as GENERATION_ACTIONS, ARTICLE_ACTIONS, submit_job, get_job, stream_events
 from translations import get_text
 
 content_bp = Blueprint('content', __name__)
@@ -49,7 +60,8 @@ def articles(project_id):
 
     return render_template('content/articles.html',
                            project=project, articles=article_list,
-                           stats=stats, filter_type=filter_type)
+                           stats=stats, filter_type=filter_type,
+                           job_id=request.args.get('job', ''))
 
 
 @content_bp.route('/<project_id>/articles/<article_id>')
@@ -61,7 +73,54 @@ def article_detail(project_id, article_id):
     if not project or not article:
         flash(_t('project_not_found'), 'danger')
         return redirect(url_for('content.overview'))
-    return render_template('content/article_detail.html', project=project, article=article)
+    return render_template('content/article_detail.html', project=project, article=article,
+                           revisions=list_revisions(db, article_id), viewing=None,
+                           job_id=request.args.get('job', ''))
+
+
+@content_bp.route('/<project_id>/articles/<article_id>/revisions/<int:rev>')
+@login_required
+def article_revision(project_id, article_id, rev):
+    db = get_db()
+    project = get_project(db, project_id)
+    article = get_article(db, article_id)
+    if not project or not article:
+        flash(_t('project_not_found'), 'danger')
+        return redirect(url_for('content.overview'))
+    try:
+        article['chapters'], article['faq'] = get_revision(db, article_id, rev)
+    except LookupError:
+        flash(_t('revision_not_found'), 'danger')
+        return redirect(url_for('content.article_detail', project_id=project_id, article_id=article_id))
+    return render_template('content/article_detail.html', project=project, article=article,
+                           revisions=list_revisions(db, article_id), viewing=rev)
+
+
+@content_bp.route('/<project_id>/articles/<article_id>/revisions/<int:rev>/restore', methods=['POST'])
+@login_required
+def restore_article_revision(project_id, article_id, rev):
+    try:
+        db = get_db()
+        restore_revision(db, article_id, rev)
+        resign_article(db, get_article(db, article_id))
+        flash(_t('revision_restored', rev=rev), 'success')
+    except (LookupError, RevisionConflict) as e:
+        flash(f'{_t("error")}: {e}', 'danger')
+    return redirect(url_for('content.article_detail', project_id=project_id, article_id=article_id))
+
+
+@content_bp.route('/<project_id>/articles/<article_id>/regenerate', methods=['POST'])
+@login_required
+def regenerate_article(project_id, article_id):
+    db = get_db()
+    project = get_project(db, project_id)
+    article = get_article(db, article_id)
+    if not project or not article:
+        flash(_t('project_not_found'), 'danger')
+        return redirect(url_for('content.overview'))
+    job_id, created = submit_job(current_app._get_current_object(), project_id, 'regenerate', article_id)
+    flash(_t('generation_started') if created else _t('generation_already_running'), 'success')
+    return redirect(url_for('content.article_detail', project_id=project_id, article_id=article_id, job=job_id))
 
 
 @content_bp.route('/<project_id>/keywords')
@@ -77,48 +136,181 @@ def keywords(project_id):
     titles = list(db.blog_titles.find({'project_id': project_id}).sort('created_at', -1).limit(200))
 
     return render_template('content/keywords.html',
-                           project=project, keywords=kw_list, titles=titles)
+                           project=project, keywords=kw_list, titles=titles,
+                           import_id=request.args.get('import', ''))
+
+
+@content_bp.route('/<project_id>/import', methods=['POST'])
+@login_required
+def import_list(project_id):
+    db = get_db()
+    if not get_project(db, project_id):
+        flash(_t('project_not_found'), 'danger')
+        return redirect(url_for('content.overview'))
+
+    upload = request.files.get('file')
+    kind = request.form.get('kind', 'keywords')
+    if not upload or not upload.filename or kind not in IMPORT_KINDS:
+        flash(_t('import_no_file'), 'danger')
+        return redirect(url_for('content.keywords', project_id=project_id))
+
+    # Saved to disk in chunks; the import thread streams it from there
+    fd, path = tempfile.mkstemp(prefix='lagos-import-')
+    with os.fdopen(fd, 'wb') as f:
+        upload.save(f)
+    import_id = start_import(db, project_id, kind, path, upload.filename,
+                             keyword=request.form.get('keyword', '').strip())
+    flash(_t('import_started'), 'success')
+    return redirect(url_for('content.keywords', project_id=project_id, **{'import': import_id}))
+
+
+@content_bp.route('/<project_id>/import/<import_id>')
+@login_required
+def import_status(project_id, import_id):
+    status = get_import(get_db(), import_id, project_id)
+    if not status:
+        abort(404)
+    return jsonify(status)
 
 
 @content_bp.route('/<project_id>/generate', methods=['POST'])
 @login_required
 def generate(project_id):
+    """Queue a generation action as a background job; JSON clients get the job URLs back (202)."""
     db = get_db()
     project = get_project(db, project_id)
+    wants_json = request.accept_mimetypes.best == 'application/json'
     if not project:
+        if wants_json:
+            abort(404)
         flash(_t('project_not_found'), 'danger')
         return redirect(url_for('content.overview'))
 
     action = request.form.get('action', '')
-    gen = ContentGenerator(db, get_fernet())
+    if action not in GENERATION_ACTIONS or action in ARTICLE_ACTIONS:
+        if wants_json:
+            return jsonify({'error': 'unknown action',
+                            'actions': [a for a in GENERATION_ACTIONS if a not in ARTICLE_ACTIONS]}), 400
+        flash(_t('unknown_action'), 'danger')
+        return redirect(url_for('content.articles', project_id=project_id))
+
+    job_id, created = submit_job(current_app._get_current_object(), project_id, action)
+    if wants_json:
+        return jsonify({
+            'job_id': job_id,
+            'created': created,
+            'status_url': url_for('content.job_status', project_id=project_id, job_id=job_id),
+            'events_url': url_for('content.job_events', project_id=project_id, job_id=job_id),
+        }), 202
+    flash(_t('generation_started') if created else _t('generation_already_running'), 'success')
+    return redirect(url_for('content.articles', project_id=project_id, job=job_id))
 
+
+@content_bp.route('/<project_id>/jobs/<job_id>')
+@login_required
+def job_status(project_id, job_id):
+    job = get_job(get_db(), job_id, project_id)
+    if not job:
+        abort(404)
+    return jsonify(job)
+
+
+@content_bp.route('/<project_id>/jobs/<job_id>/events')
+@login_required
+def job_events(project_id, job_id):
+    """Server-Sent Events for a generation job; resumes after Last-Event-ID."""
+    db = get_db()
+    if not get_job(db, job_id, project_id):
+        abort(404)
+    after = request.headers.get('Last-Event-ID') or request.args.get('after', '0')
+    after = int(after) if after.isdigit() else 0
+    return Response(stream_events(db, job_id, after), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def _image_tags(value):
+    return [t for t in re.split(r'[,،\n]', value) if t.strip()]
+
+
+@content_bp.route('/<project_id>/images')
+@login_required
+def images(project_id):
+    db = get_db()
+    project = get_project(db, project_id)
+    if not project:
+        flash(_t('project_not_found'), 'danger')
+        return redirect(url_for('content.overview'))
+    tag = request.args.get('tag', '')
+    return render_template('content/images.html', project=project, images=get_images(db, project_id, tag or None),
+                           tags=get_image_tags(db, project_id), tag=tag)
+
+
+@content_bp.route('/<project_id>/images/upload', methods=['POST'])
+@login_required
+def upload_images(project_id):
+    """Queue uploaded files for WebP conversion; they appear in the library once converted."""
+    db = get_db()
+    if not get_project(db, project_id):
+        flash(_t('project_not_found'), 'danger')
+        return redirect(url_for('content.overview'))
+    tags = _image_tags(request.form.get('tags', ''))
+    files = [f for f in request.files.getlist('files') if f and f.filename]
+    if not files or not tags:
+        flash(_t('images_need_files_and_tags'), 'danger')
+        return redirect(url_for('content.images', project_id=project_id))
+
+    max_bytes = Config.IMAGE_MAX_UPLOAD_MB * 1024 * 1024
+    queued, too_large = 0, 0
     try:
-        if action == 'keywords':
-            count = gen.generate_keywords(project)
-            flash(_t('generated_keywords', count=count), 'success')
-        elif action == 'titles':
-            b, a = gen.generate_titles(project)
-            flash(_t('generated_titles', b=b, a=a), 'success')
-        elif action == 'article':
-            aid = gen.generate_article(project)
-            if aid:
-                flash(_t('article_generated'), 'success')
-            else:
-                flash(_t('no_titles_available'), 'warning')
-        elif action == 'ads':
-            gen.generate_ads_content(project)
-            flash(_t('ads_generated'), 'success')
-        elif action == 'supplementary':
-            b = gen.generate_bein_paragraphs(project)
-            i = gen.generate_info_blocks(project)
-            bl = gen.generate_bullet_items(project)
-            flash(_t('supplementary_generated', b=b, i=i, bl=bl), 'success')
-        elif action == 'full':
-            gen.run_full_pipeline(project)
-            flash(_t('pipeline_completed'), 'success')
-        else:
-            flash(_t('unknown_action'), 'danger')
-    except Exception as e:
-        flash(_t('generation_error', e=e), 'danger')
-
-    return redirect(url_for('content.articles', project_id=project_id))
+        for upload in files:
+            data = upload.read(max_bytes + 1)
+            if len(data) > max_bytes:
+                too_large += 1
+                continue
+            submit_upload(db, project_id, upload.filename, data, tags, request.form.get('alt', '').strip())
+            queued += 1
+    except RuntimeError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('content.images', project_id=project_id))
+    flash(_t('images_queued', count=queued), 'success')
+    if too_large:
+        flash(_t('images_too_large', count=too_large, mb=Config.IMAGE_MAX_UPLOAD_MB), 'danger')
+    return redirect(url_for('content.images', project_id=project_id))
+
+
+@content_bp.route('/<project_id>/images/links', methods=['POST'])
+@login_required
+def add_images_by_link(project_id):
+    """Add images hosted elsewhere, one URL per line (e.g. the legacy link_image site_links)."""
+    db = get_db()
+    if not get_project(db, project_id):
+        flash(_t('project_not_found'), 'danger')
+        return redirect(url_for('content.overview'))
+    tags = _image_tags(request.form.get('tags', ''))
+    urls = request.form.get('urls', '').splitlines()
+    if not tags:
+        flash(_t('images_need_files_and_tags'), 'danger')
+        return redirect(url_for('content.images', project_id=project_id))
+    added = add_image_links(db, project_id, urls, tags, request.form.get('alt', '').strip())
+    flash(_t('images_added', count=added), 'success')
+    return redirect(url_for('content.images', project_id=project_id))
+
+
+@content_bp.route('/<project_id>/images/<image_id>/<size>.webp')
+@login_required
+def image_file(project_id, image_id, size):
+    rendition = get_image_file(get_db(), image_id, size)
+    if not rendition or rendition['project_id'] != project_id:
+        abort(404)
+    response = Response(bytes(rendition['data']), mimetype='image/webp')
+    # Renditions never change; a re-upload is a new image id
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
+@content_bp.route('/<project_id>/images/<image_id>/delete', methods=['POST'])
+@login_required
+def remove_image(project_id, image_id):
+    delete_image(get_db(), project_id, image_id)
+    flash(_t('image_deleted'), 'success')
+    return redirect(url_for('content.images', project_id=project_id, tag=request.form.get('tag', '')))
@@ -0,0 +1,66 @@
+"""Public RSS and Atom feeds of each project's published articles.
+
+Feeds are rendered when an article is published (models/feed.py). A fetch is
+served from this process's cache for ``FEED_CACHE_SECONDS``. After that, one
+read of the feed's ETags shows whether the cached copy is still current. Only
+a changed feed is read in full. ``If-None-Match`` and ``If-Modified-Since``
+are answered with 304.
+"""
+import threading
+import time
+
+from bson.errors import InvalidId
+from flask import Blueprint, Response, current_app, request, abort
+
+from app import get_db
+from models.feed import get_feed, get_feed_etags
+
+feeds_bp = Blueprint('feeds', __name__)
+
+MIMETYPES = {'rss': 'application/rss+xml', 'atom': 'application/atom+xml'}
+
+# project_id -> {'checked': monotonic time, 'etags', 'updated_at', 'rss' and/or 'atom'}
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cached_feed(project_id, fmt):
+    ttl = current_app.config['FEED_CACHE_SECONDS']
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(project_id)
+    if entry and fmt in entry:
+        if now - entry['checked'] < ttl:
+            return entry
+        current = get_feed_etags(get_db(), project_id)
+        if current and current.get('etags') == entry['etags']:
+            entry['checked'] = now
+            return entry
+
+    feed = get_feed(get_db(), project_id, fmt)
+    with _cache_lock:
+        if not feed:
+            _cache.pop(project_id, None)
+            return None
+        fresh = {'checked': now, 'etags': feed['etags'], 'updated_at': feed['updated_at'], fmt: feed[fmt]}
+        if entry and entry['etags'] == feed['etags']:
+            # Keep the other format; it is from the same rendering
+            fresh = {**entry, **fresh}
+        _cache[project_id] = fresh
+    return fresh
+
+
+@feeds_bp.route('/<project_id>/<any(rss, atom):fmt>.xml')
+def feed(project_id, fmt):
+    try:
+        entry = _cached_feed(project_id, fmt)
+    except InvalidId:
+        entry = None
+    if not entry:
+        abort(404)
+    response = Response(entry[fmt], mimetype=MIMETYPES[fmt])
+    response.set_etag(entry['etags'][fmt])
+    response.last_modified = entry['updated_at']
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['FEED_CACHE_SECONDS']
+    return response.make_conditional(request)
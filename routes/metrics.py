@@ -0,0 +1,37 @@
+import hmac
+
+from flask import Blueprint, Response, current_app, request, abort
+
+from app import get_db
+from models.content import get_queue_depths
+from services.metrics import QUEUE_DEPTH, render_metrics
+from services.scheduler import scheduler, dispatcher
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+def _authorized(token):
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint. Disabled until METRICS_TOKEN is set; labels include project and key ids."""
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        abort(404)
+    if not _authorized(token):
+        abort(401)
+
+    QUEUE_DEPTH.clear()
+    try:
+        for pid, queues in get_queue_depths(get_db()).items():
+            for queue, count in queues.items():
+                QUEUE_DEPTH.set(count, project=pid, queue=queue)
+    except Exception as e:
+        current_app.logger.warning(f"Could not sample queue depths: {e}")
+    QUEUE_DEPTH.set(len(scheduler.get_jobs()), project='', queue='scheduler_jobs')
+    QUEUE_DEPTH.set(dispatcher.pending(), project='', queue='scheduler_pending')
+
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,72 @@
+from functools import wraps
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, abort
+from flask_login import login_required, current_user
+
+from app import get_db
+from models.profile import (
+    get_profiles, get_profile, delete_profile, arm_job_profile, get_job_profile_triggers,
+)
+from services.profiler import PROFILE_MODES, SLOW_COMMANDS
+from services.scheduler import get_job_status
+from translations import get_text
+
+profiling_bp = Blueprint('profiling', __name__)
+
+
+def _t(key, **kwargs):
+    lang = session.get('lang', 'fa')
+    return get_text(key, lang, **kwargs)
+
+
+def admin_required(view):
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if getattr(current_user, 'role', '') != 'admin':
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapped
+
+
+@profiling_bp.route('/')
+@admin_required
+def index():
+    db = get_db()
+    return render_template('profiling/list.html',
+                           profiles=get_profiles(db),
+                           triggers=get_job_profile_triggers(db),
+                           slow_commands=list(SLOW_COMMANDS)[:50],
+                           jobs=get_job_status(),
+                           modes=PROFILE_MODES)
+
+
+@profiling_bp.route('/arm', methods=['POST'])
+@admin_required
+def arm():
+    job_id = request.form.get('job_id', '').strip()
+    mode = request.form.get('mode', 'cprofile')
+    if not job_id or mode not in PROFILE_MODES:
+        flash(_t('unknown_action'), 'danger')
+    else:
+        arm_job_profile(get_db(), job_id, mode, user=current_user.username)
+        flash(_t('profile_armed', job=job_id), 'success')
+    return redirect(url_for('profiling.index'))
+
+
+@profiling_bp.route('/<profile_id>')
+@admin_required
+def detail(profile_id):
+    profile = get_profile(get_db(), profile_id)
+    if not profile:
+        flash(_t('profile_not_found'), 'danger')
+        return redirect(url_for('profiling.index'))
+    return render_template('profiling/detail.html', profile=profile)
+
+
+@profiling_bp.route('/<profile_id>/delete', methods=['POST'])
+@admin_required
+def delete(profile_id):
+    delete_profile(get_db(), profile_id)
+    flash(_t('profile_deleted'), 'success')
+    return redirect(url_for('profiling.index'))
@@ -1,14 +1,27 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, Response, jsonify, abort
 from flask_login import login_required
 
 from app import get_db
-from models.project import create_project, get_project, get_all_projects, update_project, delete_project
+from models.feed import refresh_feed_channel
+from models.project import (
+    create_project, get_project, get_all_projects, update_project, soft_delete_project, get_deleting_projects,
+)
+from services.backup import BackupFormatError, iter_export, import_project, clone_project
+from services.dedup import forget_project
+from services.linking import forget_project as forget_link_targets
+from services.purge import start_purge
 from services.scheduler import sync_project_jobs, remove_project_jobs
+from services.simulation.faults import PROFILES
 from translations import get_text
 
 projects_bp = Blueprint('projects', __name__)
 
 
+@projects_bp.context_processor
+def inject_simulation_profiles():
+    return dict(simulation_profiles=sorted(PROFILES))
+
+
 def _t(key, **kwargs):
     lang = session.get('lang', 'fa')
     return get_text(key, lang, **kwargs)
@@ -42,6 +55,10 @@ def _parse_project_form(form):
             'bot_token': form.get('tg_bot_token', '').strip(),
             'chat_id': form.get('tg_chat_id', '').strip(),
         },
+        'simulation': {
+            'enabled': form.get('simulation_enabled') == 'on',
+            'profile': form.get('simulation_profile', 'healthy').strip(),
+        },
         'schedule': {
             'creation_enabled': form.get('creation_enabled') == 'on',
             'creation_interval_minutes': int(form.get('creation_interval', 60) or 60),
@@ -64,7 +81,7 @@ def _parse_project_form(form):
 def list_projects():
     db = get_db()
     projects = get_all_projects(db)
-    return render_template('projects/list.html', projects=projects)
+    return render_template('projects/list.html', projects=projects, deleting=get_deleting_projects(db))
 
 
 @projects_bp.route('/create', methods=['GET', 'POST'])
@@ -106,6 +123,7 @@ def edit(project_id):
             update_project(db, project_id, data)
             project = get_project(db, project_id)
             sync_project_jobs(project)
+            refresh_feed_channel(db, project)
             flash(_t('project_updated'), 'success')
             return redirect(url_for('projects.list_projects'))
         except Exception as e:
@@ -118,7 +136,65 @@ def edit(project_id):
 @login_required
 def delete(project_id):
     db = get_db()
-    remove_project_jobs(project_id)
-    delete_project(db, project_id)
+    # Hidden right away; the content is removed in the background
+    if soft_delete_project(db, project_id):
+        remove_project_jobs(project_id)
+        forget_project(project_id)
+        forget_link_targets(project_id)
+        start_purge(db, project_id)
     flash(_t('project_deleted'), 'success')
     return redirect(url_for('projects.list_projects'))
+
+
+@projects_bp.route('/<project_id>/delete/status')
+@login_required
+def delete_status(project_id):
+    project = get_project(get_db(), project_id, include_deleted=True)
+    if project is None:
+        return jsonify({'state': 'done'})
+    if not project.get('deleted_at'):
+        abort(404)
+    purge = project.get('purge') or {}
+    return jsonify({'state': 'running', 'removed': purge.get('removed', 0), 'total': purge.get('total'),
+                    'collection': purge.get('collection')})
+
+
+@projects_bp.route('/<project_id>/export')
+@login_required
+def export(project_id):
+    db = get_db()
+    project = get_project(db, project_id)
+    if not project:
+        flash(_t('project_not_found'), 'danger')
+        return redirect(url_for('projects.list_projects'))
+    # Downloads leave out WordPress/Telegram credentials; the CLI can keep them
+    filename = f"{project.get('db_key') or project_id}.ndjson.gz"
+    return Response(iter_export(db, project_id, strip_secrets=True), mimetype='application/gzip',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+@projects_bp.route('/import', methods=['POST'])
+@login_required
+def import_():
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash(_t('import_no_file'), 'danger')
+        return redirect(url_for('projects.list_projects'))
+    try:
+        import_project(get_db(), upload.stream, name=request.form.get('name', '').strip() or None)
+        flash(_t('project_imported'), 'success')
+    except BackupFormatError as e:
+        flash(f'{_t("error")}: {e}', 'danger')
+    return redirect(url_for('projects.list_projects'))
+
+
+@projects_bp.route('/<project_id>/clone', methods=['POST'])
+@login_required
+def clone(project_id):
+    db = get_db()
+    if not get_project(db, project_id):
+        flash(_t('project_not_found'), 'danger')
+        return redirect(url_for('projects.list_projects'))
+    clone_project(db, project_id)
+    flash(_t('project_cloned'), 'success')
+    return redirect(url_for('projects.list_projects'))
@@ -1,9 +1,12 @@
+from datetime import datetime, timezone
+
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from flask_login import login_required
 
 from app import get_db
 from models.project import get_project, get_all_projects
-from models.content import get_articles, get_project_stats
+from models.content import get_articles, get_project_stats, get_article, set_publish_at
+from services.publish_queue import publish_timer, plan_project_slots
 from services.wordpress_publisher import WordPressPublisher
 from services.scheduler import get_job_status
 from translations import get_text
@@ -62,6 +65,37 @@ def publish(project_id):
     return redirect(url_for('publishing.queue'))
 
 
+@publishing_bp.route('/<project_id>/articles/<article_id>/schedule', methods=['POST'])
+@login_required
+def schedule(project_id, article_id):
+    """Set (or clear, when empty) the UTC time an article is published at."""
+    db = get_db()
+    project = get_project(db, project_id)
+    article = get_article(db, article_id)
+    if not project or not article:
+        flash(_t('project_not_found'), 'danger')
+        return redirect(url_for('publishing.queue'))
+
+    value = request.form.get('publish_at', '').strip()
+    try:
+        when = datetime.fromisoformat(value) if value else None
+        if when:
+            when = when.replace(tzinfo=timezone.utc) if when.tzinfo is None else when.astimezone(timezone.utc)
+    except ValueError:
+        flash(_t('invalid_publish_time'), 'danger')
+        return redirect(url_for('content.article_detail', project_id=project_id, article_id=article_id))
+
+    set_publish_at(db, article_id, when, slot='manual')
+    if when:
+        flash(_t('publish_scheduled', when=when.strftime('%Y-%m-%d %H:%M')), 'success')
+    else:
+        # The article may take an interval slot again
+        plan_project_slots(db, project)
+        flash(_t('publish_unscheduled'), 'success')
+    publish_timer.wake()
+    return redirect(url_for('content.article_detail', project_id=project_id, article_id=article_id))
+
+
 @publishing_bp.route('/settings')
 @login_required
 def settings():
@@ -1,16 +1,29 @@
+import importlib
 import json
 import logging
+import threading
+import time
 from abc import ABC, abstractmethod
+from importlib.metadata import entry_points
 
-from models.api_key import get_next_key, record_key_error, reset_key_errors
+from config import Config
+from models.api_key import get_active_providers, get_next_key, record_key_error, reset_key_errors
+from services.metrics import PROVIDER_IN_FLIGHT, PROVIDER_LATENCY, PROVIDER_PROMPT_TOKENS, PROVIDER_REQUESTS
+from services.prompts import template_version
+from services.providers import BUILTIN_PROVIDERS, ENTRY_POINT_GROUP, SIMULATED_PROVIDERS
+from services.provider_router import router
 
 logger = logging.getLogger(__name__)
 
+# The pipeline step of the provider call running on this thread, for usage reports
+_current_call = threading.local()
+
 
 class AIProvider(ABC):
     """Base class for AI providers."""
 
     name = ''
+    simulated = False
 
     @abstractmethod
     def generate(self, api_key, prompt, system_prompt=''):
@@ -22,28 +35,86 @@ class AIProvider(ABC):
         """Generate and parse JSON response. Returns dict."""
         pass
 
+    def report_usage(self, uncached=0, cached=0, cache_write=0):
+        """Record a response's prompt tokens by cache outcome; providers call this after each request."""
+        step = getattr(_current_call, 'step', '')
+        labels = {'provider': self.name, 'step': step, 'template': template_version(step)}
+        for cache, tokens in (('uncached', uncached), ('cached', cached), ('cache_write', cache_write)):
+            if tokens:
+                PROVIDER_PROMPT_TOKENS.inc(tokens, cache=cache, **labels)
+
 
 class ProviderRegistry:
-    """Registry for AI providers with key rotation."""
+    """Registry for AI providers with key rotation.
+
+    Providers are declared as ``module:Class`` specs (built-ins plus the
+    ``lagos.providers`` entry point group) and imported on first use.
+    """
 
     _providers = {}
+    _specs = None
+    _lock = threading.RLock()
 
     @classmethod
     def register(cls, provider_class):
         cls._providers[provider_class.name] = provider_class()
         return provider_class
 
+    @classmethod
+    def _discover(cls):
+        if cls._specs is None:
+            specs = dict(BUILTIN_PROVIDERS)
+            try:
+                for ep in entry_points(group=ENTRY_POINT_GROUP):
+                    specs.setdefault(ep.name, ep.value)
+            except Exception as e:
+                logger.warning(f"Could not read provider entry points: {e}")
+            cls._specs = specs
+        return cls._specs
+
     @classmethod
     def get_provider(cls, name):
-        return cls._providers.get(name)
+        provider = cls._providers.get(name)
+        if provider is None and name in cls._discover():
+            with cls._lock:
+                if name not in cls._providers:
+                    module_name, _, class_name = cls._specs[name].partition(':')
+                    module = importlib.import_module(module_name)  # runs @ProviderRegistry.register
+                    if name not in cls._providers:
+                        cls.register(getattr(module, class_name))
+                    logger.info(f"Loaded AI provider {name}")
+            provider = cls._providers.get(name)
+        return provider
 
     @classmethod
     def list_providers(cls):
-        return list(cls._providers.keys())
+        specs = cls._discover()
+        return list(specs) + [name for name in cls._providers if name not in specs]
+
+    @classmethod
+    def is_simulated(cls, name):
+        """Whether ``name`` is a simulated provider, without importing it."""
+        provider = cls._providers.get(name)
+        return provider.simulated if provider else name in SIMULATED_PROVIDERS
 
     @classmethod
-    def generate(cls, db, fernet, provider_name, prompt, system_prompt=''):
+    def generate(cls, db, fernet, provider_name, prompt, system_prompt='', step=''):
         """Generate text using a provider with automatic key rotation."""
+        return cls._call(db, fernet, provider_name, 'generate', prompt, system_prompt, step)
+
+    @classmethod
+    def generate_json(cls, db, fernet, provider_name, prompt, system_prompt='', step=''):
+        """Generate JSON using a provider with automatic key rotation."""
+        return cls._call(db, fernet, provider_name, 'generate_json', prompt, system_prompt, step)
+
+    @classmethod
+    def route(cls, db, fernet, providers, method, prompt, system_prompt='', step=''):
+        """Call ``method`` on the fastest healthy provider, hedging and failing over to the others."""
+        return router.call(providers, step, lambda provider_name: cls._call(
+            db, fernet, provider_name, method, prompt, system_prompt, step))
+
+    @classmethod
+    def _call(cls, db, fernet, provider_name, method, prompt, system_prompt, step):
         provider = cls.get_provider(provider_name)
         if not provider:
             raise ValueError(f"Unknown provider: {provider_name}")
@@ -53,7 +124,7 @@ class ProviderRegistry:
             raise RuntimeError(f"No active API keys for provider: {provider_name}")
 
         try:
-            result = provider.generate(api_key, prompt, system_prompt)
+            result = _timed_call(provider, method, key_id, api_key, prompt, system_prompt, step)
             reset_key_errors(db, key_id)
             return result
         except Exception as e:
@@ -63,7 +134,7 @@ class ProviderRegistry:
             key_id2, api_key2 = get_next_key(db, fernet, provider_name)
             if api_key2 and key_id2 != key_id:
                 try:
-                    result = provider.generate(api_key2, prompt, system_prompt)
+                    result = _timed_call(provider, method, key_id2, api_key2, prompt, system_prompt, step)
                     reset_key_errors(db, key_id2)
                     return result
                 except Exception as e2:
@@ -71,43 +142,71 @@ class ProviderRegistry:
                     record_key_error(db, key_id2)
             raise
 
-    @classmethod
-    def generate_json(cls, db, fernet, provider_name, prompt, system_prompt=''):
-        """Generate JSON using a provider with automatic key rotation."""
-        provider = cls.get_provider(provider_name)
-        if not provider:
-            raise ValueError(f"Unknown provider: {provider_name}")
 
-        key_id, api_key = get_next_key(db, fernet, provider_name)
-        if not api_key:
-            raise RuntimeError(f"No active API keys for provider: {provider_name}")
+_provider_slots = {}
+_slots_lock = threading.Lock()
+
+
+def _concurrency_limits():
+    limits = {}
+    for item in Config.PROVIDER_CONCURRENCY.split(','):
+        name, _, value = item.partition('=')
+        if value.strip().isdigit():
+            limits[name.strip()] = int(value)
+    return limits
 
+
+def _provider_slot(name):
+    """Semaphore capping concurrent calls to one provider across all threads in this process."""
+    with _slots_lock:
+        slot = _provider_slots.get(name)
+        if slot is None:
+            limit = _concurrency_limits().get(name, Config.PROVIDER_MAX_CONCURRENT)
+            slot = _provider_slots[name] = threading.BoundedSemaphore(max(limit, 1))
+        return slot
+
+
+def _timed_call(provider, method, key_id, api_key, prompt, system_prompt, step):
+    """Call a provider method within its concurrency cap, recording latency and outcome metrics.
+
+    Time spent waiting for a slot is not counted as provider latency.
+    """
+    with _provider_slot(provider.name):
+        PROVIDER_IN_FLIGHT.inc(provider=provider.name)
         try:
-            result = provider.generate_json(api_key, prompt, system_prompt)
-            reset_key_errors(db, key_id)
-            return result
-        except Exception as e:
-            logger.error(f"Provider {provider_name} key {key_id} failed: {e}")
-            record_key_error(db, key_id)
-            key_id2, api_key2 = get_next_key(db, fernet, provider_name)
-            if api_key2 and key_id2 != key_id:
-                try:
-                    result = provider.generate_json(api_key2, prompt, system_prompt)
-                    reset_key_errors(db, key_id2)
-                    return result
-                except Exception as e2:
-                    logger.error(f"Provider {provider_name} key {key_id2} also failed: {e2}")
-                    record_key_error(db, key_id2)
-            raise
+            return _observed_call(provider, method, key_id, api_key, prompt, system_prompt, step)
+        finally:
+            PROVIDER_IN_FLIGHT.dec(provider=provider.name)
+
+
+def _observed_call(provider, method, key_id, api_key, prompt, system_prompt, step):
+    outcome = 'ok'
+    start = time.perf_counter()
+    _current_call.step = step
+    try:
+        return getattr(provider, method)(api_key, prompt, system_prompt)
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        labels = {'provider': provider.name, 'key': key_id, 'step': step, 'outcome': outcome}
+        PROVIDER_LATENCY.observe(elapsed, **labels)
+        PROVIDER_REQUESTS.inc(**labels)
+        router.observe(provider.name, key_id, step, elapsed, outcome == 'ok')
+
+
+def active_providers(db):
+    """Registered real (non-simulated) providers that have active API keys."""
+    with_keys = set(get_active_providers(db))
+    return [name for name in ProviderRegistry.list_providers()
+            if name in with_keys and not ProviderRegistry.is_simulated(name)]
 
 
-def find_active_provider(db, fernet):
-    """Find the first provider that has active API keys."""
-    for pname in ProviderRegistry.list_providers():
-        key_id, api_key = get_next_key(db, fernet, pname)
-        if api_key:
-            return pname
-    return None
+def find_active_provider(db, fernet, step=''):
+    """Find the best-ranked real provider that has active API keys."""
+    ranked = router.rank(active_providers(db), step)
+    return ranked[0] if ranked else None
 
 
 def extract_json_from_text(text):
@@ -0,0 +1,273 @@
+"""Streaming project export/import as compressed NDJSON; cloning is an export piped into an import.
+
+    python -m services.backup export <project_id> project.ndjson.gz [--strip-secrets]
+    python -m services.backup import project.ndjson.gz [--name "New name"]
+    python -m services.backup clone <project_id> --name "New name"
+
+The first line is a header. The project document follows, then one line per
+content document, grouped by collection:
+
+    {"format": "lagos-project", "version": 1, "exported_at": ..., "collections": [...]}
+    {"collection": "projects", "doc": {...}}
+    {"collection": "keywords", "doc": {...}}
+
+Documents are MongoDB Extended JSON, so ObjectIds, dates and binary fields
+(e.g. ``minhash``) round-trip. Export reads through server cursors with a fixed
+batch size, and import inserts in bounded batches, so memory use is the same
+for a project of a hundred documents and one of a million. Output is gzip by
+default; zstd is used for ``.zst`` files when the optional ``zstandard``
+package is installed.
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import logging
+import sys
+import tempfile
+import zlib
+from datetime import datetime, timezone
+
+from bson import ObjectId, json_util
+
+from models.project import CONTENT_COLLECTIONS, delete_project
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 'lagos-project'
+VERSION = 1
+BATCH_SIZE = 500
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+_JSON_OPTIONS = json_util.JSONOptions(json_mode=json_util.JSONMode.RELAXED, tz_aware=True,
+                                      tzinfo=timezone.utc)
+_SECRET_FIELDS = [('wordpress', 'app_password'), ('telegram', 'bot_token')]
+# Publish scheduling of copied articles; the publish timer goes by publish_at alone, not the project's schedule
+_UNSCHEDULED = {'publish_at': None, 'publish_slot': None, 'publish_interval': None,
+                'publish_attempts': 0, 'publish_error': None}
+
+
+class BackupFormatError(ValueError):
+    pass
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd backups need the 'zstandard' package (pip install zstandard)") from None
+    return zstandard
+
+
+def _line(obj):
+    return (json_util.dumps(obj, json_options=_JSON_OPTIONS, ensure_ascii=False) + '\n').encode()
+
+
+def iter_export(db, project_id, compression='gzip', strip_secrets=False, batch_size=BATCH_SIZE):
+    """Yield compressed chunks of a project export; suitable for a streamed HTTP response."""
+    project = db.projects.find_one({'_id': ObjectId(project_id)})
+    if not project:
+        raise LookupError(f"Project {project_id} not found")
+    if strip_secrets:
+        for section, field in _SECRET_FIELDS:
+            if project.get(section, {}).get(field):
+                project[section][field] = ''
+
+    if compression == 'zstd':
+        compressor = _zstandard().ZstdCompressor(level=3).compressobj()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+
+    buffer = io.BytesIO()
+
+    def emit(obj):
+        buffer.write(_line(obj))
+        if buffer.tell() < 256 * 1024:
+            return None
+        data = compressor.compress(buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    counts = {}
+    header = {'format': FORMAT, 'version': VERSION, 'exported_at': datetime.now(timezone.utc),
+              'project_id': project_id, 'collections': CONTENT_COLLECTIONS}
+    for obj in (header, {'collection': 'projects', 'doc': project}):
+        if chunk := emit(obj):
+            yield chunk
+    for collection in CONTENT_COLLECTIONS:
+        counts[collection] = 0
+        for doc in db[collection].find({'project_id': project_id}).batch_size(batch_size):
+            counts[collection] += 1
+            if chunk := emit({'collection': collection, 'doc': doc}):
+                yield chunk
+    yield compressor.compress(buffer.getvalue()) + compressor.flush()
+    logger.info(f"Exported project {project_id}: {counts}")
+
+
+def export_project(db, project_id, fileobj, compression='gzip', strip_secrets=False):
+    for chunk in iter_export(db, project_id, compression, strip_secrets):
+        fileobj.write(chunk)
+
+
+def _open_lines(fileobj):
+    """Decompressed text lines of a gzip or zstd export (detected from the magic bytes)."""
+    if hasattr(fileobj, 'peek'):
+        stream, magic = fileobj, fileobj.peek(4)[:4]
+    elif fileobj.seekable():
+        stream, magic = fileobj, fileobj.read(4)
+        fileobj.seek(-len(magic), io.SEEK_CUR)
+    else:
+        stream = io.BufferedReader(fileobj)
+        magic = stream.peek(4)[:4]
+    if magic.startswith(_GZIP_MAGIC):
+        raw = gzip.GzipFile(fileobj=stream, mode='rb')
+    elif magic == _ZSTD_MAGIC:
+        raw = _zstandard().ZstdDecompressor().stream_reader(stream)
+    else:
+        raise BackupFormatError('Not a gzip or zstd project export')
+    return io.TextIOWrapper(raw, encoding='utf-8')
+
+
+def _remap_id(old_id, new_project_id):
+    """Deterministic new ObjectId for a copied document.
+
+    References between copied documents (``duplicate_of``, ``article_id``, ``image_id``) can then be
+    rewritten without keeping an old-to-new id map in memory. The source id's timestamp and counter
+    are kept in front of the hash, so copies keep the original's ``_id`` order and sort before
+    anything added to the new project later (``get_page`` cursors rely on it).
+    """
+    old = old_id.binary
+    digest = hashlib.blake2b(old + new_project_id.encode(), digest_size=5).digest()
+    return ObjectId(old[:4] + old[9:] + digest)
+
+
+def _unique_db_key(db, db_key):
+    candidate, n = db_key, 1
+    while db.projects.count_documents({'db_key': candidate}, limit=1):
+        n += 1
+        candidate = f"{db_key}-{n}"
+    return candidate
+
+
+def import_project(db, fileobj, name=None, batch_size=BATCH_SIZE):
+    """Create a new project from an export; returns (project_id, {collection: count}).
+
+    The project gets a new id, a free ``db_key`` and its schedules switched
+    off, and its articles lose their publish times, so a copy never publishes
+    alongside the original.
+    """
+    lines = _open_lines(fileobj)
+    header = json.loads(next(lines, '') or 'null')
+    if not isinstance(header, dict) or header.get('format') != FORMAT:
+        raise BackupFormatError('Not a Lagos project export')
+    if header.get('version') != VERSION:
+        raise BackupFormatError(f"Unsupported export version {header.get('version')}")
+
+    first = json_util.loads(next(lines, '') or 'null', json_options=_JSON_OPTIONS)
+    if not first or first.get('collection') != 'projects':
+        raise BackupFormatError('Export has no project document')
+    project = first['doc']
+    project.pop('_id', None)
+    now = datetime.now(timezone.utc)
+    project.update(
+        name=name or f"{project.get('name', '')} (copy)",
+        db_key=_unique_db_key(db, project.get('db_key', '') or 'project'),
+        created_at=now,
+        updated_at=now,
+    )
+    project.setdefault('schedule', {}).update(creation_enabled=False, publish_enabled=False)
+    new_id = str(db.projects.insert_one(project).inserted_id)
+
+    counts = {}
+    batch, batch_collection = [], None
+
+    def flush():
+        if batch:
+            db[batch_collection].insert_many(batch, ordered=False)
+            batch.clear()
+
+    try:
+        for line in lines:
+            if not line.strip():
+                continue
+            entry = json_util.loads(line, json_options=_JSON_OPTIONS)
+            collection, doc = entry['collection'], entry['doc']
+            if collection not in CONTENT_COLLECTIONS:
+                raise BackupFormatError(f"Unexpected collection {collection!r} in export")
+            if collection != batch_collection or len(batch) >= batch_size:
+                flush()
+                batch_collection = collection
+            doc['_id'] = _remap_id(doc['_id'], new_id)
+            doc['project_id'] = new_id
+            for ref in ('duplicate_of', 'article_id', 'image_id'):
+                if doc.get(ref):
+                    doc[ref] = str(_remap_id(ObjectId(doc[ref]), new_id))
+            if collection == 'articles':
+                doc.update(_UNSCHEDULED)
+            batch.append(doc)
+            counts[collection] = counts.get(collection, 0) + 1
+        flush()
+    except Exception:
+        # Don't leave a half-imported project behind
+        delete_project(db, new_id)
+        raise
+    logger.info(f"Imported project {new_id}: {counts}")
+    return new_id, counts
+
+
+def clone_project(db, project_id, name=None):
+    """Copy a project and all its content; returns the new project id.
+
+    The export is spooled to a temporary file, which moves to disk past 8 MB.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        export_project(db, project_id, spool)
+        spool.seek(0)
+        new_id, _ = import_project(db, spool, name=name)
+    return new_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export, import or clone a project.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('export')
+    p.add_argument('project_id')
+    p.add_argument('path', help='output file; .zst selects zstd, anything else gzip (- for stdout)')
+    p.add_argument('--strip-secrets', action='store_true', help='blank WordPress/Telegram credentials')
+    p = sub.add_parser('import')
+    p.add_argument('path', help='export file (- for stdin)')
+    p.add_argument('--name')
+    p = sub.add_parser('clone')
+    p.add_argument('project_id')
+    p.add_argument('--name')
+    args = parser.parse_args(argv)
+
+    from pymongo import MongoClient
+    from config import Config
+    logging.basicConfig(level=logging.INFO)
+    db = MongoClient(Config.MONGO_URI)[Config.MONGO_DB]
+
+    if args.command == 'export':
+        compression = 'zstd' if args.path.endswith('.zst') else 'gzip'
+        if args.path == '-':
+            export_project(db, args.project_id, sys.stdout.buffer, compression, args.strip_secrets)
+        else:
+            with open(args.path, 'wb') as f:
+                export_project(db, args.project_id, f, compression, args.strip_secrets)
+    elif args.command == 'import':
+        if args.path == '-':
+            new_id, counts = import_project(db, sys.stdin.buffer, args.name)
+        else:
+            with open(args.path, 'rb') as f:
+                new_id, counts = import_project(db, f, args.name)
+        print(f"Imported project {new_id}: {counts}")
+    else:
+        print(f"Cloned project {args.project_id} to {clone_project(db, args.project_id, args.name)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
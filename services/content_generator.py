@@ -1,5 +1,6 @@
 import logging
 
+from config import Config
 from models.content import (
     add_keywords, get_random_keyword, mark_keyword_title_generated,
     add_blog_titles, add_ads_titles, get_random_blog_title, mark_blog_title_generated,
@@ -7,29 +8,55 @@ from models.content import (
     create_article, create_ads_content,
     add_bein_paragraphs, add_info_blocks, add_bullet_items,
 )
-from services.ai_provider import ProviderRegistry, find_active_provider
+from services.ai_provider import ProviderRegistry, active_providers
+from models.revisions import update_article_body
+from services.dedup import filter_duplicate_titles, check_article, register_article, pack, article_signature
+from services.prompts import render_prompt
+from services.publish_queue import plan_project_slots
+from services.quality import score_articles
+from text_utils import strip_html
 
 logger = logging.getLogger(__name__)
 
 
 class ContentGenerator:
-    def __init__(self, db, fernet):
+    # Pipeline step -> method, in pipeline order
+    STEPS = {
+        'keywords': 'generate_keywords',
+        'titles': 'generate_titles',
+        'article': 'generate_article',
+        'ads': 'generate_ads_content',
+        'bein': 'generate_bein_paragraphs',
+        'info': 'generate_info_blocks',
+        'bullets': 'generate_bullet_items',
+    }
+    # Step -> method taking (project, article); run only for a given article
+    ARTICLE_STEPS = {
+        'regenerate': 'regenerate_article',
+    }
+
+    def __init__(self, db, fernet, progress=None):
         self.db = db
         self.fernet = fernet
-
-    def _get_provider(self):
-        provider = find_active_provider(self.db, self.fernet)
-        if not provider:
+        # progress(event, **data): 'step' start/finish and 'chapter' previews (see services.jobs)
+        self.progress = progress or (lambda event, **data: None)
+
+    def _get_providers(self, project):
+        if project.get('simulation', {}).get('enabled'):
+            return ['simulated']
+        providers = active_providers(self.db)
+        if not providers:
             raise RuntimeError("No active AI provider with valid API keys found.")
-        return provider
+        return providers
 
-    def _ai(self, prompt, system_prompt=''):
-        provider = self._get_provider()
-        return ProviderRegistry.generate(self.db, self.fernet, provider, prompt, system_prompt)
+    def _ai(self, project, prompt, system_prompt='', step=''):
+        providers = self._get_providers(project)
+        return ProviderRegistry.route(self.db, self.fernet, providers, 'generate', prompt, system_prompt, step=step)
 
-    def _ai_json(self, prompt, system_prompt=''):
-        provider = self._get_provider()
-        return ProviderRegistry.generate_json(self.db, self.fernet, provider, prompt, system_prompt)
+    def _ai_json(self, project, prompt, system_prompt='', step=''):
+        providers = self._get_providers(project)
+        return ProviderRegistry.route(self.db, self.fernet, providers, 'generate_json', prompt, system_prompt,
+                                      step=step)
 
     # --- Step 1: Keyword Generation ---
     def generate_keywords(self, project):
@@ -40,32 +67,17 @@ class ContentGenerator:
         if seed:
             seeds = [k.strip() for k in seed.split('-') if k.strip()]
             if seeds:
-                add_keywords(self.db, pid, seeds)
-                logger.info(f"Added {len(seeds)} seed keywords for project {pid}")
+                added = add_keywords(self.db, pid, seeds)
+                if added:
+                    logger.info(f"Added {added} seed keywords for project {pid}")
 
         # Then generate AI keywords
         num_kw = project['content_settings']['number_of_keyword'] // 4
-        prompt = f"""اطلاعات کسب‌وکار:
-نام برند: {project['company_name']}
-محصولات یا خدمات اصلی: {project['services_products']}
-حوزه کاری: {project['business_field']}
-بر اساس اطلاعات فوق، لطفاً دقیقاً {num_kw} کلمه کلیدی سئو شده و هدفمند پیشنهاد کن که:
-- ترکیبی از کلمات کوتاه، میان‌رده و بلند باشند.
-- شامل کلمات مرتبط با حوزه کاری و نیاز مشتریان باشند.
-- قابلیت رتبه‌گیری بالا در موتورهای جستجو را داشته باشند.
-- از عبارات جذاب، پرسرچ و با نیت جستجوی مشخص (اطلاعاتی، تراکنشی، ناوبری) استفاده شود.
-هر کلمه را در یک خروجی زیر هم بده
-به زبان {project['lang']} بنویس
-
-هر آیتم را با ============== جدا کن"""
-
-        sys_prompt = """شما یک کارشناس ارشد سئو، تحقیق کلمات کلیدی و بازاریابی محتوایی هستید.
-هیچ چیز اضافی ننویس فقط کلمه ها رو خروجی بده"""
-
-        result = self._ai(prompt, sys_prompt)
+        sys_prompt, prompt = render_prompt('keywords', project, count=num_kw)
+        result = self._ai(project, prompt, sys_prompt, step='keywords')
         keywords = [k.strip() for k in result.split('==============') if k.strip()]
         count = add_keywords(self.db, pid, keywords)
-        logger.info(f"Generated {count} AI keywords for project {pid}")
+        logger.info(f"Generated {count} new AI keywords ({len(keywords) - count} already known) for project {pid}")
         return count
 
     # --- Step 2: Title Generation ---
@@ -82,37 +94,17 @@ class ContentGenerator:
         blog_count = int(num_content * 1.2 / max(num_kw, 1))
         ads_count = int(num_ads * 1.2 / max(num_kw, 1))
 
-        prompt = f"""You are an expert SEO content strategist specialized in generating high-converting article titles.
-
-Business Information:
-Brand Name: {project['company_name']}
-Main Products or Services: {project['services_products']}
-Business Field: {project['business_field']}
-
-Your task is to produce two categories of fully SEO-optimized and highly engaging titles in Persian:
-1. {blog_count} content titles (Blog Titles)
-2. {ads_count} advertising titles (Advertising Titles)
-
-Follow these rules:
-- Keyword must appear exactly once in each title, near beginning or middle.
-- Length: 55-65 characters each.
-- SEO optimized with E-E-A-T principles.
-- Topic variety: educational guides, listicles, comparisons, tips & tricks, etc.
-
-Output Format: JSON with two fields:
-- "blog": string with titles separated by newlines
-- "ads": string with titles separated by newlines
-
-Write in {project['lang']}
-Keyword: {kw['text']}"""
-
-        sys_prompt = "You are a helpful assistant. Only output the titles, nothing extra."
-
-        data = self._ai_json(prompt, sys_prompt)
+        sys_prompt, prompt = render_prompt('titles', project, blog_count=blog_count, ads_count=ads_count,
+                                           keyword=kw['text'])
+        data = self._ai_json(project, prompt, sys_prompt, step='titles')
         blog_titles = [t for t in data.get('blog', '').split('\n') if t.strip()]
         ads_titles = [t for t in data.get('ads', '').split('\n') if t.strip()]
 
-        b_count = add_blog_titles(self.db, pid, blog_titles, kw['text'])
+        # Near-duplicates of existing titles would only lead to near-duplicate articles
+        kept, duplicates = filter_duplicate_titles(self.db, pid, blog_titles)
+        if duplicates:
+            logger.info(f"Skipped {len(duplicates)} near-duplicate blog titles for project {pid}")
+        b_count = add_blog_titles(self.db, pid, [t for t, _ in kept], kw['text'], [m for _, m in kept]) if kept else 0
         a_count = add_ads_titles(self.db, pid, ads_titles, kw['text'])
         mark_keyword_title_generated(self.db, kw['_id'])
 
@@ -120,75 +112,78 @@ Keyword: {kw['text']}"""
         return b_count, a_count
 
     # --- Step 3: Article Generation ---
-    def generate_article(self, project):
-        pid = str(project['_id'])
-        title_doc = get_random_blog_title(self.db, pid, generated=False)
-        if not title_doc:
-            logger.warning(f"No unused blog titles for project {pid}")
-            return None
-
+    def _write_article(self, project, title, keyword):
         word_count = project['content_settings']['article_word_count']
         chapters = project['content_settings']['article_chapters']
         per_chapter = word_count // chapters
 
-        prompt = f"""Write a fully SEO-optimized, human-written article in Persian.
-
-Title: {title_doc['content']}
-Keyword: {title_doc['keyword']}
-
-Business Information:
-Brand Name: {project['company_name']}
-Main Products or Services: {project['services_products']}
-Business Field: {project['business_field']}
-About: {project['about_company']}
-
-Content Rules:
-- Follow E-E-A-T principles.
-- Word count: {word_count}
-- Use the keyword naturally (density < 2%).
-- Use synonyms where needed.
-- Use <br> tags for line breaks in text.
+        sys_prompt, prompt = render_prompt('article', project, word_count=word_count, chapters=chapters,
+                                           per_chapter=per_chapter, title=title, keyword=keyword)
+        data = self._ai_json(project, prompt, sys_prompt, step='article')
+        for i, chapter in enumerate(data.get('chapters', [])):
+            self.progress('chapter', index=i, title=chapter.get('title', ''),
+                          preview=' '.join(strip_html(chapter.get('content', '')).split())[:300])
+        return data
 
-Structure:
-- Create {chapters} chapters inside a JSON array field called "chapters".
-- Each chapter has "title" and "content" fields.
-- Each chapter length ≈ {per_chapter} words.
-- Add a relevant emoji at the start of each chapter title.
-- Do NOT use "Chapter 1", "Chapter 2", etc.
-- Don't use colons in titles.
-- Add 2 random HTML tables (class "my_table") in random chapters.
-- Enclose all HTML attributes in double quotes.
-
-Output JSON format:
-{{
-  "chapters": [
-    {{ "title": "string", "content": "string" }}
-  ],
-  "refrence": "string",
-  "faq": "string",
-  "slug": "string"
-}}
-
-Additional:
-- Create 10 FAQ items as an HTML table with class "my_table" inside field "faq".
-- Translate the title to English in field "slug".
-- Write in {project['lang']} language."""
+    def _score(self, project, keyword, chapters, faq):
+        pid = str(project['_id'])
+        article = {'project_id': pid, 'tag': keyword, 'chapters': chapters, 'faq': faq}
+        quality = score_articles([article], {pid: project.get('content_settings', {})})[0]
+        self.progress('quality', score=quality['score'])
+        return quality
 
-        sys_prompt = "You are a senior SEO content writer. Output valid JSON only."
+    def generate_article(self, project):
+        pid = str(project['_id'])
+        title_doc = get_random_blog_title(self.db, pid, generated=False)
+        if not title_doc:
+            logger.warning(f"No unused blog titles for project {pid}")
+            return None
 
-        data = self._ai_json(prompt, sys_prompt)
+        data = self._write_article(project, title_doc['content'], title_doc['keyword'])
+        chapters_out = data.get('chapters', [])
+        faq = data.get('faq', '')
+        sig, duplicate_of, score = check_article(self.db, pid, chapters_out, faq)
+        quality = self._score(project, title_doc['keyword'], chapters_out, faq)
         article_id = create_article(self.db, pid, {
             'article_title': title_doc['content'],
             'slug': data.get('slug', ''),
             'tag': title_doc['keyword'],
-            'chapters': data.get('chapters', []),
-            'faq': data.get('faq', ''),
+            'chapters': chapters_out,
+            'faq': faq,
             'reference': data.get('refrence', data.get('reference', '')),
+            'minhash': pack(sig) if sig else None,
+            'duplicate_of': duplicate_of,
+            'similarity': score if duplicate_of else None,
+            'quality': quality,
         })
         mark_blog_title_generated(self.db, title_doc['_id'])
+        if sig:
+            register_article(self.db, pid, article_id, sig)
+        if duplicate_of:
+            # Kept for review but never picked for publishing
+            logger.warning(f"Article {article_id} is a near-duplicate of {duplicate_of} "
+                           f"({score:.0%} similar) in project {pid}")
+        elif Config.QUALITY_MIN_SCORE and quality['score'] < Config.QUALITY_MIN_SCORE:
+            # Kept for review or regeneration but never scheduled
+            logger.warning(f"Article {article_id} scored {quality['score']:.0f}, below the publish threshold "
+                           f"{Config.QUALITY_MIN_SCORE}, in project {pid}")
+        else:
+            plan_project_slots(self.db, project)
         logger.info(f"Generated article {article_id} for project {pid}")
         return article_id
 
+    def regenerate_article(self, project, article):
+        """Rewrite an existing article's body for the same title; the old body is kept as a revision."""
+        data = self._write_article(project, article['article_title'], article.get('tag', ''))
+        chapters_out, faq = data.get('chapters', []), data.get('faq', '')
+        sig = article_signature(chapters_out, faq)
+        quality = self._score(project, article.get('tag', ''), chapters_out, faq)
+        revision = update_article_body(self.db, article['_id'], chapters_out, faq, reason='regenerated',
+                                       extra={'minhash': pack(sig) if sig else None, 'quality': quality})
+        register_article(self.db, str(project['_id']), article['_id'], sig)
+        logger.info(f"Regenerated article {article['_id']} (revision {revision}) for project {project['_id']}")
+        return revision
+
     # --- Step 4: Ads Content Generation ---
     def generate_ads_content(self, project):
         pid = str(project['_id'])
@@ -197,29 +192,8 @@ Additional:
             logger.warning(f"No unused ads titles for project {pid}")
             return None
 
-        prompt = f"""Write a persuasive, SEO-optimized promotional article (2000 characters max).
-
-Title: {title_doc['content']}
-Keyword: {title_doc['keyword']}
-
-Company: {project['company_name']}
-Business field: {project['business_field']}
-Services: {project['services_products']}
-About: {project['about_company']}
-Language: {project['lang']}
-
-Structure:
-1. Hook (1-2 sentences) - emotional opener
-2. Introduction (80-100 words) - what the company offers
-3. Problem Section - pain points
-4. Solution Section - present services as the solution
-5. Call to Action with urgency
-Contact: {project['address']}, {project['mobile_phone']}
-6. Why choose this company
-
-Write in {project['lang']}. Output only the article text."""
-
-        result = self._ai(prompt)
+        sys_prompt, prompt = render_prompt('ads', project, title=title_doc['content'], keyword=title_doc['keyword'])
+        result = self._ai(project, prompt, sys_prompt, step='ads')
         create_ads_content(self.db, pid, title_doc['content'], result)
         mark_ads_title_generated(self.db, title_doc['_id'])
         logger.info(f"Generated ads content for project {pid}")
@@ -228,22 +202,8 @@ Write in {project['lang']}. Output only the article text."""
     # --- Step 5: Supplementary Content ---
     def generate_bein_paragraphs(self, project):
         pid = str(project['_id'])
-        prompt = f"""For the company {project['company_name']} that provides {project['services_products']}, create 50 unique advertising texts.
-
-Each text must:
-- Start with a question or engaging hook.
-- Present the solution or benefit.
-- List 2-3 advantages with ✅ symbol.
-- End with a short call-to-action.
-- Be 350-500 characters total.
-- Include the company name.
-
-Write in {project['lang']}
-Separate each item with =============="""
-
-        sys_prompt = "You are a helpful assistant. Don't use quotes in content."
-
-        result = self._ai(prompt, sys_prompt)
+        sys_prompt, prompt = render_prompt('bein', project)
+        result = self._ai(project, prompt, sys_prompt, step='bein')
         texts = [t.strip() for t in result.split('==============') if t.strip()]
         count = add_bein_paragraphs(self.db, pid, texts)
         logger.info(f"Generated {count} bein paragraphs for project {pid}")
@@ -251,26 +211,8 @@ Separate each item with =============="""
 
     def generate_info_blocks(self, project):
         pid = str(project['_id'])
-        prompt = f"""For the company {project['company_name']} that provides {project['services_products']}, create 50 unique promotional texts.
-
-Each text must:
-- Start with a hook.
-- Describe one specific service/benefit.
-- Add 1 check mark (✅) with a feature.
-
-Include contact info in HTML:
-✉️ <a href="mailto:{project['email']}">{project['email']}</a><br>
-📱 <a href="tel:{project['mobile_phone']}">{project['mobile_phone']}</a><br>
-📞 <a href="tel:{project['phone']}">{project['phone']}</a><br>
-
-Write in {project['lang']}
-Separate each item with ==============
-
-Return in json field "info" """
-
-        sys_prompt = "You are a helpful assistant. Don't use quotes in content."
-
-        data = self._ai_json(prompt, sys_prompt)
+        sys_prompt, prompt = render_prompt('info', project)
+        data = self._ai_json(project, prompt, sys_prompt, step='info')
         info_text = data.get('info', '')
         texts = [t.strip() for t in info_text.split('==============') if t.strip()]
         count = add_info_blocks(self.db, pid, texts)
@@ -279,29 +221,8 @@ Return in json field "info" """
 
     def generate_bullet_items(self, project):
         pid = str(project['_id'])
-        prompt = f"""For the company {project['company_name']} whose services include {project['services_products']}, produce a list of 250 different, realistic, and industry-relevant services.
-
-Use this format for each entry:
-{project.get('bullet1', '')}
-[Service 1]
-[Service 2]
-[Service 3]
-[Service 4]
-[Service 5]
-{project.get('bullet2', '')}
-{project.get('bullet3', '')}
-
-Provide only five new services per entry.
-All services must relate to {project['business_field']}.
-
-Write in {project['lang']}
-Separate each item with ==============
-
-Return in json field "bullet" """
-
-        sys_prompt = "You are a helpful assistant. Don't use quotes in content."
-
-        data = self._ai_json(prompt, sys_prompt)
+        sys_prompt, prompt = render_prompt('bullets', project)
+        data = self._ai_json(project, prompt, sys_prompt, step='bullets')
         bullet_text = data.get('bullet', '')
         texts = [t.strip() for t in bullet_text.split('==============') if t.strip()]
         count = add_bullet_items(self.db, pid, texts)
@@ -309,51 +230,28 @@ Return in json field "bullet" """
         return count
 
     # --- Full Pipeline ---
-    def run_full_pipeline(self, project):
-        """Run the complete content generation pipeline for a project."""
+    def run_steps(self, project, steps, article=None):
+        """Run pipeline steps in order; a failed step is logged and recorded as "Error: ..." and the rest still run.
+
+        Steps in ``ARTICLE_STEPS`` work on ``article``.
+        """
         pid = str(project['_id'])
         results = {}
-
-        try:
-            results['keywords'] = self.generate_keywords(project)
-        except Exception as e:
-            logger.error(f"Keyword generation failed for {pid}: {e}")
-            results['keywords'] = f"Error: {e}"
-
-        try:
-            results['titles'] = self.generate_titles(project)
-        except Exception as e:
-            logger.error(f"Title generation failed for {pid}: {e}")
-            results['titles'] = f"Error: {e}"
-
-        try:
-            results['article'] = self.generate_article(project)
-        except Exception as e:
-            logger.error(f"Article generation failed for {pid}: {e}")
-            results['article'] = f"Error: {e}"
-
-        try:
-            results['ads'] = self.generate_ads_content(project)
-        except Exception as e:
-            logger.error(f"Ads generation failed for {pid}: {e}")
-            results['ads'] = f"Error: {e}"
-
-        try:
-            results['bein'] = self.generate_bein_paragraphs(project)
-        except Exception as e:
-            logger.error(f"Bein paragraph generation failed for {pid}: {e}")
-            results['bein'] = f"Error: {e}"
-
-        try:
-            results['info'] = self.generate_info_blocks(project)
-        except Exception as e:
-            logger.error(f"Info block generation failed for {pid}: {e}")
-            results['info'] = f"Error: {e}"
-
-        try:
-            results['bullets'] = self.generate_bullet_items(project)
-        except Exception as e:
-            logger.error(f"Bullet generation failed for {pid}: {e}")
-            results['bullets'] = f"Error: {e}"
-
+        for step in steps:
+            self.progress('step', step=step, status='started')
+            try:
+                if step in self.ARTICLE_STEPS:
+                    results[step] = getattr(self, self.ARTICLE_STEPS[step])(project, article)
+                else:
+                    results[step] = getattr(self, self.STEPS[step])(project)
+            except Exception as e:
+                logger.error(f"{step} generation failed for {pid}: {e}")
+                results[step] = f"Error: {e}"
+                self.progress('step', step=step, status='failed', error=str(e))
+            else:
+                self.progress('step', step=step, status='done', result=results[step])
         return results
+
+    def run_full_pipeline(self, project):
+        """Run the complete content generation pipeline for a project."""
+        return self.run_steps(project, list(self.STEPS))
@@ -0,0 +1,278 @@
+"""Near-duplicate detection for blog titles and article bodies with MinHash and LSH.
+
+Each text becomes a 64-value MinHash signature, built from character 3-grams for
+titles and word 3-grams for article bodies. The signature is stored with the
+document in ``minhash``. For each project and kind, an in-memory LSH index of
+16 bands x 4 rows maps band hashes to documents. A lookup is then a handful of
+dict probes plus one signature comparison per candidate, well under a
+millisecond even at 100k titles. Indexes are built from Mongo on first use and
+updated with every insert made through this module. Every
+``DEDUP_REFRESH_SECONDS`` they are topped up from Mongo to pick up inserts made
+by other processes.
+
+A process holds at most ``DEDUP_MAX_SIGNATURES`` signatures. A project's index
+past that size forgets its oldest entries, and the least recently used project
+indexes are dropped first (they reload from Mongo when next needed).
+
+Documents saved before signatures existed are not signed on the request path.
+Sign them once with:
+
+    python -m services.dedup [--project <project_id>]
+"""
+import argparse
+import logging
+import random
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict, defaultdict
+
+from config import Config
+from models.article_body import article_body
+from models.content import get_minhash_docs, get_unsigned_docs, set_minhashes
+from text_utils import char_shingles, word_shingles, strip_html
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x1a905)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def minhash(shingles):
+    """64 x 32-bit MinHash signature of a shingle set, or None for an empty set."""
+    hashes = [zlib.crc32(s.encode()) for s in shingles]
+    if not hashes:
+        return None
+    return [min((a * h + b) % _PRIME for h in hashes) & 0xFFFFFFFF for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def pack(sig):
+    return array('I', sig).tobytes()
+
+
+def unpack(data):
+    sig = array('I')
+    sig.frombytes(data)
+    return list(sig)
+
+
+def title_signature(title):
+    return minhash(char_shingles(title))
+
+
+def article_signature(chapters, faq=''):
+    text = ' '.join(f"{c.get('title', '')} {c.get('content', '')}" for c in chapters) + ' ' + faq
+    return minhash(word_shingles(strip_html(text)))
+
+
+class LSHIndex:
+    def __init__(self, max_size=None):
+        self._buckets = defaultdict(list)
+        self._signatures = {}  # in insertion order, oldest first
+        self.max_size = max_size
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    @staticmethod
+    def _bands(sig):
+        return [hash((i,) + tuple(sig[i * ROWS:(i + 1) * ROWS])) for i in range(BANDS)]
+
+    def add(self, key, sig):
+        if key in self._signatures:
+            return
+        self._signatures[key] = array('I', sig)  # ~4x smaller than a list of ints
+        for band in self._bands(sig):
+            self._buckets[band].append(key)
+        if self.max_size and len(self._signatures) > self.max_size:
+            self.remove(next(iter(self._signatures)))
+
+    def remove(self, key):
+        sig = self._signatures.pop(key, None)
+        if sig is None:
+            return
+        for band in self._bands(sig):
+            bucket = self._buckets[band]
+            bucket.remove(key)
+            if not bucket:
+                del self._buckets[band]
+
+    def query(self, sig, threshold):
+        """Best match at or above ``threshold`` as (key, similarity), or (None, 0.0)."""
+        candidates = set()
+        for band in self._bands(sig):
+            candidates.update(self._buckets.get(band, ()))
+        best, best_score = None, 0.0
+        for key in candidates:
+            score = similarity(sig, self._signatures[key])
+            if score >= threshold and score > best_score:
+                best, best_score = key, score
+        return best, best_score
+
+
+class _ProjectIndex:
+    def __init__(self):
+        self.index = LSHIndex(max_size=Config.DEDUP_MAX_SIGNATURES)
+        self.lock = threading.Lock()
+        self.loaded_until = None
+        self.refreshed_at = 0.0
+
+
+# kind -> (collection, key of the document in the index, signature of a stored document)
+_KINDS = {
+    'title': ('blog_titles', lambda doc: doc['content'], lambda doc: title_signature(doc['content'])),
+    'article': ('articles', lambda doc: str(doc['_id']), lambda doc: article_signature(*article_body(doc))),
+}
+
+_indexes = OrderedDict()  # (project_id, kind) -> _ProjectIndex, least recently used first
+_indexes_lock = threading.Lock()
+
+
+def _project_index(db, project_id, kind):
+    with _indexes_lock:
+        entry = _indexes.get((project_id, kind))
+        if entry is None:
+            entry = _indexes[(project_id, kind)] = _ProjectIndex()
+        _indexes.move_to_end((project_id, kind))
+    if time.monotonic() - entry.refreshed_at >= Config.DEDUP_REFRESH_SECONDS:
+        with entry.lock:
+            _load(db, project_id, kind, entry)
+        _evict()
+    return entry
+
+
+def _evict():
+    """Drop least recently used indexes while the process holds more than DEDUP_MAX_SIGNATURES."""
+    with _indexes_lock:
+        total = sum(len(entry.index) for entry in _indexes.values())
+        while total > Config.DEDUP_MAX_SIGNATURES and len(_indexes) > 1:
+            (project_id, kind), entry = _indexes.popitem(last=False)
+            total -= len(entry.index)
+            logger.info(f"Dropped the in-memory {kind} index of project {project_id}")
+
+
+def _load(db, project_id, kind, entry):
+    """Add signed documents created since the last load; unsigned ones wait for ``backfill_signatures``."""
+    collection, key_of, _ = _KINDS[kind]
+    for doc in get_minhash_docs(db, collection, project_id, since=entry.loaded_until):
+        entry.loaded_until = doc['created_at']
+        key = key_of(doc)
+        if key not in entry.index and doc['minhash']:
+            entry.index.add(key, unpack(doc['minhash']))
+    entry.refreshed_at = time.monotonic()
+
+
+def backfill_signatures(db, project_id=None, batch_size=500):
+    """Sign titles and articles saved without a signature; returns how many were signed.
+
+    Processes already running pick the new signatures up only once their index
+    is rebuilt (a restart, or the index being dropped as least recently used).
+    """
+    signed = 0
+    for kind, (collection, _, signature_of) in _KINDS.items():
+        after = None
+        while docs := get_unsigned_docs(db, collection, project_id, after, batch_size):
+            after = docs[-1]['_id']
+            updates = [(doc['_id'], pack(sig)) for doc in docs if (sig := signature_of(doc)) is not None]
+            if updates:
+                set_minhashes(db, collection, updates)
+                signed += len(updates)
+            logger.info(f"Signed {signed} document(s) so far ({kind})")
+    return signed
+
+
+def filter_duplicate_titles(db, project_id, titles, threshold=None):
+    """Split new titles into (kept, duplicates).
+
+    ``kept`` is a list of (title, packed signature) to store; ``duplicates`` is a
+    list of (title, matching title, similarity). Kept titles are added to the
+    index right away, so near-duplicates within the same batch are caught too.
+    """
+    threshold = Config.DEDUP_TITLE_THRESHOLD if threshold is None else threshold
+    entry = _project_index(db, project_id, 'title')
+    kept, duplicates = [], []
+    with entry.lock:
+        for title in titles:
+            title = title.strip()
+            sig = title_signature(title)
+            if not title or sig is None:
+                continue
+            match, score = entry.index.query(sig, threshold)
+            if match is not None:
+                duplicates.append((title, match, score))
+                continue
+            entry.index.add(title, sig)
+            kept.append((title, pack(sig)))
+    _evict()
+    return kept, duplicates
+
+
+def check_article(db, project_id, chapters, faq='', threshold=None):
+    """Signature of a generated article body and its closest earlier article: (sig, article_id, similarity)."""
+    threshold = Config.DEDUP_ARTICLE_THRESHOLD if threshold is None else threshold
+    sig = article_signature(chapters, faq)
+    if sig is None:
+        return None, None, 0.0
+    entry = _project_index(db, project_id, 'article')
+    with entry.lock:
+        match, score = entry.index.query(sig, threshold)
+    return sig, match, score
+
+
+def register_article(db, project_id, article_id, sig):
+    """Add an article's signature to its project's index, replacing the one of an earlier body."""
+    entry = _project_index(db, project_id, 'article')
+    with entry.lock:
+        entry.index.remove(str(article_id))
+        if sig is not None:
+            entry.index.add(str(article_id), sig)
+
+
+def resign_article(db, article):
+    """Re-sign an article whose body was replaced without a new signature (e.g. a restored revision).
+
+    ``article`` carries its decoded ``chapters`` and ``faq``. Other processes
+    keep the old signature until their index is rebuilt.
+    """
+    sig = article_signature(article.get('chapters', []), article.get('faq', ''))
+    set_minhashes(db, 'articles', [(article['_id'], pack(sig) if sig else None)])
+    register_article(db, article['project_id'], article['_id'], sig)
+    return sig
+
+
+def forget_project(project_id):
+    """Drop a project's in-memory indexes (e.g. after the project is deleted)."""
+    with _indexes_lock:
+        for kind in _KINDS:
+            _indexes.pop((project_id, kind), None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Store MinHash signatures for titles and articles saved without one.')
+    parser.add_argument('--project', help='only this project id')
+    args = parser.parse_args(argv)
+
+    from pymongo import MongoClient
+    logging.basicConfig(level=logging.INFO)
+    db = MongoClient(Config.MONGO_URI)[Config.MONGO_DB]
+    print(f"{backfill_signatures(db, args.project)} document(s) signed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
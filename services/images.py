@@ -0,0 +1,111 @@
+"""Image uploads and chapter images for published posts.
+
+Uploads are decoded, resized to each of ``IMAGE_SIZES`` and encoded as WebP
+in a separate process pool (``IMAGE_WORKERS`` processes), so a batch of large
+photos does not hold the web process's GIL. The pool uses ``spawn``, not
+``fork``: the web process has a Mongo client and scheduler threads that a
+forked child must not inherit. The upload request returns at once. The image
+becomes pickable when its renditions are stored. An upload whose web process
+died before the conversion finished stays ``processing`` until the scheduler
+leader marks it failed after ``STALE_AFTER``.
+
+Uploads need the ``Pillow`` package (in requirements.txt). Link images need
+nothing.
+"""
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+from config import Config
+from models.image import add_pending_image, store_renditions, mark_image_failed, fail_stale_uploads, get_image_file
+
+logger = logging.getLogger(__name__)
+
+# Chapters that get an image, as in the legacy workflow's nine link_image lookups
+CHAPTER_IMAGES = 9
+# An upload still processing after this died with its web process
+STALE_AFTER = timedelta(minutes=30)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def image_sizes():
+    """[(name, max width)] from IMAGE_SIZES, largest first; the first is the one used in posts."""
+    sizes = []
+    for item in Config.IMAGE_SIZES.split(','):
+        name, _, width = item.partition(':')
+        if name.strip() and width.strip().isdigit():
+            sizes.append((name.strip(), int(width)))
+    return sorted(sizes, key=lambda s: -s[1])
+
+
+def _pillow():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise RuntimeError("Image uploads need the 'Pillow' package (pip install Pillow)") from None
+    return Image, ImageOps
+
+
+def _render(data, sizes, quality):
+    """Runs in a pool process: [(size, webp bytes, width, height)] for one uploaded image."""
+    Image, ImageOps = _pillow()
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    renditions = []
+    for name, width in sizes:
+        resized = image
+        if image.width > width:
+            resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        out = io.BytesIO()
+        resized.save(out, 'WEBP', quality=quality, method=4)
+        renditions.append((name, out.getvalue(), resized.width, resized.height))
+    return renditions
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=Config.IMAGE_WORKERS,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def submit_upload(db, project_id, filename, data, tags, alt=''):
+    """Queue one uploaded file for conversion; returns the image id (state ``processing``)."""
+    _pillow()  # fail in the request, not silently in the pool
+    image_id = add_pending_image(db, project_id, filename, tags, alt)
+    future = _pool().submit(_render, data, image_sizes(), Config.IMAGE_WEBP_QUALITY)
+
+    def _store(done):
+        try:
+            store_renditions(db, image_id, done.result())
+        except Exception as e:
+            logger.warning(f"Image {filename} ({image_id}) for project {project_id} failed: {e}")
+            mark_image_failed(db, image_id, str(e)[:300])
+
+    future.add_done_callback(_store)
+    return image_id
+
+
+def fail_interrupted_uploads(db):
+    """Fail uploads left processing by a web process that died; returns how many."""
+    failed = fail_stale_uploads(db, datetime.now(timezone.utc) - STALE_AFTER,
+                                'Conversion was interrupted; upload the file again')
+    if failed:
+        logger.info(f"Marked {failed} interrupted image upload(s) as failed")
+    return failed
+
+
+def post_rendition(db, image):
+    """The image_files document embedded in posts for a library upload."""
+    for name, _ in image_sizes():
+        if name in image.get('sizes', {}):
+            return get_image_file(db, str(image['_id']), name)
+    return None
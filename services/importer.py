@@ -0,0 +1,211 @@
+"""Streaming import of keyword and blog-title lists, plus the keyword ``norm`` backfill.
+
+    python -m services.importer keywords <project_id> keywords.csv
+    python -m services.importer titles <project_id> titles.txt --keyword "default keyword"
+    python -m services.importer --backfill-norms
+
+Files are read row by row and written in batches of ``BATCH_SIZE``, so memory
+stays flat regardless of file size. Text files hold one entry per line. CSV
+files use the first column, and for titles an optional second column gives the
+keyword. Keywords go through add_keywords (normalized upserts). Titles go
+through the near-duplicate filter like generated ones. That filter keeps at
+most ``DEDUP_MAX_SIGNATURES`` titles in memory, so a million-row title list
+is checked against the project's most recent titles rather than all of them.
+"""
+import argparse
+import csv
+import io
+import logging
+import os
+import sys
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import islice
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models.content import add_keywords, add_blog_titles
+from services.dedup import filter_duplicate_titles
+from text_utils import normalize_keyword
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+KINDS = ('keywords', 'titles')
+_HEADERS = {'keyword', 'keywords', 'title', 'titles', 'text', 'کلمه کلیدی', 'عنوان'}
+
+
+def iter_rows(stream, filename=''):
+    """Yield the columns of each non-empty row of a binary or text stream."""
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    if filename.lower().endswith('.csv'):
+        rows = csv.reader(text)
+    else:
+        rows = ([line] for line in text)
+    first = True
+    for row in rows:
+        row = [col.strip() for col in row]
+        if not row or not row[0]:
+            continue
+        if first and normalize_keyword(row[0]) in _HEADERS:
+            first = False
+            continue
+        first = False
+        yield row
+
+
+def _batches(iterable, size):
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def add_rows(db, project_id, kind, rows, keyword=''):
+    """Store one batch of keyword rows or (title, keyword) rows; returns how many were new.
+
+    Keywords are deduplicated on their normalized form and titles against the
+    project's near-duplicate index, exactly as for generated content.
+    """
+    if kind == 'keywords':
+        return add_keywords(db, project_id, [row[0] for row in rows])
+    by_keyword = defaultdict(list)
+    for row in rows:
+        by_keyword[row[1] if len(row) > 1 and row[1] else keyword].append(row[0])
+    added = 0
+    for kw, titles in by_keyword.items():
+        kept, _ = filter_duplicate_titles(db, project_id, titles)
+        if kept:
+            added += add_blog_titles(db, project_id, [t for t, _ in kept], kw, [m for _, m in kept])
+    return added
+
+
+def import_file(db, project_id, kind, stream, filename='', keyword='', progress=None, batch_size=BATCH_SIZE):
+    """Import a keyword or title list; returns {'read', 'added', 'skipped'}.
+
+    ``progress`` is called with the running totals after every batch.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown import kind: {kind}")
+    totals = {'read': 0, 'added': 0, 'skipped': 0}
+    for batch in _batches(iter_rows(stream, filename), batch_size):
+        added = add_rows(db, project_id, kind, batch, keyword)
+        totals['read'] += len(batch)
+        totals['added'] += added
+        totals['skipped'] += len(batch) - added
+        if progress:
+            progress(totals)
+    logger.info(f"Imported {totals['added']} of {totals['read']} {kind} for project {project_id}")
+    return totals
+
+
+# --- Background imports started from the dashboard ---
+# Status lives in ``import_jobs`` (expired after a week), so any web worker can report on an import.
+
+def start_import(db, project_id, kind, path, filename, keyword=''):
+    """Import an uploaded file (already saved to ``path``) in a thread; returns the import id.
+
+    The file is deleted when the import finishes.
+    """
+    import_id = uuid.uuid4().hex[:12]
+    now = datetime.now(timezone.utc)
+    db.import_jobs.insert_one({'_id': import_id, 'project_id': project_id, 'kind': kind, 'filename': filename,
+                               'state': 'running', 'read': 0, 'added': 0, 'skipped': 0, 'error': '',
+                               'created_at': now, 'finished_at': None})
+
+    def update(**fields):
+        db.import_jobs.update_one({'_id': import_id}, {'$set': fields})
+
+    def run():
+        try:
+            with open(path, 'rb') as f:
+                import_file(db, project_id, kind, f, filename, keyword, progress=lambda totals: update(**totals))
+            update(state='done', finished_at=datetime.now(timezone.utc))
+        except Exception as e:
+            logger.exception(f"Import {import_id} failed")
+            update(state='failed', error=str(e), finished_at=datetime.now(timezone.utc))
+        finally:
+            os.unlink(path)
+
+    threading.Thread(target=run, name=f'lagos-import-{import_id}', daemon=True).start()
+    return import_id
+
+
+def get_import(db, import_id, project_id):
+    """An import's status, or None if there is no such import in the project."""
+    status = db.import_jobs.find_one({'_id': import_id, 'project_id': project_id})
+    if status:
+        status['id'] = status.pop('_id')
+    return status
+
+
+# --- Migration ---
+def backfill_keyword_norms(db, batch_size=BATCH_SIZE):
+    """Set ``norm`` on keywords stored before normalization; returns (updated, removed).
+
+    A legacy keyword whose norm already exists in its project is a duplicate and
+    is deleted. The oldest copy is the one kept.
+    """
+    updated = removed = 0
+    while True:
+        docs = list(db.keywords.find({'norm': {'$exists': False}}, {'project_id': 1, 'text': 1})
+                    .sort('_id', 1).limit(batch_size))
+        if not docs:
+            return updated, removed
+        ops = [UpdateOne({'_id': d['_id']}, {'$set': {'norm': normalize_keyword(d.get('text', ''))}})
+               for d in docs]
+        duplicates = []
+        try:
+            result = db.keywords.bulk_write(ops, ordered=False)
+            updated += result.modified_count
+        except BulkWriteError as e:
+            errors = e.details['writeErrors']
+            if any(err['code'] != 11000 for err in errors):
+                raise
+            updated += e.details['nModified']
+            duplicates = [docs[err['index']]['_id'] for err in errors]
+        if duplicates:
+            removed += db.keywords.delete_many({'_id': {'$in': duplicates}}).deleted_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import keyword or title lists into a project.')
+    parser.add_argument('kind', nargs='?', choices=KINDS)
+    parser.add_argument('project_id', nargs='?')
+    parser.add_argument('path', nargs='?', help='CSV or text file (- for stdin)')
+    parser.add_argument('--keyword', default='', help='keyword stored with imported titles')
+    parser.add_argument('--backfill-norms', action='store_true', help='normalize keywords stored before dedupe')
+    args = parser.parse_args(argv)
+    if not args.backfill_norms and not (args.kind and args.project_id and args.path):
+        parser.error('kind, project_id and path are required')
+
+    from pymongo import MongoClient
+    from config import Config
+    logging.basicConfig(level=logging.INFO)
+    db = MongoClient(Config.MONGO_URI)[Config.MONGO_DB]
+
+    if args.backfill_norms:
+        updated, removed = backfill_keyword_norms(db)
+        print(f"{updated} keyword(s) normalized, {removed} duplicate(s) removed")
+        return 0
+
+    def report(totals):
+        print(f"\r{totals['read']} read, {totals['added']} added, {totals['skipped']} skipped",
+              end='', file=sys.stderr, flush=True)
+
+    if args.path == '-':
+        import_file(db, args.project_id, args.kind, sys.stdin.buffer, keyword=args.keyword, progress=report)
+    else:
+        with open(args.path, 'rb') as f:
+            import_file(db, args.project_id, args.kind, f, args.path, args.keyword, progress=report)
+    print(file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""Generation actions run as background jobs instead of inside the HTTP request.
+
+Submitting an action returns a job id at once. The job runs on a small
+per-process thread pool (``GENERATION_WORKERS``). Its state and numbered
+progress events are kept in ``generation_jobs``, so any web worker can report
+on a job started by another:
+
+    GET /content/<project_id>/jobs/<job_id>          JSON status
+    GET /content/<project_id>/jobs/<job_id>/events   Server-Sent Events
+
+Each event is sent with its number as the SSE ``id``, so a reconnecting
+EventSource resumes after ``Last-Event-ID``. A stream closes after
+``STREAM_SECONDS`` and the browser reconnects, so watching a ten-minute
+pipeline never pins a web worker for ten minutes.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# action -> pipeline steps it runs, in order (see ContentGenerator.STEPS)
+ACTIONS = {
+    'keywords': ['keywords'],
+    'titles': ['titles'],
+    'article': ['article'],
+    'ads': ['ads'],
+    'supplementary': ['bein', 'info', 'bullets'],
+    'full': ['keywords', 'titles', 'article', 'ads', 'bein', 'info', 'bullets'],
+    'regenerate': ['regenerate'],
+}
+# Actions on one article; they need an article_id and every other action refuses one
+ARTICLE_ACTIONS = ('regenerate',)
+ACTIVE = ('queued', 'running')
+FINISHED = ('done', 'failed')
+
+MAX_EVENTS = 200
+STREAM_SECONDS = 55
+# An unfinished job not updated for this long died with its process and no longer blocks a resubmit
+STALE_SECONDS = 1800
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.GENERATION_WORKERS, thread_name_prefix='lagos-gen')
+        return _executor
+
+
+def submit_job(app, project_id, action, article_id=None):
+    """Queue a generation action; returns (job_id, created).
+
+    While the same action is still queued or running for the project (and
+    article), its job is returned instead of starting another, so a double
+    click costs nothing.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown generation action: {action}")
+    if (action in ARTICLE_ACTIONS) != bool(article_id):
+        raise ValueError(f"Generation action {action} " + ("needs an article_id" if action in ARTICLE_ACTIONS
+                                                            else "does not take an article_id"))
+    db = app.extensions['mongo_db']
+    now = datetime.now(timezone.utc)
+    existing = db.generation_jobs.find_one(
+        {'project_id': project_id, 'action': action, 'article_id': article_id, 'state': {'$in': list(ACTIVE)},
+         'updated_at': {'$gte': now - timedelta(seconds=STALE_SECONDS)}},
+        {'_id': 1},
+    )
+    if existing:
+        return existing['_id'], False
+
+    job_id = uuid.uuid4().hex[:12]
+    db.generation_jobs.insert_one({
+        '_id': job_id,
+        'project_id': project_id,
+        'action': action,
+        'article_id': article_id,
+        'state': 'queued',
+        'steps': ACTIONS[action],
+        'step': None,
+        'steps_done': 0,
+        'results': {},
+        'error': '',
+        'events': [],
+        'last_seq': 0,
+        'created_at': now,
+        'updated_at': now,
+        'started_at': None,
+        'finished_at': None,
+    })
+    _pool().submit(_run, app, job_id, project_id, action, article_id)
+    return job_id, True
+
+
+def get_job(db, job_id, project_id=None, events=False):
+    """A job's status document (without its events unless ``events``), or None."""
+    query = {'_id': job_id}
+    if project_id is not None:
+        query['project_id'] = project_id
+    return db.generation_jobs.find_one(query, None if events else {'events': 0})
+
+
+def _jsonable(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return str(value)
+
+
+class _Reporter:
+    """Progress callback handed to ContentGenerator: ``report(event, **data)``."""
+
+    def __init__(self, db, job_id):
+        self.db = db
+        self.job_id = job_id
+        self.seq = 0
+
+    def __call__(self, event, **data):
+        self.seq += 1
+        now = datetime.now(timezone.utc)
+        data = {k: _jsonable(v) for k, v in data.items()}
+        update = {
+            '$push': {'events': {'$each': [{'seq': self.seq, 'event': event, 'at': now, **data}],
+                                 '$slice': -MAX_EVENTS}},
+            '$set': {'last_seq': self.seq, 'updated_at': now},
+        }
+        if event == 'step':
+            update['$set']['step'] = data['step']
+            if data['status'] != 'started':
+                update['$set'][f"results.{data['step']}"] = data.get('result', data.get('error'))
+                update['$inc'] = {'steps_done': 1}
+        elif event == 'state':
+            update['$set'].update(state=data['state'], error=data.get('error', ''))
+            update['$set']['started_at' if data['state'] == 'running' else 'finished_at'] = now
+        self.db.generation_jobs.update_one({'_id': self.job_id}, update)
+
+
+def _run(app, job_id, project_id, action, article_id=None):
+    with app.app_context():
+        from app import get_db, get_fernet
+        from models.content import get_article
+        from models.project import get_project
+        from services.content_generator import ContentGenerator
+
+        db = get_db()
+        report = _Reporter(db, job_id)
+        report('state', state='running')
+        try:
+            project = get_project(db, project_id)
+            if not project:
+                raise LookupError(f"Project {project_id} not found")
+            article = None
+            if article_id:
+                article = get_article(db, article_id)
+                if not article or article['project_id'] != project_id:
+                    raise LookupError(f"Article {article_id} not found in project {project_id}")
+            results = ContentGenerator(db, get_fernet(), progress=report).run_steps(project, ACTIONS[action],
+                                                                                    article=article)
+            errors = [f"{step}: {r[7:]}" for step, r in results.items()
+                      if isinstance(r, str) and r.startswith('Error: ')]
+            if len(errors) == len(results):
+                report('state', state='failed', error='; '.join(errors))
+            else:
+                report('state', state='done', error='; '.join(errors))
+        except Exception as e:
+            logger.exception(f"Generation job {job_id} ({action}) failed for {project_id}")
+            report('state', state='failed', error=str(e))
+
+
+def _sse(event):
+    data = {k: v for k, v in event.items() if k not in ('seq', 'event')}
+    return f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def stream_events(db, job_id, after=0, poll_seconds=1.0, max_seconds=STREAM_SECONDS):
+    """SSE text for a job's events numbered above ``after``.
+
+    Sends ``end`` and stops once the job has finished. Otherwise it stops after
+    ``max_seconds`` and the client reconnects with Last-Event-ID. The events
+    array is only fetched when ``last_seq`` shows there is something new.
+    """
+    yield 'retry: 2000\n\n'
+    deadline = time.monotonic() + max_seconds
+    quiet_since = time.monotonic()
+    while True:
+        job = db.generation_jobs.find_one({'_id': job_id}, {'last_seq': 1, 'state': 1})
+        if not job:
+            return
+        if job.get('last_seq', 0) > after:
+            events = db.generation_jobs.find_one({'_id': job_id}, {'events': 1}).get('events', [])
+            for event in events:
+                if event['seq'] > after:
+                    after = event['seq']
+                    yield _sse(event)
+            quiet_since = time.monotonic()
+        if job['state'] in FINISHED:
+            yield 'event: end\ndata: {}\n\n'
+            return
+        if time.monotonic() >= deadline:
+            return
+        if time.monotonic() - quiet_since >= 15:
+            # Keeps proxies from closing an idle stream while a long step runs
+            yield ': keep-alive\n\n'
+            quiet_since = time.monotonic()
+        time.sleep(poll_seconds)
@@ -0,0 +1,114 @@
+"""Mongo-lease leader election.
+
+Every process that may run the scheduler campaigns for one lease document. The
+holder renews it every third of the lease; if it dies, another process takes
+over once the lease expires (``LEADER_LEASE_SECONDS``, 15 by default). Each
+renewal is cut off by ``pymongo.timeout`` after a third of the lease, and a
+watchdog demotes the leader once two thirds of the lease have passed since its
+last successful renewal started, whether the renewal failed or is still hanging.
+Two leaders can then overlap only if the whole process stalls for longer than
+the remaining third (e.g. a long GC pause or a suspended VM).
+"""
+import atexit
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+import pymongo
+
+from models.scheduler_state import acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    def __init__(self, db, name, lease_seconds, on_elected, on_demoted, on_tick=None, describe=None,
+                 tick_interval=1.0):
+        self.db = db
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.on_tick = on_tick
+        self.describe = describe
+        self.tick_interval = tick_interval
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.is_leader = False
+        self._renewed_at = 0.0  # monotonic start of the last successful renewal
+        self._state_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f'lagos-leader-{self.name}', daemon=True)
+        self._thread.start()
+        threading.Thread(target=self._watchdog, name=f'lagos-leader-{self.name}-watchdog', daemon=True).start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.is_leader:
+            self._set_leader(False)
+            try:
+                release_lease(self.db, self.name, self.holder)
+            except Exception as e:
+                logger.warning(f"Could not release {self.name} lease: {e}")
+
+    def _run(self):
+        renew_every = self.lease_seconds / 3
+        next_renew = 0.0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_renew:
+                self._renew()
+                next_renew = now + renew_every
+            if self.is_leader and self.on_tick:
+                try:
+                    self.on_tick()
+                except Exception as e:
+                    logger.warning(f"{self.name} leader tick failed: {e}")
+            self._stop.wait(self.tick_interval)
+
+    def _lease_safe(self):
+        """Whether the last successful renewal is still safely inside the lease."""
+        return time.monotonic() - self._renewed_at < self.lease_seconds * 2 / 3
+
+    def _renew(self):
+        started = time.monotonic()
+        try:
+            info = self.describe() if self.is_leader and self.describe else None
+            with pymongo.timeout(self.lease_seconds / 3):
+                acquired = acquire_lease(self.db, self.name, self.holder, self.lease_seconds, info)
+            if acquired:
+                # The server stamped the lease some time after this
+                self._renewed_at = started
+        except Exception as e:
+            logger.warning(f"Could not renew {self.name} lease: {e}")
+            # Keep leading only while our last renewal is safely inside the lease
+            acquired = self.is_leader and self._lease_safe()
+        if acquired and not self._lease_safe():
+            # The call took so long that the watchdog may already have stepped down
+            acquired = False
+        self._set_leader(acquired)
+
+    def _watchdog(self):
+        """Demote the leader while a renewal hangs; the renewal thread cannot, it is waiting on Mongo."""
+        while not self._stop.wait(self.tick_interval):
+            if self.is_leader and not self._lease_safe():
+                logger.warning(f"{self.name} lease renewal overdue; stepping down")
+                self._set_leader(False)
+
+    def _set_leader(self, leader):
+        with self._state_lock:
+            if leader == self.is_leader:
+                return
+            self.is_leader = leader
+            logger.info(f"{self.holder} {'acquired' if leader else 'lost'} {self.name} leadership")
+            try:
+                (self.on_elected if leader else self.on_demoted)()
+            except Exception as e:
+                logger.error(f"{self.name} leadership change handler failed: {e}")
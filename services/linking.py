@@ -0,0 +1,229 @@
+"""Internal links from a post being published to the project's earlier published articles.
+
+Each project has an in-memory Aho-Corasick automaton over the folded keywords
+(``tag``) and titles of its published articles, each mapped to the article's
+WordPress URL. A chapter is scanned in one pass over its text, so linking
+costs time linear in the chapter's length however many thousands of targets
+the project has. Only whole-word matches are linked. Text inside headings,
+existing anchors, code and scripts is left alone. The longest match wins, each
+target is linked at most once per post, and a post gets at most
+``INTERNAL_LINKS_MAX`` links, no more than one per chapter.
+
+Publishing an article adds it as a target right away. Adding a pattern only
+extends the trie; failure links are recomputed once, on the next scan after
+any additions. Every ``INTERNAL_LINKS_REFRESH_SECONDS`` the automaton is topped
+up from Mongo to pick up articles published by other processes.
+"""
+import html
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+
+from config import Config
+from models.content import get_link_targets
+from text_utils import fold_with_offsets
+
+logger = logging.getLogger(__name__)
+
+MIN_PATTERN_CHARS = 3
+LINKS_PER_CHAPTER = 1
+
+# Text inside these elements is never linked
+_SKIP_TAGS = {'a', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'code', 'pre', 'script', 'style', 'button'}
+_MARKUP = re.compile(r'(<[^>]*>)')
+_TAG_NAME = re.compile(r'<\s*(/?)\s*([a-zA-Z][a-zA-Z0-9]*)')
+_HREF = re.compile(r'''href\s*=\s*["']([^"']+)["']''', re.IGNORECASE)
+
+
+def _is_word_char(c):
+    return c.isalnum() or c == '_'
+
+
+class Automaton:
+    """Aho-Corasick automaton over folded strings; each pattern maps to one target."""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._target = [None]  # target of the pattern ending at this node
+        self._length = [0]
+        self._output = [0]  # nearest node on the failure chain that ends a pattern
+        self._dirty = False
+
+    def add(self, pattern, target):
+        """Map ``pattern`` (already folded) to ``target``; a later add of the same pattern replaces it."""
+        node = 0
+        for c in pattern:
+            child = self._goto[node].get(c)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._target.append(None)
+                self._length.append(self._length[node] + 1)
+                self._output.append(0)
+                self._goto[node][c] = child
+                self._dirty = True
+            node = child
+        if self._target[node] is None:
+            self._dirty = True
+        self._target[node] = target
+
+    def _build(self):
+        """Breadth-first pass setting failure and output links."""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._output[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for c, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and c not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(c, 0)
+                self._fail[child] = fail
+                self._output[child] = fail if self._target[fail] is not None else self._output[fail]
+                queue.append(child)
+        self._dirty = False
+
+    def matches(self, text):
+        """(start, end, target) for every pattern occurrence in ``text``."""
+        if self._dirty:
+            self._build()
+        goto, fail, target, length, output = self._goto, self._fail, self._target, self._length, self._output
+        node = 0
+        for i, c in enumerate(text):
+            while node and c not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(c, 0)
+            hit = node if target[node] is not None else output[node]
+            while hit:
+                yield i + 1 - length[hit], i + 1, target[hit]
+                hit = output[hit]
+
+
+class _ProjectTargets:
+    def __init__(self):
+        self.automaton = Automaton()
+        self.urls = {}  # article id -> (url, title)
+        self.lock = threading.Lock()
+        self.loaded_until = None  # (published_at, _id) of the last article loaded
+        self.refreshed_at = 0.0
+
+    def add(self, article):
+        url = article.get('wp_post_url')
+        if not url:
+            return
+        article_id = str(article['_id'])
+        self.urls[article_id] = (url, article.get('article_title', ''))
+        for text in (article.get('tag'), article.get('article_title')):
+            pattern, _ = fold_with_offsets((text or '').strip())
+            if len(pattern) >= MIN_PATTERN_CHARS:
+                self.automaton.add(pattern, article_id)
+
+
+_projects = {}
+_projects_lock = threading.Lock()
+
+
+def _project_targets(db, project_id):
+    with _projects_lock:
+        entry = _projects.get(project_id)
+        if entry is None:
+            entry = _projects[project_id] = _ProjectTargets()
+    if time.monotonic() - entry.refreshed_at >= Config.INTERNAL_LINKS_REFRESH_SECONDS:
+        with entry.lock:
+            for article in get_link_targets(db, project_id, after=entry.loaded_until):
+                entry.loaded_until = (article['published_at'], article['_id'])
+                entry.add(article)
+            entry.refreshed_at = time.monotonic()
+    return entry
+
+
+class InternalLinker:
+    """Adds internal links to the chapters of one post, keeping count across chapters."""
+
+    def __init__(self, db, project_id, article):
+        self.exclude = str(article['_id'])
+        self.remaining = Config.INTERNAL_LINKS_MAX
+        self.linked = set()  # URLs already linked in this post
+        self.count = 0
+        self._targets = _project_targets(db, project_id) if self.remaining > 0 else None
+
+    def link(self, markup):
+        """``markup`` with up to LINKS_PER_CHAPTER links added to its text."""
+        if not self._targets or self.remaining <= 0 or not markup:
+            return markup
+        parts = _MARKUP.split(markup)
+        skip_depth = {}
+        budget = min(LINKS_PER_CHAPTER, self.remaining)
+        for i, part in enumerate(parts):
+            if i % 2:
+                tag = _TAG_NAME.match(part)
+                if tag and tag.group(2).lower() in _SKIP_TAGS and not part.rstrip().endswith('/>'):
+                    name = tag.group(2).lower()
+                    skip_depth[name] = max(0, skip_depth.get(name, 0) + (-1 if tag.group(1) else 1))
+                    href = _HREF.search(part) if name == 'a' and not tag.group(1) else None
+                    if href:
+                        self.linked.add(html.unescape(href.group(1)))
+                continue
+            if budget and part.strip() and not any(skip_depth.values()):
+                parts[i], added = self._link_text(part, budget)
+                budget -= added
+        return ''.join(parts)
+
+    def _link_text(self, text, budget):
+        folded, offsets = fold_with_offsets(text)
+        with self._targets.lock:
+            found = list(self._targets.automaton.matches(folded))
+            urls = self._targets.urls
+            candidates = []
+            for start, end, target in found:
+                if target == self.exclude or urls[target][0] in self.linked:
+                    continue
+                if (start > 0 and _is_word_char(folded[start - 1])) or \
+                        (end < len(folded) and _is_word_char(folded[end])):
+                    continue
+                candidates.append((start, -end, target))
+        # Leftmost first, longest among those starting at the same place
+        candidates.sort()
+        chosen, taken_until = [], 0
+        for start, neg_end, target in candidates:
+            url, title = urls[target]
+            if len(chosen) >= budget or start < taken_until or url in self.linked:
+                continue
+            end = offsets[-neg_end - 1] + 1
+            while end < len(text) and unicodedata.category(text[end]) == 'Mn':
+                end += 1  # keep trailing diacritics inside the link
+            chosen.append((offsets[start], end, url, title))
+            taken_until = -neg_end
+            self.linked.add(url)
+        if not chosen:
+            return text, 0
+        out, pos = [], 0
+        for start, end, url, title in chosen:
+            out += [text[pos:start],
+                    f'<a href="{html.escape(url)}" title="{html.escape(title)}">{text[start:end]}</a>']
+            pos = end
+        out.append(text[pos:])
+        self.count += len(chosen)
+        self.remaining -= len(chosen)
+        return ''.join(out), len(chosen)
+
+
+def add_link_target(db, project_id, article):
+    """Make a just-published article (with ``wp_post_url`` set) a link target."""
+    entry = _project_targets(db, project_id)
+    with entry.lock:
+        entry.add(article)
+
+
+def forget_project(project_id):
+    """Drop a project's link targets (e.g. after the project is deleted)."""
+    with _projects_lock:
+        _projects.pop(project_id, None)
@@ -0,0 +1,214 @@
+"""In-process metrics registry rendered in the Prometheus text exposition format.
+
+Counters, gauges and histograms are plain Python objects guarded by a lock, so
+recording a sample costs a dict lookup and a bisect. Every process keeps its own
+registry; scrape each worker separately when running several.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][idx] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def render_metrics():
+    """Render every registered metric in the Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# --- Metric definitions ---
+PROVIDER_REQUESTS = Counter(
+    'lagos_provider_requests_total', 'AI provider calls.',
+    ('provider', 'key', 'step', 'outcome'))
+PROVIDER_LATENCY = Histogram(
+    'lagos_provider_request_seconds', 'AI provider call latency.',
+    ('provider', 'key', 'step', 'outcome'))
+PROVIDER_EWMA_LATENCY = Gauge(
+    'lagos_provider_ewma_seconds', 'EWMA provider latency used for routing.',
+    ('provider', 'step'))
+PROVIDER_EWMA_ERRORS = Gauge(
+    'lagos_provider_ewma_error_rate', 'EWMA provider error rate used for routing.',
+    ('provider', 'key'))
+PROVIDER_PROMPT_TOKENS = Counter(
+    'lagos_provider_prompt_tokens_total', 'AI provider prompt tokens by cache outcome (cached, cache_write, uncached).',
+    ('provider', 'step', 'template', 'cache'))
+PROVIDER_HEDGES = Counter(
+    'lagos_provider_hedges_total', 'Hedged provider calls by winning request.',
+    ('step', 'winner'))
+MONGO_COMMAND_LATENCY = Histogram(
+    'lagos_mongo_command_seconds', 'MongoDB command latency.',
+    ('command', 'collection', 'outcome'),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+WP_PUBLISH_REQUESTS = Counter(
+    'lagos_wp_publish_requests_total', 'WordPress REST calls by HTTP status.',
+    ('status',))
+WP_PUBLISH_LATENCY = Histogram(
+    'lagos_wp_publish_seconds', 'WordPress REST call latency.',
+    ('status',))
+JOB_DURATION = Histogram(
+    'lagos_job_seconds', 'Scheduler job duration.',
+    ('job', 'outcome'))
+JOB_QUEUE_WAIT = Histogram(
+    'lagos_job_queue_wait_seconds', 'Time a due scheduler job waited for a dispatcher slot.',
+    ('job',))
+PROVIDER_IN_FLIGHT = Gauge(
+    'lagos_provider_in_flight', 'AI provider calls currently running.',
+    ('provider',))
+QUEUE_DEPTH = Gauge(
+    'lagos_queue_depth', 'Pending items per project and queue, sampled at scrape time.',
+    ('project', 'queue'))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener feeding ``MONGO_COMMAND_LATENCY``."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ''
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        self._record(event, 'ok')
+
+    def failed(self, event):
+        self._record(event, 'error')
+
+    def _record(self, event, outcome):
+        collection = self._collections.pop((event.connection_id, event.request_id), '')
+        MONGO_COMMAND_LATENCY.observe(
+            event.duration_micros / 1e6,
+            command=event.command_name, collection=collection, outcome=outcome)
@@ -0,0 +1,276 @@
+"""On-demand profiling of single requests and scheduler jobs, plus slow Mongo command capture.
+
+Nothing here costs anything until an admin asks for it: a request is profiled
+only when it carries ``?_profile=cprofile`` (or ``?_profile=sample``) and a job
+only when a trigger was armed for it from the profiling page. Each process
+reads the armed job ids at most every ``TRIGGER_REFRESH_SECONDS``, so a job run
+costs no query, and an armed trigger is picked up within that time.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from flask import g, request
+from flask_login import current_user
+from pymongo import monitoring
+
+from config import Config
+from models.profile import save_profile, pop_job_profile_trigger, get_job_profile_trigger_ids
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ['cprofile', 'sample']
+
+SLOW_COMMANDS = deque(maxlen=200)
+
+TRIGGER_REFRESH_SECONDS = 10
+
+# tracemalloc is process-wide; sessions tracing memory share it and the last one out stops it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_ours = False
+
+_armed_lock = threading.Lock()
+_armed = {'job_ids': frozenset(), 'checked': None}
+
+
+class SamplingProfiler:
+    """Low-overhead profiler that samples one thread's stack at a fixed interval."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='lagos-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self._stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def report(self, limit=40):
+        if not self.samples:
+            return 'No samples collected.'
+        leaves = Counter()
+        for stack, n in self._stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += n
+        lines = [f'{self.samples} samples every {self.interval * 1000:.0f} ms', '', 'Top frames (self):']
+        for frame, n in leaves.most_common(limit):
+            lines.append(f'{n / self.samples:7.1%}  {frame}')
+        lines += ['', 'Top stacks (collapsed):']
+        for stack, n in self._stacks.most_common(limit):
+            lines.append(f'{n:6d}  {stack}')
+        return '\n'.join(lines)
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_ours
+    with _tracing_lock:
+        if _tracing_users == 0:
+            # Tracing started outside this module (e.g. PYTHONTRACEMALLOC) is never stopped here
+            _tracing_ours = not tracemalloc.is_tracing()
+            if _tracing_ours:
+                tracemalloc.start(25)
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_ours:
+            tracemalloc.stop()
+
+
+class ProfileSession:
+    """One profiling run: cProfile or sampling, optionally with tracemalloc snapshots."""
+
+    def __init__(self, mode='cprofile', trace_memory=False):
+        self.mode = mode if mode in PROFILE_MODES else 'cprofile'
+        self.trace_memory = trace_memory
+        self._profiler = None
+        self._mem_before = None
+        self._start = 0.0
+
+    def start(self):
+        if self.trace_memory:
+            _acquire_tracing()
+            self._mem_before = tracemalloc.take_snapshot()
+        if self.mode == 'sample':
+            self._profiler = SamplingProfiler(threading.get_ident())
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self):
+        """Stop profiling; returns (duration_seconds, report, memory_report)."""
+        duration = time.perf_counter() - self._start
+        if self.mode == 'sample':
+            self._profiler.stop()
+            report = self._profiler.report()
+        else:
+            self._profiler.disable()
+            out = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=out)
+            stats.sort_stats('cumulative').print_stats(60)
+            report = out.getvalue()
+
+        memory_report = ''
+        if self.trace_memory:
+            try:
+                after = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                _release_tracing()
+            lines = [f'Traced memory (process-wide): current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB', '']
+            for stat in after.compare_to(self._mem_before, 'lineno')[:30]:
+                lines.append(str(stat))
+            memory_report = '\n'.join(lines)
+        return duration, report, memory_report
+
+
+def _is_admin():
+    return current_user.is_authenticated and getattr(current_user, 'role', '') == 'admin'
+
+
+def init_profiling(app):
+    """Register request hooks so an admin can profile one request with ``?_profile=<mode>``."""
+
+    @app.before_request
+    def _start_request_profile():
+        mode = request.args.get('_profile')
+        if mode and _is_admin():
+            g.profile_session = ProfileSession(mode).start()
+
+    @app.after_request
+    def _finish_request_profile(response):
+        session = g.pop('profile_session', None)
+        if session is None:
+            return response
+        duration, report, memory_report = session.stop()
+        try:
+            from app import get_db
+            profile_id = save_profile(get_db(), 'request', f'{request.method} {request.full_path}',
+                                      session.mode, duration, report, memory_report,
+                                      user=current_user.username)
+            response.headers['X-Profile-Id'] = profile_id
+        except Exception as e:
+            logger.warning(f"Could not store request profile: {e}")
+        return response
+
+
+def _armed_job_ids(db):
+    """Ids of jobs with an armed trigger, re-read at most every TRIGGER_REFRESH_SECONDS."""
+    with _armed_lock:
+        now = time.monotonic()
+        if _armed['checked'] is None or now - _armed['checked'] >= TRIGGER_REFRESH_SECONDS:
+            _armed['checked'] = now
+            try:
+                _armed['job_ids'] = frozenset(get_job_profile_trigger_ids(db))
+            except Exception as e:
+                logger.warning(f"Could not read job profile triggers: {e}")
+        return _armed['job_ids']
+
+
+def run_job_profiled(db, job_id, func, trace_memory=False):
+    """Run ``func()``, profiling it if a trigger was armed for ``job_id``."""
+    trigger = pop_job_profile_trigger(db, job_id) if job_id in _armed_job_ids(db) else None
+    if not trigger:
+        return func()
+
+    session = ProfileSession(trigger.get('mode', 'cprofile'), trace_memory=trace_memory).start()
+    try:
+        return func()
+    finally:
+        duration, report, memory_report = session.stop()
+        save_profile(db, 'job', job_id, session.mode, duration, report, memory_report,
+                     user=trigger.get('user', ''))
+        logger.info(f"Stored profile for job {job_id} ({duration:.2f}s)")
+
+
+def _shape(value):
+    """Keys and operators of a filter or pipeline stage, with every value replaced by '?'."""
+    if isinstance(value, dict):
+        return {k: _shape(v) for k, v in value.items()}
+    if isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+        return [_shape(v) for v in value[:5]]
+    return '?'
+
+
+def command_shape(command_name, command):
+    """A redacted summary of a Mongo command: name, collection and filter shape, never values."""
+    collection = command.get(command_name, '')
+    shape = {'command': command_name, 'collection': collection if isinstance(collection, str) else ''}
+    statements = command.get('updates') or command.get('deletes') or []
+    query = command.get('filter', command.get('query', statements[0].get('q') if statements else None))
+    if isinstance(query, dict):
+        shape['filter'] = _shape(query)
+    if isinstance(command.get('pipeline'), list):
+        shape['pipeline'] = [_shape(stage) if '$match' in stage else list(stage) for stage in command['pipeline']
+                             if isinstance(stage, dict)]
+    if isinstance(command.get('sort'), dict):
+        shape['sort'] = list(command['sort'])
+    return shape
+
+
+class SlowCommandLogger(monitoring.CommandListener):
+    """Logs MongoDB commands slower than ``SLOW_QUERY_MS`` and keeps the latest in ``SLOW_COMMANDS``."""
+
+    def __init__(self, threshold_ms=None):
+        self.threshold_ms = Config.SLOW_QUERY_MS if threshold_ms is None else threshold_ms
+        self._commands = {}
+
+    def started(self, event):
+        # Only the shape is kept: commands carry documents such as password hashes and token hashes
+        self._commands[(event.connection_id, event.request_id)] = command_shape(event.command_name, event.command)
+
+    def succeeded(self, event):
+        self._record(event, 'ok')
+
+    def failed(self, event):
+        self._record(event, 'error')
+
+    def _record(self, event, outcome):
+        shape = self._commands.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        summary = repr({k: v for k, v in shape.items() if k not in ('command', 'collection')})[:1000] if shape else ''
+        SLOW_COMMANDS.appendleft({
+            'command': event.command_name,
+            'collection': shape['collection'] if shape else '',
+            'duration_ms': round(duration_ms, 1),
+            'outcome': outcome,
+            'summary': summary,
+            'at': datetime.now(timezone.utc),
+        })
+        logger.warning(f"Slow Mongo {event.command_name} ({duration_ms:.0f} ms): {summary[:300]}")
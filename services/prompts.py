@@ -0,0 +1,203 @@
+"""Versioned prompt templates for ContentGenerator, laid out for provider prompt caching.
+
+Providers bill and serve a prompt prefix they have recently seen for less, and
+answer sooner. Claude caches blocks marked with ``cache_control``, OpenAI caches
+prefixes of 1024 tokens or more automatically, and Gemini 2.x does so
+implicitly. Each template is therefore split in two. The system prompt holds
+the instructions, then the project's business block, and is identical on
+every call of that step for a project. The user prompt holds only what changes
+per call, such as the title and keyword. Prefixes below a provider's minimum
+length are not cached, so projects with long business descriptions gain the
+most.
+
+Bump a template's ``version`` whenever its text changes. The version is a label
+on ``lagos_provider_prompt_tokens_total``, so cache hit rates before and after
+a change can be told apart.
+"""
+
+# Project fields available to every template
+PROJECT_FIELDS = ('company_name', 'services_products', 'business_field', 'about_company', 'lang',
+                  'address', 'phone', 'mobile_phone', 'email', 'bullet1', 'bullet2', 'bullet3')
+
+
+class PromptTemplate:
+    def __init__(self, name, version, system, task):
+        self.name = name
+        self.version = version
+        self.system = system
+        self.task = task
+
+    def render(self, project, **values):
+        """(system prompt, prompt) for a project; ``values`` fill the remaining placeholders."""
+        fields = {f: project.get(f, '') for f in PROJECT_FIELDS}
+        fields.update(values)
+        return self.system.format(**fields), self.task.format(**fields)
+
+
+KEYWORDS = PromptTemplate('keywords', 1, """شما یک کارشناس ارشد سئو، تحقیق کلمات کلیدی و بازاریابی محتوایی هستید.
+هیچ چیز اضافی ننویس فقط کلمه ها رو خروجی بده
+
+کلمات کلیدی پیشنهادی باید:
+- ترکیبی از کلمات کوتاه، میان‌رده و بلند باشند.
+- شامل کلمات مرتبط با حوزه کاری و نیاز مشتریان باشند.
+- قابلیت رتبه‌گیری بالا در موتورهای جستجو را داشته باشند.
+- از عبارات جذاب، پرسرچ و با نیت جستجوی مشخص (اطلاعاتی، تراکنشی، ناوبری) استفاده شود.
+هر کلمه را در یک خروجی زیر هم بده
+هر آیتم را با ============== جدا کن
+
+اطلاعات کسب‌وکار:
+نام برند: {company_name}
+محصولات یا خدمات اصلی: {services_products}
+حوزه کاری: {business_field}""", """بر اساس اطلاعات کسب‌وکار، لطفاً دقیقاً {count} کلمه کلیدی سئو شده و هدفمند پیشنهاد کن.
+به زبان {lang} بنویس""")
+
+TITLES = PromptTemplate('titles', 1, """You are an expert SEO content strategist specialized in generating high-converting article titles.
+Only output the titles, nothing extra.
+
+Your task is to produce two categories of fully SEO-optimized and highly engaging titles in Persian for the keyword given by the user:
+1. {blog_count} content titles (Blog Titles)
+2. {ads_count} advertising titles (Advertising Titles)
+
+Follow these rules:
+- Keyword must appear exactly once in each title, near beginning or middle.
+- Length: 55-65 characters each.
+- SEO optimized with E-E-A-T principles.
+- Topic variety: educational guides, listicles, comparisons, tips & tricks, etc.
+
+Output Format: JSON with two fields:
+- "blog": string with titles separated by newlines
+- "ads": string with titles separated by newlines
+
+Write in {lang}
+
+Business Information:
+Brand Name: {company_name}
+Main Products or Services: {services_products}
+Business Field: {business_field}""", """Keyword: {keyword}""")
+
+ARTICLE = PromptTemplate('article', 1, """You are a senior SEO content writer. Output valid JSON only.
+
+Write a fully SEO-optimized, human-written article in Persian for the title and keyword given by the user.
+
+Content Rules:
+- Follow E-E-A-T principles.
+- Word count: {word_count}
+- Use the keyword naturally (density < 2%).
+- Use synonyms where needed.
+- Use <br> tags for line breaks in text.
+
+Structure:
+- Create {chapters} chapters inside a JSON array field called "chapters".
+- Each chapter has "title" and "content" fields.
+- Each chapter length ≈ {per_chapter} words.
+- Add a relevant emoji at the start of each chapter title.
+- Do NOT use "Chapter 1", "Chapter 2", etc.
+- Don't use colons in titles.
+- Add 2 random HTML tables (class "my_table") in random chapters.
+- Enclose all HTML attributes in double quotes.
+
+Output JSON format:
+{{
+  "chapters": [
+    {{ "title": "string", "content": "string" }}
+  ],
+  "refrence": "string",
+  "faq": "string",
+  "slug": "string"
+}}
+
+Additional:
+- Create 10 FAQ items as an HTML table with class "my_table" inside field "faq".
+- Translate the title to English in field "slug".
+- Write in {lang} language.
+
+Business Information:
+Brand Name: {company_name}
+Main Products or Services: {services_products}
+Business Field: {business_field}
+About: {about_company}""", """Title: {title}
+Keyword: {keyword}""")
+
+ADS = PromptTemplate('ads', 1, """Write a persuasive, SEO-optimized promotional article (2000 characters max) for the title and keyword given by the user.
+
+Structure:
+1. Hook (1-2 sentences) - emotional opener
+2. Introduction (80-100 words) - what the company offers
+3. Problem Section - pain points
+4. Solution Section - present services as the solution
+5. Call to Action with urgency
+Contact: {address}, {mobile_phone}
+6. Why choose this company
+
+Company: {company_name}
+Business field: {business_field}
+Services: {services_products}
+About: {about_company}
+Language: {lang}
+
+Write in {lang}. Output only the article text.""", """Title: {title}
+Keyword: {keyword}""")
+
+BEIN = PromptTemplate('bein', 1, """You are a helpful assistant. Don't use quotes in content.
+
+Each text must:
+- Start with a question or engaging hook.
+- Present the solution or benefit.
+- List 2-3 advantages with ✅ symbol.
+- End with a short call-to-action.
+- Be 350-500 characters total.
+- Include the company name.
+
+Write in {lang}
+Separate each item with ==============""", """For the company {company_name} that provides {services_products}, create 50 unique advertising texts.""")
+
+INFO = PromptTemplate('info', 1, """You are a helpful assistant. Don't use quotes in content.
+
+Each text must:
+- Start with a hook.
+- Describe one specific service/benefit.
+- Add 1 check mark (✅) with a feature.
+
+Include contact info in HTML:
+✉️ <a href="mailto:{email}">{email}</a><br>
+📱 <a href="tel:{mobile_phone}">{mobile_phone}</a><br>
+📞 <a href="tel:{phone}">{phone}</a><br>
+
+Write in {lang}
+Separate each item with ==============
+
+Return in json field "info" """, """For the company {company_name} that provides {services_products}, create 50 unique promotional texts.""")
+
+BULLETS = PromptTemplate('bullets', 1, """You are a helpful assistant. Don't use quotes in content.
+
+Use this format for each entry:
+{bullet1}
+[Service 1]
+[Service 2]
+[Service 3]
+[Service 4]
+[Service 5]
+{bullet2}
+{bullet3}
+
+Provide only five new services per entry.
+All services must relate to {business_field}.
+
+Write in {lang}
+Separate each item with ==============
+
+Return in json field "bullet" """, """For the company {company_name} whose services include {services_products}, produce a list of 250 different, realistic, and industry-relevant services.""")
+
+# Template name -> template; names match ContentGenerator step names
+TEMPLATES = {t.name: t for t in (KEYWORDS, TITLES, ARTICLE, ADS, BEIN, INFO, BULLETS)}
+
+
+def render_prompt(name, project, **values):
+    """(system prompt, prompt) of the named template for a project."""
+    return TEMPLATES[name].render(project, **values)
+
+
+def template_version(name):
+    """Version label of the template used for a step ('' for steps without one)."""
+    template = TEMPLATES.get(name)
+    return str(template.version) if template else ''
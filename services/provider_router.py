@@ -0,0 +1,171 @@
+"""Latency-aware provider selection with optional hedged requests.
+
+Every provider call feeds an EWMA of latency and error rate per (provider, step),
+per provider overall and per (provider, key). Providers are ranked by expected
+time to a good answer: ``latency / (1 - error_rate)``. Error rates decay while a
+provider is not used, so a provider that failed earlier is retried eventually.
+
+With hedging on, a call still running after the primary's p95 latency for the
+step gets a backup request to the next-ranked provider. The first success wins.
+The loser is abandoned: its thread finishes in the background and its result is
+discarded, because an in-flight SDK call cannot be interrupted. A budget caps
+hedges to a fraction of calls so tail trimming cannot double provider spend.
+"""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from config import Config
+from services.metrics import PROVIDER_EWMA_LATENCY, PROVIDER_EWMA_ERRORS, PROVIDER_HEDGES
+
+ERROR_HALF_LIFE = 600.0
+
+
+class _Stats:
+    __slots__ = ('latency', 'errors', 'samples', 'last_seen', 'window')
+
+    def __init__(self, window):
+        self.latency = None
+        self.errors = 0.0
+        self.samples = 0
+        self.last_seen = 0.0
+        self.window = deque(maxlen=window)
+
+    def update(self, alpha, seconds, ok, now):
+        if ok:
+            self.latency = seconds if self.latency is None else alpha * seconds + (1 - alpha) * self.latency
+            self.window.append(seconds)
+        self.errors = alpha * (0.0 if ok else 1.0) + (1 - alpha) * self.decayed_errors(now)
+        self.samples += 1
+        self.last_seen = now
+
+    def decayed_errors(self, now):
+        if not self.last_seen:
+            return self.errors
+        return self.errors * 0.5 ** ((now - self.last_seen) / ERROR_HALF_LIFE)
+
+    def percentile(self, q):
+        if not self.window:
+            return None
+        ordered = sorted(self.window)
+        return ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+
+
+class ProviderRouter:
+    def __init__(self, alpha=0.3, window=100, min_hedge_samples=10):
+        self.alpha = alpha
+        self.window = window
+        self.min_hedge_samples = min_hedge_samples
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._hedges = 0
+
+    def _get(self, key):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _Stats(self.window)
+        return stats
+
+    def observe(self, provider, key_id, step, seconds, ok):
+        now = time.monotonic()
+        with self._lock:
+            for key in (('step', provider, step), ('provider', provider, ''), ('key', provider, key_id)):
+                self._get(key).update(self.alpha, seconds, ok, now)
+            step_stats = self._stats[('step', provider, step)]
+            key_stats = self._stats[('key', provider, key_id)]
+            latency, errors = step_stats.latency, key_stats.errors
+        if latency is not None:
+            PROVIDER_EWMA_LATENCY.set(latency, provider=provider, step=step)
+        PROVIDER_EWMA_ERRORS.set(errors, provider=provider, key=key_id)
+
+    def score(self, provider, step):
+        """Expected seconds to a successful answer; 0 for providers never tried (explore first)."""
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats.get(('step', provider, step))
+            if stats is None or stats.latency is None:
+                stats = self._stats.get(('provider', provider, ''))
+            if stats is None:
+                return 0.0
+            latency = stats.latency if stats.latency is not None else 0.0
+            errors = stats.decayed_errors(now)
+        return latency / max(1.0 - errors, 0.05)
+
+    def rank(self, providers, step=''):
+        return sorted(providers, key=lambda p: self.score(p, step))
+
+    def hedge_delay(self, provider, step):
+        """p95 latency for the step, or None while there are too few samples to trust it."""
+        with self._lock:
+            stats = self._stats.get(('step', provider, step))
+            if stats is None or len(stats.window) < self.min_hedge_samples:
+                return None
+            p95 = stats.percentile(0.95)
+        return max(p95, Config.HEDGE_MIN_DELAY_SECONDS)
+
+    def _take_hedge_budget(self):
+        """Use up one hedge if hedges are still under HEDGE_BUDGET of all routed calls."""
+        with self._lock:
+            if self._hedges < Config.HEDGE_BUDGET * self._calls + 1:
+                self._hedges += 1
+                return True
+            return False
+
+    def call(self, providers, step, invoke):
+        """Call ``invoke(provider)`` on the best provider, hedging and failing over to the rest."""
+        ranked = self.rank(providers, step)
+        if not ranked:
+            raise RuntimeError("No active AI provider with valid API keys found.")
+        with self._lock:
+            self._calls += 1  # every routed call counts toward the hedge budget, hedged or not
+
+        last_error = None
+        while ranked:
+            primary = ranked.pop(0)
+            delay = self.hedge_delay(primary, step) if Config.HEDGE_REQUESTS and ranked else None
+            try:
+                if delay is None:
+                    return invoke(primary)
+                return self._hedged(primary, ranked, step, delay, invoke)
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def _hedged(self, primary, ranked, step, delay, invoke):
+        first = _executor.submit(invoke, primary)
+        done, _ = wait([first], timeout=delay)
+        if done or not self._take_hedge_budget():
+            return first.result()
+
+        backup = ranked.pop(0)
+        second = _executor.submit(invoke, backup)
+        pending = {first: primary, second: backup}
+        errors = []
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    PROVIDER_HEDGES.inc(step=step, winner='primary' if future is first else 'backup')
+                    return future.result()
+                errors.append(future.exception())
+        raise errors[0]
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'scope': scope, 'provider': provider, 'name': name,
+                'latency': stats.latency, 'error_rate': stats.decayed_errors(now),
+                'samples': stats.samples, 'p95': stats.percentile(0.95),
+            } for (scope, provider, name), stats in sorted(self._stats.items())]
+
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='lagos-hedge')
+
+router = ProviderRouter()
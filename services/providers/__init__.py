@@ -0,0 +1,20 @@
+"""AI provider plugins, imported on first use so each SDK loads only when its provider is called.
+
+Other packages can add providers through an entry point in the ``lagos.providers``
+group whose value is ``module:Class``, e.g. in their pyproject.toml::
+
+    [project.entry-points."lagos.providers"]
+    mistral = "lagos_mistral:MistralProvider"
+"""
+
+ENTRY_POINT_GROUP = 'lagos.providers'
+
+BUILTIN_PROVIDERS = {
+    'gemini': 'services.providers.gemini:GeminiProvider',
+    'openai': 'services.providers.openai_provider:OpenAIProvider',
+    'claude': 'services.providers.claude:ClaudeProvider',
+    'simulated': 'services.simulation.provider:SimulatedProvider',
+}
+
+# Known without importing them, so listing real providers never loads an SDK
+SIMULATED_PROVIDERS = {'simulated'}
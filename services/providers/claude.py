@@ -1,5 +1,6 @@
 import anthropic
 
+from config import Config
 from services.ai_provider import AIProvider, ProviderRegistry, extract_json_from_text
 
 
@@ -8,16 +9,20 @@ class ClaudeProvider(AIProvider):
     name = 'claude'
 
     def generate(self, api_key, prompt, system_prompt=''):
-        client = anthropic.Anthropic(api_key=api_key)
+        client = anthropic.Anthropic(api_key=api_key, base_url=Config.ANTHROPIC_BASE_URL or None)
         kwargs = {
             'model': 'claude-sonnet-4-20250514',
             'max_tokens': 8000,
             'messages': [{'role': 'user', 'content': prompt}],
         }
         if system_prompt:
-            kwargs['system'] = system_prompt
+            # The system prompt is the stable per-project prefix (services/prompts.py); cache it
+            kwargs['system'] = [{'type': 'text', 'text': system_prompt, 'cache_control': {'type': 'ephemeral'}}]
 
         response = client.messages.create(**kwargs)
+        usage = response.usage
+        self.report_usage(usage.input_tokens, getattr(usage, 'cache_read_input_tokens', 0) or 0,
+                          getattr(usage, 'cache_creation_input_tokens', 0) or 0)
         return response.content[0].text
 
     def generate_json(self, api_key, prompt, system_prompt=''):
@@ -1,5 +1,6 @@
 import google.generativeai as genai
 
+from config import Config
 from services.ai_provider import AIProvider, ProviderRegistry, extract_json_from_text
 
 
@@ -8,12 +9,21 @@ class GeminiProvider(AIProvider):
     name = 'gemini'
 
     def generate(self, api_key, prompt, system_prompt=''):
-        genai.configure(api_key=api_key)
+        if Config.GEMINI_API_ENDPOINT:
+            genai.configure(api_key=api_key, transport='rest',
+                            client_options={'api_endpoint': Config.GEMINI_API_ENDPOINT})
+        else:
+            genai.configure(api_key=api_key)
         model = genai.GenerativeModel(
             'gemini-2.0-flash',
             system_instruction=system_prompt or None
         )
+        # The system instruction comes first, so repeated calls share a prefix for implicit caching
         response = model.generate_content(prompt)
+        usage = getattr(response, 'usage_metadata', None)
+        if usage:
+            cached = getattr(usage, 'cached_content_token_count', 0) or 0
+            self.report_usage(usage.prompt_token_count - cached, cached)
         return response.text
 
     def generate_json(self, api_key, prompt, system_prompt=''):
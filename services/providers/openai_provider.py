@@ -1,5 +1,8 @@
+import hashlib
+
 from openai import OpenAI
 
+from config import Config
 from services.ai_provider import AIProvider, ProviderRegistry, extract_json_from_text
 
 
@@ -8,17 +11,25 @@ class OpenAIProvider(AIProvider):
     name = 'openai'
 
     def generate(self, api_key, prompt, system_prompt=''):
-        client = OpenAI(api_key=api_key)
+        client = OpenAI(api_key=api_key, base_url=Config.OPENAI_BASE_URL or None)
         messages = []
+        extra = {}
         if system_prompt:
             messages.append({'role': 'system', 'content': system_prompt})
+            # Prefixes are cached automatically; the key routes calls sharing one to the same cache
+            extra['prompt_cache_key'] = hashlib.sha1(system_prompt.encode()).hexdigest()[:16]
         messages.append({'role': 'user', 'content': prompt})
 
         response = client.chat.completions.create(
             model='gpt-4o-mini',
             messages=messages,
             max_tokens=8000,
+            extra_body=extra or None,
         )
+        if response.usage:
+            details = getattr(response.usage, 'prompt_tokens_details', None)
+            cached = (getattr(details, 'cached_tokens', 0) or 0) if details else 0
+            self.report_usage(response.usage.prompt_tokens - cached, cached)
         return response.choices[0].message.content
 
     def generate_json(self, api_key, prompt, system_prompt=''):
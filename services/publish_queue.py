@@ -0,0 +1,169 @@
+"""Publishing at exact times: per-article ``publish_at`` and one timer for all projects.
+
+An article is published when its ``publish_at`` comes due. Times are set by
+hand from the article page ('manual' slots) or filled in from the project's
+publish interval ('auto' slots). The auto slots keep a rolling
+``PUBLISH_HORIZON_HOURS`` of the calendar filled with the oldest unscheduled
+articles. Changing the interval or switching publishing off re-plans only the
+auto slots; manual times are left alone.
+
+A single PublishTimer runs on the scheduler leader. It sleeps until the
+earliest ``publish_at`` (found through the ``(is_published, publish_at)``
+index), capped at ``PUBLISH_POLL_SECONDS`` so times set by other processes are
+noticed. When it wakes, it claims everything due and hands each project's batch
+to the job dispatcher, which publishes through its capped, fair slots.
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from config import Config
+from models.content import (
+    get_next_publish_at, claim_due_articles, record_publish_failure, set_publish_at,
+    get_auto_slots, clear_auto_slots, get_unscheduled_articles,
+)
+from services.quality import QualityGateError
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed article is held before it comes due again if its publish never reports back
+CLAIM_SECONDS = 600
+MAX_ATTEMPTS = 5
+
+
+def _aware(dt):
+    return dt.replace(tzinfo=timezone.utc) if dt is not None and dt.tzinfo is None else dt
+
+
+def plan_project_slots(db, project):
+    """Fill or clear a project's auto slots from its publish settings; returns the number of new slots."""
+    pid = str(project['_id'])
+    schedule = project.get('schedule', {})
+    if not schedule.get('publish_enabled') or project.get('deleted_at'):
+        cleared = clear_auto_slots(db, pid)
+        if cleared:
+            logger.info(f"Cleared {cleared} auto publish slot(s) for {pid}")
+        return 0
+
+    interval = schedule.get('publish_interval_minutes', 20)
+    clear_auto_slots(db, pid, keep_interval=interval)
+    step = timedelta(minutes=interval)
+    now = datetime.now(timezone.utc)
+    horizon = now + timedelta(hours=Config.PUBLISH_HORIZON_HOURS)
+
+    slots = get_auto_slots(db, pid)
+    next_at = max(_aware(slots[-1]['publish_at']) + step, now) if slots else now + step
+    times = []
+    while next_at <= horizon:
+        times.append(next_at)
+        next_at += step
+    if not times:
+        return 0
+    articles = get_unscheduled_articles(db, pid, len(times), Config.QUALITY_MIN_SCORE)
+    for article, when in zip(articles, times):
+        set_publish_at(db, article['_id'], when, slot='auto', interval=interval)
+    if articles:
+        logger.info(f"Scheduled {len(articles)} article(s) for {pid} every {interval} min")
+    return len(articles)
+
+
+class PublishTimer:
+    """Sleeps until the next publish_at and dispatches everything due, one batch per project."""
+
+    def __init__(self, batch_size=100):
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._running = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._batches = defaultdict(list)
+        self._db = None
+        self._submit = None
+
+    def start(self, db, submit):
+        """Run the timer. ``submit(project_id)`` must queue ``publish_project(project_id)`` on the job dispatcher."""
+        self._db, self._submit = db, submit
+        self._running.set()
+        self._wake.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='lagos-publish-timer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Pause (e.g. on losing leadership); claimed but unpublished articles come due again later."""
+        self._running.clear()
+        with self._lock:
+            self._batches.clear()
+        self._wake.set()
+
+    def wake(self):
+        """Re-check the queue now, e.g. after a publish time was changed in this process."""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._running.wait()
+            self._wake.clear()
+            timeout = Config.PUBLISH_POLL_SECONDS
+            try:
+                if self._dispatch_due():
+                    continue
+                next_at = _aware(get_next_publish_at(self._db))
+                if next_at:
+                    until = (next_at - datetime.now(timezone.utc)).total_seconds()
+                    timeout = min(timeout, max(until, 0))
+            except Exception as e:
+                logger.warning(f"Publish timer could not read the queue: {e}")
+            self._wake.wait(timeout)
+
+    def _dispatch_due(self):
+        now = datetime.now(timezone.utc)
+        claimed = claim_due_articles(self._db, now, now + timedelta(seconds=CLAIM_SECONDS), self.batch_size)
+        if not claimed:
+            return False
+        projects = set()
+        with self._lock:
+            for doc in claimed:
+                self._batches[doc['project_id']].append(doc)
+                projects.add(doc['project_id'])
+        for pid in projects:
+            # A run already waiting for this project drains the new articles too
+            self._submit(pid)
+        logger.info(f"Dispatched {len(claimed)} due article(s) across {len(projects)} project(s)")
+        return len(claimed) == self.batch_size
+
+    def publish_project(self, project_id):
+        """Publish the claimed articles of one project, in publish_at order."""
+        from models.project import get_project
+        from services.wordpress_publisher import WordPressPublisher
+
+        with self._lock:
+            docs = self._batches.pop(project_id, [])
+        if not docs:
+            return
+        db = self._db
+        project = get_project(db, project_id)
+        if not project:
+            for doc in docs:
+                set_publish_at(db, doc['_id'], None)
+            return
+        publisher = WordPressPublisher(db)
+        for doc in docs:
+            try:
+                publisher.publish_article(project, article_id=str(doc['_id']))
+            except QualityGateError as e:
+                # Retrying won't change the score; the article leaves the schedule
+                record_publish_failure(db, doc['_id'], None, e)
+                logger.warning(f"Article {doc['_id']} not published: {e}")
+            except Exception as e:
+                attempts = doc.get('publish_attempts', 0) + 1
+                retry_at = None
+                if attempts < MAX_ATTEMPTS:
+                    retry_at = datetime.now(timezone.utc) + timedelta(minutes=5 * 2 ** (attempts - 1))
+                record_publish_failure(db, doc['_id'], retry_at, e)
+                logger.error(f"Publishing article {doc['_id']} failed (attempt {attempts}): {e}")
+        plan_project_slots(db, project)
+
+
+publish_timer = PublishTimer()
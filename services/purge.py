@@ -0,0 +1,88 @@
+"""Background removal of a soft-deleted project's content.
+
+Deleting a project only sets ``deleted_at``, which hides it everywhere. This
+module then removes its documents one collection at a time, in chunks of
+``PURGE_CHUNK_SIZE`` ids. After each chunk it pauses for at least as long as
+the delete took (and at least ``PURGE_PAUSE_SECONDS``), so a big purge uses
+at most about half of the write capacity it could take. Progress is written to
+the project's ``purge`` field after every chunk. The project document itself
+goes last. A purge interrupted by a restart is picked up again by the
+scheduler leader.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from config import Config
+from models.project import CONTENT_COLLECTIONS, get_deleting_projects, set_purge_progress
+
+logger = logging.getLogger(__name__)
+
+# A purge whose progress is older than this is assumed to have died with its process
+STALE_AFTER = timedelta(minutes=2)
+
+_running = set()
+_running_lock = threading.Lock()
+
+
+def purge_project(db, project_id, chunk_size=None, pause=None):
+    """Remove a deleted project's content and then the project; returns the number of documents removed."""
+    chunk_size = chunk_size or Config.PURGE_CHUNK_SIZE
+    pause = Config.PURGE_PAUSE_SECONDS if pause is None else pause
+    total = sum(db[col].count_documents({'project_id': project_id}) for col in CONTENT_COLLECTIONS)
+    set_purge_progress(db, project_id, total=total, removed=0)
+    removed = 0
+    for collection in CONTENT_COLLECTIONS:
+        set_purge_progress(db, project_id, collection=collection)
+        while True:
+            # The project_id index hands back ids in index order; deleting by exactly those ids bounds each chunk
+            ids = [d['_id'] for d in db[collection].find({'project_id': project_id}, {'_id': 1}).limit(chunk_size)]
+            if not ids:
+                break
+            started = time.monotonic()
+            removed += db[collection].delete_many({'_id': {'$in': ids}}).deleted_count
+            set_purge_progress(db, project_id, removed=removed)
+            time.sleep(max(pause, time.monotonic() - started))
+    # Soft delete already dropped the feed; a publish or feed request racing it may have rebuilt one
+    db.feeds.delete_one({'project_id': project_id})
+    db.projects.delete_one({'_id': ObjectId(project_id), 'deleted_at': {'$exists': True}})
+    logger.info(f"Purged project {project_id}: {removed} document(s) removed")
+    return removed
+
+
+def start_purge(db, project_id):
+    """Purge in a background thread; a no-op if this process is already purging the project."""
+    with _running_lock:
+        if project_id in _running:
+            return False
+        _running.add(project_id)
+
+    def run():
+        try:
+            purge_project(db, project_id)
+        except Exception as e:
+            logger.error(f"Purge of project {project_id} failed, will be resumed later: {e}")
+        finally:
+            with _running_lock:
+                _running.discard(project_id)
+
+    threading.Thread(target=run, name=f'lagos-purge-{project_id}', daemon=True).start()
+    return True
+
+
+def resume_stale_purges(db):
+    """Restart purges whose progress stopped updating (their process died); returns how many."""
+    cutoff = datetime.now(timezone.utc) - STALE_AFTER
+    resumed = 0
+    for project in get_deleting_projects(db):
+        updated_at = (project.get('purge') or {}).get('updated_at')
+        if updated_at and updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        if (updated_at is None or updated_at < cutoff) and start_purge(db, str(project['_id'])):
+            resumed += 1
+    if resumed:
+        logger.info(f"Resumed {resumed} interrupted project purge(s)")
+    return resumed
@@ -0,0 +1,207 @@
+"""SEO quality scores for articles, and the score gate used when publishing.
+
+    python -m services.quality                      # score every unscored article
+    python -m services.quality --project <id>       # one project
+    python -m services.quality --rescore            # also re-score scored ones
+
+Each article is measured against its project's ``content_settings`` and the
+rules of the article prompt: word count, chapter count, keyword density (the
+article's tag, 0.5-2.5% is ideal), how evenly words are spread over the
+chapters, the two HTML tables and a 10-item FAQ table. Text is tokenized once
+per article; everything after that is NumPy over the whole batch, with
+per-chapter counts kept flat and reduced per article with ``bincount``. A
+batch of 1000 full articles scores in well under a second.
+
+The result is stored as ``quality`` on the article (``quality.score`` is
+0-100). Articles scoring below ``QUALITY_MIN_SCORE`` are not scheduled or
+picked for publishing, and the publisher refuses them (set 0 to turn the gate
+off). Unscored articles are scored when they are about to be published.
+"""
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from pymongo import UpdateOne
+
+from config import Config
+from models.article_body import article_body
+from text_utils import strip_html, tokenize
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+BATCH_SIZE = 1000
+
+# Sub-score weights; they add up to 1
+WEIGHTS = {
+    'words': 0.25,
+    'chapters': 0.15,
+    'density': 0.2,
+    'balance': 0.15,
+    'tables': 0.1,
+    'faq': 0.15,
+}
+WORD_TOLERANCE = 0.2  # within ±20% of the target word count is full marks, ±70% is zero
+DENSITY_RANGE = (0.5, 2.5)  # keyword density (%) with full marks
+TABLES_WANTED = 2
+FAQ_ITEMS_WANTED = 10
+
+
+class QualityGateError(ValueError):
+    """An article scored below QUALITY_MIN_SCORE."""
+
+
+def _keyword_hits(words, keyword):
+    """Occurrences of the keyword's token sequence in a token list."""
+    if not keyword:
+        return 0
+    return f" {' '.join(words)} ".count(f" {' '.join(keyword)} ")
+
+
+def _features(article):
+    """Per-article raw counts; the only per-article Python work in scoring."""
+    chapters, faq = article_body(article)
+    keyword = tokenize(article.get('tag', ''))
+    chapter_words, hits, tables = [], 0, 0
+    for chapter in chapters:
+        content = chapter.get('content', '')
+        words = tokenize(strip_html(content))
+        chapter_words.append(len(words))
+        hits += _keyword_hits(words, keyword)
+        tables += content.lower().count('<table')
+    faq = (faq or '').lower()
+    faq_items = faq.count('<tr') if '<table' in faq else 0
+    return chapter_words, hits * max(len(keyword), 1), tables, faq_items
+
+
+def _band(values, low, high, zero_low, zero_high):
+    """1 inside [low, high], falling linearly to 0 at zero_low and zero_high."""
+    below = (values - zero_low) / max(low - zero_low, 1e-9)
+    above = (zero_high - values) / max(zero_high - high, 1e-9)
+    return np.clip(np.minimum(below, above), 0.0, 1.0)
+
+
+def score_articles(articles, settings):
+    """Quality documents for a batch of articles (decoded or compressed bodies).
+
+    ``settings`` maps project_id to that project's ``content_settings``.
+    """
+    if not articles:
+        return []
+    feats = [_features(a) for a in articles]
+    n = len(articles)
+    per_chapter = [f[0] for f in feats]
+    chapter_counts = np.fromiter((len(c) for c in per_chapter), dtype=np.int64, count=n)
+    flat = np.fromiter((w for c in per_chapter for w in c), dtype=np.float64, count=int(chapter_counts.sum()))
+    owner = np.repeat(np.arange(n), chapter_counts)
+
+    words = np.bincount(owner, weights=flat, minlength=n)
+    keyword_words = np.fromiter((f[1] for f in feats), dtype=np.float64, count=n)
+    tables = np.fromiter((f[2] for f in feats), dtype=np.float64, count=n)
+    faq_items = np.fromiter((f[3] for f in feats), dtype=np.float64, count=n)
+    target_words = np.fromiter((settings.get(a['project_id'], {}).get('article_word_count', 3500)
+                                for a in articles), dtype=np.float64, count=n)
+    target_chapters = np.fromiter((settings.get(a['project_id'], {}).get('article_chapters', 10)
+                                   for a in articles), dtype=np.float64, count=n)
+
+    # Chapter balance: 1 - coefficient of variation of the chapter word counts
+    safe_counts = np.maximum(chapter_counts, 1)
+    mean = words / safe_counts
+    sq = np.bincount(owner, weights=flat * flat, minlength=n) / safe_counts
+    std = np.sqrt(np.maximum(sq - mean * mean, 0.0))
+    cv = np.divide(std, mean, out=np.ones(n), where=mean > 0)
+    balance = np.where(chapter_counts > 1, 1.0 - np.clip(cv, 0.0, 1.0), (chapter_counts == 1) * 1.0)
+
+    density = np.divide(keyword_words * 100.0, words, out=np.zeros(n), where=words > 0)
+    word_ratio = np.divide(words, target_words, out=np.zeros(n), where=target_words > 0)
+    subscores = {
+        'words': _band(word_ratio, 1 - WORD_TOLERANCE, 1 + WORD_TOLERANCE, 0.3, 1.7),
+        'chapters': np.clip(1.0 - np.abs(chapter_counts - target_chapters) / np.maximum(target_chapters, 1), 0.0, 1.0),
+        'density': _band(density, DENSITY_RANGE[0], DENSITY_RANGE[1], 0.0, 2 * DENSITY_RANGE[1]),
+        'balance': balance,
+        'tables': np.minimum(tables / TABLES_WANTED, 1.0),
+        'faq': np.minimum(faq_items / FAQ_ITEMS_WANTED, 1.0),
+    }
+    score = sum(WEIGHTS[k] * v for k, v in subscores.items()) * 100
+
+    now = datetime.now(timezone.utc)
+    return [{
+        'score': round(float(score[i]), 1),
+        'words': int(words[i]),
+        'chapters': int(chapter_counts[i]),
+        'density': round(float(density[i]), 2),
+        'balance': round(float(balance[i]), 2),
+        'tables': int(tables[i]),
+        'faq_items': int(faq_items[i]),
+        'parts': {k: round(float(v[i]), 2) for k, v in subscores.items()},
+        'version': VERSION,
+        'scored_at': now,
+    } for i in range(n)]
+
+
+def score_article(db, article, project=None):
+    """Score and store one article; returns its quality document."""
+    if project is None:
+        from models.project import get_project
+        project = get_project(db, article['project_id']) or {}
+    quality = score_articles([article], {article['project_id']: project.get('content_settings', {})})[0]
+    db.articles.update_one({'_id': article['_id']}, {'$set': {'quality': quality}})
+    article['quality'] = quality
+    return quality
+
+
+def check_quality_gate(db, article, project):
+    """Raise QualityGateError if the article scores below QUALITY_MIN_SCORE (scoring it first if needed)."""
+    quality = article.get('quality') or score_article(db, article, project)
+    if Config.QUALITY_MIN_SCORE and quality['score'] < Config.QUALITY_MIN_SCORE:
+        raise QualityGateError(f"Quality score {quality['score']:.0f} is below {Config.QUALITY_MIN_SCORE}")
+    return quality
+
+
+def score_backlog(db, project_id=None, rescore=False, batch_size=BATCH_SIZE):
+    """Score articles in batches; returns how many were scored."""
+    query = {} if rescore else {'quality': None}
+    if project_id:
+        query['project_id'] = project_id
+    settings = {str(p['_id']): p.get('content_settings', {})
+                for p in db.projects.find({}, {'content_settings': 1})}
+    scored = 0
+    batch = []
+    cursor = db.articles.find(query, {'minhash': 0}, batch_size=batch_size)
+    for article in cursor:
+        batch.append(article)
+        if len(batch) >= batch_size:
+            scored += _save_batch(db, batch, settings)
+            batch = []
+    if batch:
+        scored += _save_batch(db, batch, settings)
+    return scored
+
+
+def _save_batch(db, batch, settings):
+    qualities = score_articles(batch, settings)
+    db.articles.bulk_write([UpdateOne({'_id': a['_id']}, {'$set': {'quality': q}})
+                            for a, q in zip(batch, qualities)], ordered=False)
+    return len(batch)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score the SEO quality of stored articles.')
+    parser.add_argument('--project', help='only this project id')
+    parser.add_argument('--rescore', action='store_true', help='re-score articles that already have a score')
+    args = parser.parse_args(argv)
+
+    from pymongo import MongoClient
+    logging.basicConfig(level=logging.INFO)
+    db = MongoClient(Config.MONGO_URI)[Config.MONGO_DB]
+    started = time.perf_counter()
+    scored = score_backlog(db, args.project, args.rescore)
+    print(f"{scored} article(s) scored in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,39 +1,307 @@
 import logging
+import math
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from apscheduler.jobstores.mongodb import MongoDBJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
+from config import Config
+from models.scheduler_state import (
+    enqueue_scheduler_command, take_scheduler_commands, get_lease, get_sync_marker, set_sync_marker,
+)
+from services.leader import LeaderElection
+from services.metrics import JOB_DURATION, JOB_QUEUE_WAIT
+from services.publish_queue import publish_timer, plan_project_slots
+
 logger = logging.getLogger(__name__)
 
 scheduler = BackgroundScheduler()
 _app = None
+_election = None
+_checked_at = {}  # periodic leader task -> monotonic time it last ran
+
+LEASE_NAME = 'scheduler'
+
+_PHASE_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Queue (from get_queue_depths) each job drains; its length is the job's backlog
+BACKLOG_QUEUES = {'creation': 'blog_titles_unused', 'publish': 'articles_unpublished'}
+
+
+class JobDispatcher:
+    """Runs due project jobs through a fixed number of slots, most urgent first.
+
+    APScheduler decides when a job is due; the dispatcher decides which due job
+    runs next. Priority grows with the project's backlog and with how long the
+    job has waited relative to its interval, so a busy project cannot starve the
+    others and an overdue job is never postponed indefinitely. Only one job per
+    project runs at a time, and a job that is already waiting is not queued twice.
+    """
+
+    def __init__(self, max_workers, depth_ttl=30):
+        self.max_workers = max_workers
+        self.depth_ttl = depth_ttl
+        self._pending = {}
+        self._running = set()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._depths = {}
+        self._depths_at = 0.0
+
+    def start(self):
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, name=f'lagos-job-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job_name, project_id, run, interval):
+        with self._cond:
+            key = (job_name, project_id)
+            if key in self._pending:
+                logger.info(f"{job_name} for {project_id} already waiting, skipping this run")
+                return False
+            self._pending[key] = {'run': run, 'due': time.monotonic(), 'interval': interval}
+            self._cond.notify()
+        return True
+
+    def clear(self):
+        """Drop waiting jobs; jobs already running finish normally."""
+        with self._cond:
+            self._pending.clear()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _priority(self, key, task, now):
+        job_name, project_id = key
+        backlog = self._depths.get(project_id, {}).get(BACKLOG_QUEUES.get(job_name), 0)
+        overdue = (now - task['due']) / max(task['interval'], 1)
+        return (1 + math.log1p(backlog)) * (1 + overdue)
+
+    def _take(self):
+        now = time.monotonic()
+        ready = [(key, task) for key, task in self._pending.items() if key[1] not in self._running]
+        if not ready:
+            return None
+        key, task = max(ready, key=lambda item: self._priority(item[0], item[1], now))
+        del self._pending[key]
+        self._running.add(key[1])
+        return key, task
+
+    def _refresh_depths(self):
+        if time.monotonic() - self._depths_at < self.depth_ttl or not _app:
+            return
+        try:
+            with _app.app_context():
+                from app import get_db
+                from models.content import get_queue_depths
+                depths = get_queue_depths(get_db())
+        except Exception as e:
+            logger.warning(f"Could not refresh job backlogs: {e}")
+            depths = self._depths
+        with self._cond:
+            self._depths, self._depths_at = depths, time.monotonic()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            self._refresh_depths()
+            with self._cond:
+                item = self._take()
+                if item is None:
+                    self._cond.wait()
+                    continue
+            key, task = item
+            JOB_QUEUE_WAIT.observe(time.monotonic() - task['due'], job=key[0])
+            try:
+                task['run']()
+            finally:
+                with self._cond:
+                    self._running.discard(key[1])
+                    self._cond.notify_all()
+
+
+dispatcher = JobDispatcher(Config.SCHEDULER_MAX_CONCURRENT)
 
 
 def init_scheduler(app):
-    global _app
+    """Campaign for scheduler leadership; only the elected process runs jobs.
+
+    Other processes forward schedule changes to the leader through Mongo.
+    """
+    global _app, _election
     _app = app
+    if not Config.SCHEDULER_ENABLED or _election:
+        return
+    # Jobs and their next run times live in Mongo, so a restart or a new leader picks up
+    # where the previous one left off. Runs missed while no leader was up collapse into
+    # one (coalesce) and are skipped once they are older than the misfire grace time.
+    scheduler.configure(
+        jobstores={'default': MongoDBJobStore(database=app.config['MONGO_DB'], collection='scheduler_jobs',
+                                              client=app.extensions['mongo_client'])},
+        job_defaults={'coalesce': True, 'max_instances': 1,
+                      'misfire_grace_time': Config.SCHEDULER_MISFIRE_GRACE_SECONDS},
+    )
+    _election = LeaderElection(
+        app.extensions['mongo_db'], LEASE_NAME, Config.LEADER_LEASE_SECONDS,
+        on_elected=_on_elected, on_demoted=_on_demoted,
+        on_tick=_on_tick, describe=lambda: {'jobs': _local_job_status()},
+    ).start()
+
+
+def is_leader():
+    return bool(_election and _election.is_leader)
+
+
+def _on_elected():
+    dispatcher.start()
     if not scheduler.running:
         scheduler.start()
         logger.info("Scheduler started")
-    # Load existing project schedules
-    _sync_all_jobs()
+    else:
+        scheduler.resume()
+        logger.info("Scheduler resumed")
+    _sync_changed_projects()
+    _apply_forwarded_changes()
+    _checked_at.clear()  # the first tick runs every periodic task
+    publish_timer.start(_app.extensions['mongo_db'], _submit_publish)
+
+
+def _due(task, seconds):
+    """True at most once every ``seconds`` per task."""
+    now = time.monotonic()
+    if task in _checked_at and now - _checked_at[task] < seconds:
+        return False
+    _checked_at[task] = now
+    return True
+
 
+def _on_tick():
+    _apply_forwarded_changes()
+    # Web workers can die mid-purge or mid-upload while this leader stays up
+    from services import images, purge
+    if _due('purges', purge.STALE_AFTER.total_seconds()):
+        _resume_purges()
+    if _due('uploads', images.STALE_AFTER.total_seconds() / 3):
+        _fail_interrupted_uploads()
 
-def _sync_all_jobs():
+
+def _on_demoted():
+    publish_timer.stop()
+    dispatcher.clear()
+    if scheduler.running:
+        # Jobs stay in the shared job store for the next leader
+        scheduler.pause()
+        logger.info("Scheduler paused (no longer leader)")
+
+
+def _apply_forwarded_changes():
+    commands = take_scheduler_commands(_app.extensions['mongo_db'])
+    if not commands:
+        return
+    with _app.app_context():
+        from app import get_db
+        from models.project import get_project
+        for command in commands:
+            project = get_project(get_db(), command['project_id']) if command['action'] == 'sync' else None
+            if project:
+                _apply_project_jobs(project)
+            else:
+                _remove_jobs(command['project_id'])
+
+
+def _sync_changed_projects():
+    """Apply schedules of projects changed since the last sync (all of them the first time).
+
+    Deletions and edits made meanwhile also arrive as forwarded commands; this
+    catches anything edited while no leader was running.
+    """
     if not _app:
         return
     try:
         with _app.app_context():
             from app import get_db
             db = get_db()
-            projects = list(db.projects.find())
-            for project in projects:
-                sync_project_jobs(project)
+            marker = get_sync_marker(db)
+            query = {'updated_at': {'$gte': marker}} if marker else {}
+            latest, count = marker, 0
+            fields = {'schedule': 1, 'updated_at': 1, 'deleted_at': 1}
+            for project in db.projects.find(query, fields).sort('updated_at', 1):
+                if project.get('deleted_at'):
+                    _remove_jobs(str(project['_id']))
+                else:
+                    _apply_project_jobs(project)
+                latest, count = project.get('updated_at') or latest, count + 1
+            if latest and latest != marker:
+                set_sync_marker(db, latest)
+            logger.info(f"Synced scheduler jobs for {count} changed project(s)")
     except Exception as e:
         logger.warning(f"Could not sync scheduler jobs: {e}")
 
 
+def _resume_purges():
+    """Pick up project deletions whose process died mid-purge."""
+    from services.purge import resume_stale_purges
+    try:
+        resume_stale_purges(_app.extensions['mongo_db'])
+    except Exception as e:
+        logger.warning(f"Could not resume project purges: {e}")
+
+
+def _fail_interrupted_uploads():
+    from services.images import fail_interrupted_uploads
+    try:
+        fail_interrupted_uploads(_app.extensions['mongo_db'])
+    except Exception as e:
+        logger.warning(f"Could not fail interrupted image uploads: {e}")
+
+
+def _interval_trigger(job_id, minutes):
+    """Interval trigger with a stable per-job phase plus a little jitter.
+
+    The phase is derived from the job id, so projects keep their spread-out slots
+    across restarts instead of all firing the moment the scheduler starts.
+    """
+    period = max(int(minutes * 60), 1)
+    offset = zlib.crc32(job_id.encode()) % period
+    jitter = min(Config.SCHEDULER_JITTER_SECONDS, period // 10)
+    return IntervalTrigger(minutes=minutes, start_date=_PHASE_EPOCH + timedelta(seconds=offset),
+                           jitter=jitter or None)
+
+
 def sync_project_jobs(project):
     """Create or update scheduler jobs for a project based on its settings."""
+    if _app and not is_leader():
+        enqueue_scheduler_command(_app.extensions['mongo_db'], 'sync', str(project['_id']))
+        return
+    _apply_project_jobs(project)
+
+
+def _ensure_job(job_id, func, project_id, interval):
+    """Add the job or change its interval; an unchanged job keeps its stored next run time.
+
+    Returns True if anything changed.
+    """
+    job = scheduler.get_job(job_id)
+    if job is None:
+        scheduler.add_job(func, trigger=_interval_trigger(job_id, interval), id=job_id,
+                          args=[project_id], replace_existing=True)
+        return True
+    if getattr(job.trigger, 'interval', None) != timedelta(minutes=interval):
+        scheduler.reschedule_job(job_id, trigger=_interval_trigger(job_id, interval))
+        return True
+    return False
+
+
+def _apply_project_jobs(project):
     pid = str(project['_id'])
     schedule = project.get('schedule', {})
 
@@ -43,110 +311,113 @@ def sync_project_jobs(project):
     # Content creation job
     if schedule.get('creation_enabled'):
         interval = schedule.get('creation_interval_minutes', 60)
-        if scheduler.get_job(creation_job_id):
-            scheduler.reschedule_job(
-                creation_job_id,
-                trigger=IntervalTrigger(minutes=interval)
-            )
-        else:
-            scheduler.add_job(
-                _run_content_creation,
-                trigger=IntervalTrigger(minutes=interval),
-                id=creation_job_id,
-                args=[pid],
-                replace_existing=True,
-                max_instances=1,
-            )
-        logger.info(f"Content creation job enabled for {pid} (every {interval} min)")
+        if _ensure_job(creation_job_id, _run_content_creation, pid, interval):
+            logger.info(f"Content creation job enabled for {pid} (every {interval} min)")
     else:
         if scheduler.get_job(creation_job_id):
             scheduler.remove_job(creation_job_id)
             logger.info(f"Content creation job disabled for {pid}")
 
-    # Publishing job
-    if schedule.get('publish_enabled'):
-        interval = schedule.get('publish_interval_minutes', 20)
-        if scheduler.get_job(publish_job_id):
-            scheduler.reschedule_job(
-                publish_job_id,
-                trigger=IntervalTrigger(minutes=interval)
-            )
-        else:
-            scheduler.add_job(
-                _run_publish,
-                trigger=IntervalTrigger(minutes=interval),
-                id=publish_job_id,
-                args=[pid],
-                replace_existing=True,
-                max_instances=1,
-            )
-        logger.info(f"Publishing job enabled for {pid} (every {interval} min)")
-    else:
-        if scheduler.get_job(publish_job_id):
-            scheduler.remove_job(publish_job_id)
-            logger.info(f"Publishing job disabled for {pid}")
+    # Publishing runs off per-article publish_at slots (see services.publish_queue);
+    # interval jobs from before that are removed here
+    if scheduler.get_job(publish_job_id):
+        scheduler.remove_job(publish_job_id)
+    try:
+        if plan_project_slots(_app.extensions['mongo_db'], project):
+            publish_timer.wake()
+    except Exception as e:
+        logger.warning(f"Could not plan publish slots for {pid}: {e}")
 
 
 def remove_project_jobs(project_id):
     """Remove all scheduler jobs for a project."""
+    if _app and not is_leader():
+        enqueue_scheduler_command(_app.extensions['mongo_db'], 'remove', project_id)
+        return
+    _remove_jobs(project_id)
+
+
+def _remove_jobs(project_id):
     for prefix in ['creation_', 'publish_']:
         job_id = f"{prefix}{project_id}"
         if scheduler.get_job(job_id):
             scheduler.remove_job(job_id)
 
 
-def _run_content_creation(project_id):
-    """Background job: run content creation for a project."""
-    if not _app:
-        return
-    with _app.app_context():
-        from app import get_db, get_fernet
-        from models.project import get_project
-        from services.content_generator import ContentGenerator
+def _job_interval(job_id):
+    job = scheduler.get_job(job_id)
+    interval = getattr(job.trigger, 'interval', None) if job else None
+    return interval.total_seconds() if interval else 3600
 
-        db = get_db()
-        project = get_project(db, project_id)
-        if not project:
-            logger.error(f"Project {project_id} not found for content creation job")
-            return
 
-        gen = ContentGenerator(db, get_fernet())
-        try:
-            # Run individual steps (not full pipeline each time)
-            gen.generate_article(project)
-            logger.info(f"Scheduled content creation completed for {project_id}")
-        except Exception as e:
-            logger.error(f"Scheduled content creation failed for {project_id}: {e}")
+def _run_job(job_name, project_id, func, trace_memory=False):
+    """Run one project job in an app context: log failures and record its duration.
 
+    A profile armed for the job id from the profiling page is taken on this run.
+    """
+    outcome = 'ok'
+    start = time.perf_counter()
+    try:
+        with _app.app_context():
+            from app import get_db
+            from services.profiler import run_job_profiled
+            run_job_profiled(get_db(), f"{job_name}_{project_id}",
+                             lambda: func(project_id), trace_memory=trace_memory)
+    except Exception as e:
+        outcome = 'error'
+        logger.error(f"Scheduled {job_name} failed for {project_id}: {e}")
+    finally:
+        JOB_DURATION.observe(time.perf_counter() - start, job=job_name, outcome=outcome)
 
-def _run_publish(project_id):
-    """Background job: publish an article to WordPress."""
-    if not _app:
-        return
-    with _app.app_context():
-        from app import get_db
-        from models.project import get_project
-        from services.wordpress_publisher import WordPressPublisher
 
-        db = get_db()
-        project = get_project(db, project_id)
-        if not project:
-            logger.error(f"Project {project_id} not found for publishing job")
-            return
+def _timed_job(job_name, trace_memory=False):
+    """Hand a project job to the dispatcher, which runs it through _run_job."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(project_id):
+            if not _app:
+                return
+            job_id = f"{job_name}_{project_id}"
+            dispatcher.submit(job_name, project_id, lambda: _run_job(job_name, project_id, func, trace_memory),
+                              _job_interval(job_id))
+        return wrapper
+    return decorator
 
-        publisher = WordPressPublisher(db)
-        try:
-            result = publisher.publish_article(project)
-            if result:
-                logger.info(f"Scheduled publish completed: {result['wp_post_url']}")
-            else:
-                logger.info(f"No articles to publish for {project_id}")
-        except Exception as e:
-            logger.error(f"Scheduled publishing failed for {project_id}: {e}")
+
+def _submit_publish(project_id):
+    # Due articles are time-sensitive, so their wait counts against a one-minute interval
+    dispatcher.submit('publish', project_id,
+                      lambda: _run_job('publish', project_id, publish_timer.publish_project), 60)
+
+
+@_timed_job('creation', trace_memory=True)
+def _run_content_creation(project_id):
+    """Background job: run content creation for a project."""
+    from app import get_db, get_fernet
+    from models.project import get_project
+    from services.content_generator import ContentGenerator
+
+    db = get_db()
+    project = get_project(db, project_id)
+    if not project:
+        logger.error(f"Project {project_id} not found for content creation job")
+        return
+
+    gen = ContentGenerator(db, get_fernet())
+    # Run individual steps (not full pipeline each time)
+    gen.generate_article(project)
+    logger.info(f"Scheduled content creation completed for {project_id}")
 
 
 def get_job_status():
-    """Get status of all scheduler jobs."""
+    """Get status of all scheduler jobs, as last reported by the leader when this process is not it."""
+    if _app and not is_leader():
+        lease = get_lease(_app.extensions['mongo_db'], LEASE_NAME) or {}
+        return (lease.get('info') or {}).get('jobs', [])
+    return _local_job_status()
+
+
+def _local_job_status():
     jobs = []
     for job in scheduler.get_jobs():
         jobs.append({
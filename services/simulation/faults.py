@@ -0,0 +1,74 @@
+"""Fault profiles for the simulated provider and HTTP stand-ins.
+
+A profile is a named bundle of latency distribution and failure rates. Latency
+is log-normal around ``latency_ms`` with spread ``latency_sigma``; each call
+draws at most one fault: HTTP 429, HTTP 5xx, a truncated output or malformed JSON.
+"""
+import math
+import random
+import threading
+
+PROFILES = {
+    'instant': {},
+    'healthy': {'latency_ms': 800, 'latency_sigma': 0.3},
+    'slow': {'latency_ms': 6000, 'latency_sigma': 0.6},
+    'flaky': {'latency_ms': 1500, 'latency_sigma': 0.8, 'server_error_rate': 0.1,
+              'truncate_rate': 0.05, 'malformed_json_rate': 0.05},
+    'rate_limited': {'latency_ms': 500, 'latency_sigma': 0.3, 'rate_limit_rate': 0.4},
+    'chaos': {'latency_ms': 3000, 'latency_sigma': 1.2, 'rate_limit_rate': 0.15,
+              'server_error_rate': 0.15, 'truncate_rate': 0.1, 'malformed_json_rate': 0.1},
+}
+
+
+class FaultProfile:
+    def __init__(self, name='instant', latency_ms=0, latency_sigma=0.0, rate_limit_rate=0.0,
+                 server_error_rate=0.0, truncate_rate=0.0, malformed_json_rate=0.0, seed=0,
+                 latency_scale=1.0):
+        self.name = name
+        self.latency_ms = latency_ms * latency_scale
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.truncate_rate = truncate_rate
+        self.malformed_json_rate = malformed_json_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_name(cls, spec, latency_scale=1.0):
+        """Build a profile from ``name`` or ``name:seed``; unknown names fall back to ``instant``."""
+        name, _, seed = (spec or 'instant').partition(':')
+        name = name if name in PROFILES else 'instant'
+        return cls(name, seed=int(seed) if seed.isdigit() else 0, latency_scale=latency_scale,
+                   **PROFILES[name])
+
+    def sample_latency(self):
+        """Seconds to wait before answering."""
+        if not self.latency_ms:
+            return 0.0
+        with self._lock:
+            z = self._rng.gauss(0, 1)
+        return self.latency_ms * math.exp(self.latency_sigma * z) / 1000
+
+    def draw_fault(self):
+        """Return one of None, 'rate_limit', 'server_error', 'truncate', 'malformed_json'."""
+        with self._lock:
+            roll = self._rng.random()
+        for fault, rate in (('rate_limit', self.rate_limit_rate),
+                            ('server_error', self.server_error_rate),
+                            ('truncate', self.truncate_rate),
+                            ('malformed_json', self.malformed_json_rate)):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+    def truncate(self, text):
+        with self._lock:
+            cut = self._rng.uniform(0.2, 0.8)
+        return text[:int(len(text) * cut)]
+
+
+def malform_json(text):
+    """Break a JSON document the way models do: drop the closing brace and add a trailing comma."""
+    return text.rstrip().rstrip('}') + ','
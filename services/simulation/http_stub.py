@@ -0,0 +1,278 @@
+"""HTTP stand-in for the OpenAI, Anthropic and Gemini APIs and the WordPress REST API.
+
+Every path may be prefixed with ``/sim/<profile>`` to pick a fault profile; otherwise
+an API key naming a profile is used, then the server default. Point the real SDKs at
+it with OPENAI_BASE_URL / ANTHROPIC_BASE_URL / GEMINI_API_ENDPOINT, or a project's
+WordPress URL at ``<server>/sim/<profile>``.
+
+    python -m services.simulation.http_stub --port 8090 --profile flaky
+"""
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from services.simulation.faults import PROFILES, FaultProfile, malform_json
+from services.simulation.responses import PrefixCache, simulated_response
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = re.compile(r'^/sim/([\w:]+)(/.*)$')
+_GEMINI = re.compile(r'^/v1beta/models/([^/:]+):generateContent$')
+
+_ERROR_STATUS = {'rate_limit': 429, 'server_error': 503}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def _api_key(self, query):
+        auth = self.headers.get('Authorization', '')
+        if auth.startswith('Bearer '):
+            return auth[7:]
+        return (self.headers.get('x-api-key') or self.headers.get('x-goog-api-key')
+                or query.get('key', [''])[0])
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        path, profile_name = url.path, None
+        match = _PREFIX.match(path)
+        if match:
+            profile_name, path = match.groups()
+        query = parse_qs(url.query)
+        if profile_name is None:
+            key = self._api_key(query)
+            profile_name = key if key.partition(':')[0] in PROFILES else self.server.default_profile
+        profile = self.server.profile(profile_name)
+        body = self._read_body()
+
+        time.sleep(profile.sample_latency())
+        fault = profile.draw_fault()
+
+        if path.startswith('/wp-json/wp/v2/'):
+            return self._wordpress(path, fault)
+
+        if path == '/v1/chat/completions':
+            api = 'openai'
+        elif path == '/v1/messages':
+            api = 'anthropic'
+        elif _GEMINI.match(path):
+            api = 'gemini'
+        else:
+            return self._send_json(404, {'error': {'message': f'Unknown path {path}'}})
+
+        if fault in _ERROR_STATUS:
+            return self._llm_error(api, _ERROR_STATUS[fault])
+
+        try:
+            request = json.loads(body or b'{}')
+        except json.JSONDecodeError:
+            return self._send_json(400, {'error': {'message': 'Invalid JSON body'}})
+        system_prompt, prompt = _prompt_text(api, request)
+        text = simulated_response(f"{system_prompt}\n{prompt}")
+        truncated = False
+        if fault == 'truncate':
+            text, truncated = profile.truncate(text), True
+        elif fault == 'malformed_json' and text.lstrip().startswith('{'):
+            text = malform_json(text)
+        usage = self.server.prefixes.usage(system_prompt, prompt)
+        if api == 'anthropic' and not _cache_marked(request):
+            usage = (sum(usage), 0, 0)  # Anthropic caches only blocks marked with cache_control
+        self._send_json(200, _llm_response(api, request, text, truncated, usage))
+
+    def _llm_error(self, api, status):
+        headers = {'Retry-After': '1'} if status == 429 else None
+        message = 'Rate limit exceeded' if status == 429 else 'Service unavailable'
+        if api == 'openai':
+            payload = {'error': {'message': message, 'type': 'rate_limit_error' if status == 429 else 'server_error',
+                                 'code': None}}
+        elif api == 'anthropic':
+            payload = {'type': 'error', 'error': {'type': 'rate_limit_error' if status == 429 else 'overloaded_error',
+                                                  'message': message}}
+        else:
+            payload = {'error': {'code': status, 'message': message,
+                                 'status': 'RESOURCE_EXHAUSTED' if status == 429 else 'UNAVAILABLE'}}
+        self._send_json(status, payload, headers)
+
+    def _wordpress(self, path, fault):
+        if fault in _ERROR_STATUS:
+            status = _ERROR_STATUS[fault]
+            return self._send_json(status, {'code': 'rest_error', 'message': 'Simulated failure',
+                                            'data': {'status': status}})
+        host = self.headers.get('Host', 'localhost')
+        post_id = self.server.next_id()
+        if path.rstrip('/') == '/wp-json/wp/v2/posts':
+            return self._send_json(201, {'id': post_id, 'link': f'http://{host}/?p={post_id}', 'status': 'publish'})
+        if path.rstrip('/') == '/wp-json/wp/v2/media':
+            disposition = self.headers.get('Content-Disposition', '')
+            filename = disposition.rpartition('filename=')[2].strip('"') or f'{post_id}.webp'
+            return self._send_json(201, {'id': post_id, 'source_url': f'http://{host}/wp-content/uploads/{filename}'})
+        self._send_json(404, {'code': 'rest_no_route', 'message': 'No route was found', 'data': {'status': 404}})
+
+
+def _text(content):
+    if isinstance(content, list):
+        return ' '.join(part.get('text', '') for part in content if isinstance(part, dict))
+    return content or ''
+
+
+def _prompt_text(api, request):
+    """(system prompt, last user prompt) of a request."""
+    if api == 'gemini':
+        contents = request.get('contents') or [{}]
+        system = request.get('systemInstruction') or request.get('system_instruction') or {}
+        return _text(system.get('parts')), _text(contents[-1].get('parts', []))
+    messages = request.get('messages') or [{}]
+    if api == 'anthropic':
+        system = request.get('system', '')
+    else:
+        system = ' '.join(_text(m.get('content')) for m in messages if m.get('role') == 'system')
+    return _text(system), _text(messages[-1].get('content', ''))
+
+
+def _cache_marked(request):
+    system = request.get('system')
+    return isinstance(system, list) and any(isinstance(b, dict) and b.get('cache_control') for b in system)
+
+
+def _llm_response(api, request, text, truncated, usage=(0, 0, 0)):
+    """Response body in the API's shape; ``usage`` is (uncached, cached, cache_write) prompt tokens."""
+    output_tokens = len(text.split())
+    uncached, cached, written = usage
+    prompt_tokens = uncached + cached + written
+    if api == 'openai':
+        return {
+            'id': f'chatcmpl-{uuid.uuid4().hex[:24]}', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': request.get('model', 'gpt-4o-mini'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text},
+                         'finish_reason': 'length' if truncated else 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': output_tokens,
+                      'total_tokens': prompt_tokens + output_tokens,
+                      'prompt_tokens_details': {'cached_tokens': cached}},
+        }
+    if api == 'anthropic':
+        return {
+            'id': f'msg_{uuid.uuid4().hex[:24]}', 'type': 'message', 'role': 'assistant',
+            'model': request.get('model', ''), 'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'max_tokens' if truncated else 'end_turn', 'stop_sequence': None,
+            'usage': {'input_tokens': uncached, 'output_tokens': output_tokens,
+                      'cache_read_input_tokens': cached, 'cache_creation_input_tokens': written},
+        }
+    return {
+        'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'},
+                        'finishReason': 'MAX_TOKENS' if truncated else 'STOP', 'index': 0}],
+        'usageMetadata': {'promptTokenCount': prompt_tokens, 'candidatesTokenCount': output_tokens,
+                          'totalTokenCount': prompt_tokens + output_tokens, 'cachedContentTokenCount': cached},
+    }
+
+
+class SimulatorServer:
+    """Threaded stand-in server; usable as a context manager or started once per process."""
+
+    def __init__(self, host='127.0.0.1', port=0, default_profile='instant', latency_scale=1.0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.default_profile = default_profile
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._latency_scale = latency_scale
+        self.httpd.profile = self._profile
+        self.httpd.next_id = self._next_id
+        self.httpd.prefixes = PrefixCache()
+        self._thread = None
+
+    def _profile(self, name):
+        with self._lock:
+            profile = self._profiles.get(name)
+            if profile is None:
+                profile = self._profiles[name] = FaultProfile.from_name(name, self._latency_scale)
+            return profile
+
+    def _next_id(self):
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def base_url(self, profile):
+        return f'{self.url}/sim/{profile}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='lagos-simulator', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_simulator(latency_scale=1.0):
+    """Process-wide simulator, started on first use (used by projects in simulation mode)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SimulatorServer(latency_scale=latency_scale).start()
+            logger.info(f"Simulator listening on {_shared.url}")
+        return _shared
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Lagos provider/WordPress simulator.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--profile', default='healthy', choices=sorted(PROFILES))
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='multiply profile latencies')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = SimulatorServer(args.host, args.port, args.profile, args.latency_scale)
+    print(f"Simulator on {server.url} (default profile {args.profile}); "
+          f"profiles: {', '.join(sorted(PROFILES))}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""In-process simulated AI provider.
+
+Add an API key for the ``simulated`` provider whose value is a fault profile name
+(optionally ``name:seed``, e.g. ``flaky:7``). Keys with different profiles let key
+rotation in ProviderRegistry be exercised against realistic failure mixes.
+"""
+import time
+
+from services.ai_provider import AIProvider, ProviderRegistry, extract_json_from_text
+from services.simulation.faults import FaultProfile, malform_json
+from services.simulation.responses import PrefixCache, simulated_response
+
+
+class SimulatedProviderError(Exception):
+    """Raised for simulated HTTP failures; carries the status code like SDK errors do."""
+
+    def __init__(self, status_code, message):
+        super().__init__(f"{status_code} {message}")
+        self.status_code = status_code
+
+
+@ProviderRegistry.register
+class SimulatedProvider(AIProvider):
+    name = 'simulated'
+    simulated = True
+    latency_scale = 1.0
+
+    def __init__(self):
+        self._profiles = {}
+        self._prefixes = PrefixCache()
+
+    def _profile(self, api_key):
+        profile = self._profiles.get(api_key)
+        if profile is None:
+            profile = self._profiles[api_key] = FaultProfile.from_name(api_key, self.latency_scale)
+        return profile
+
+    def generate(self, api_key, prompt, system_prompt=''):
+        profile = self._profile(api_key)
+        time.sleep(profile.sample_latency())
+        fault = profile.draw_fault()
+        if fault == 'rate_limit':
+            raise SimulatedProviderError(429, 'Rate limit exceeded')
+        if fault == 'server_error':
+            raise SimulatedProviderError(503, 'Service unavailable')
+        text = simulated_response(f"{system_prompt}\n{prompt}")
+        self.report_usage(*self._prefixes.usage(system_prompt, prompt))
+        if fault == 'truncate':
+            return profile.truncate(text)
+        if fault == 'malformed_json' and text.lstrip().startswith('{'):
+            return malform_json(text)
+        return text
+
+    def generate_json(self, api_key, prompt, system_prompt=''):
+        text = self.generate(api_key, prompt, system_prompt)
+        return extract_json_from_text(text)
@@ -0,0 +1,77 @@
+"""Deterministic, well-formed responses for every ContentGenerator prompt."""
+import hashlib
+import json
+import random
+import re
+import threading
+
+WORDS = ('خدمات', 'کیفیت', 'مشاوره', 'طراحی', 'سئو', 'محتوا', 'وب‌سایت', 'بهینه', 'مشتری',
+         'تخصصی', 'حرفه‌ای', 'قیمت', 'راهنما', 'بهترین', 'سریع', 'پشتیبانی', 'نصب', 'تعمیر')
+
+
+def _rng(prompt):
+    seed = int.from_bytes(hashlib.blake2b(prompt.encode(), digest_size=8).digest(), 'big')
+    return random.Random(seed)
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _items(rng, count, words):
+    return '\n==============\n'.join(_sentence(rng, words) for _ in range(count))
+
+
+class PrefixCache:
+    """System prompts a simulated provider has seen, for realistic cached-token usage."""
+
+    MAX_ENTRIES = 10000
+
+    def __init__(self):
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def usage(self, system_prompt, prompt):
+        """(uncached, cached, cache_write) prompt sizes, in words standing in for tokens."""
+        prefix, rest = len(system_prompt.split()), len(prompt.split())
+        if not prefix:
+            return rest, 0, 0
+        key = hashlib.blake2b(system_prompt.encode(), digest_size=8).digest()
+        with self._lock:
+            seen = key in self._seen
+            if not seen:
+                if len(self._seen) >= self.MAX_ENTRIES:
+                    self._seen.clear()
+                self._seen.add(key)
+        return (rest, prefix, 0) if seen else (rest, 0, prefix)
+
+
+def simulated_response(prompt):
+    """Build a response shaped like what the real model returns for this prompt (system prompt included)."""
+    rng = _rng(prompt)
+    if '"chapters"' in prompt:
+        chapters = int(re.search(r'Create (\d+) chapters', prompt).group(1))
+        per_chapter = int(re.search(r'≈ (\d+) words', prompt).group(1))
+        return json.dumps({
+            'chapters': [{'title': _sentence(rng, 5), 'content': _sentence(rng, per_chapter)}
+                         for _ in range(chapters)],
+            'refrence': _sentence(rng, 6),
+            'faq': '<table class="my_table">' + ''.join(
+                f'<tr><td>{_sentence(rng, 8)}</td><td>{_sentence(rng, 20)}</td></tr>' for _ in range(10)
+            ) + '</table>',
+            'slug': 'article-' + format(rng.getrandbits(32), 'x'),
+        }, ensure_ascii=False)
+    if 'Blog Titles' in prompt:
+        return json.dumps({
+            'blog': '\n'.join(_sentence(rng, 8) for _ in range(6)),
+            'ads': '\n'.join(_sentence(rng, 8) for _ in range(3)),
+        }, ensure_ascii=False)
+    if 'json field "info"' in prompt:
+        return json.dumps({'info': _items(rng, 50, 25)}, ensure_ascii=False)
+    if 'json field "bullet"' in prompt:
+        return json.dumps({'bullet': _items(rng, 250, 12)}, ensure_ascii=False)
+    if 'advertising texts' in prompt:
+        return _items(rng, 50, 60)
+    if 'promotional article' in prompt:
+        return _sentence(rng, 300)
+    return _items(rng, 5, 3)
@@ -1,13 +1,21 @@
+import html
 import logging
 import random
+import time
 import requests
 from requests.auth import HTTPBasicAuth
 
 from config import Config
+from models.article_body import article_body
 from models.content import (
     get_random_unpublished_article, mark_article_published,
     get_random_bein, get_random_info, get_random_bullet,
 )
+from models.image import pick_images, set_image_wp_media
+from services.images import CHAPTER_IMAGES, post_rendition
+from services.linking import InternalLinker, add_link_target
+from services.quality import check_quality_gate
+from services.metrics import WP_PUBLISH_LATENCY, WP_PUBLISH_REQUESTS
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +24,64 @@ class WordPressPublisher:
     def __init__(self, db):
         self.db = db
 
-    def _assemble_html(self, article, project):
-        """Assemble the final HTML content from article chapters and supplementary content."""
+    def _post(self, api_url, payload, auth, **kwargs):
+        """POST to the WordPress REST API, recording latency by response status."""
+        status = 'error'
+        start = time.perf_counter()
+        try:
+            response = requests.post(api_url, json=payload, auth=auth, timeout=30, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            WP_PUBLISH_LATENCY.observe(time.perf_counter() - start, status=status)
+            WP_PUBLISH_REQUESTS.inc(status=status)
+
+    def _chapter_images(self, article, project, wp_url, auth):
+        """[(src, alt)] for the first chapters, from the project's image library by the article's tag.
+
+        Library uploads are sent to the WordPress media library the first time
+        they are used on that site. An image that fails to upload is left out.
+        """
         pid = str(project['_id'])
-        chapters = article.get('chapters', [])
+        images = []
+        for image in pick_images(self.db, pid, article.get('tag', ''), CHAPTER_IMAGES):
+            alt = image.get('alt') or article.get('tag', '')
+            if image.get('url'):
+                images.append((image['url'], alt))
+                continue
+            media = image.get('wp_media') or {}
+            if media.get('site') == wp_url and media.get('url'):
+                images.append((media['url'], alt))
+                continue
+            rendition = post_rendition(self.db, image)
+            if not rendition:
+                continue
+            filename = f"{image['_id']}-{rendition['size']}.webp"
+            try:
+                response = self._post(f"{wp_url}/wp-json/wp/v2/media", None, auth, data=bytes(rendition['data']),
+                                      headers={'Content-Type': 'image/webp',
+                                               'Content-Disposition': f'attachment; filename="{filename}"'})
+                response.raise_for_status()
+                uploaded = response.json()
+            except (requests.RequestException, ValueError) as e:
+                logger.warning(f"Image {image['_id']} upload to {wp_url} failed: {e}")
+                continue
+            set_image_wp_media(self.db, str(image['_id']), wp_url, uploaded.get('id'), uploaded.get('source_url', ''))
+            images.append((uploaded.get('source_url', ''), alt))
+        return [(src, alt) for src, alt in images if src]
+
+    def _assemble_html(self, article, project, images=()):
+        """Assemble the final HTML content from article chapters and supplementary content.
+
+        ``images`` are (src, alt) pairs placed under the first chapter headings.
+        Chapter text gets links to the project's earlier published articles.
+        """
+        pid = str(project['_id'])
+        chapters, faq = article_body(article)
         beins = get_random_bein(self.db, pid, count=3)
         info = get_random_info(self.db, pid)
         bullet = get_random_bullet(self.db, pid)
+        linker = InternalLinker(self.db, pid, article)
 
         colors = random.sample(Config.HEADING_COLORS, min(len(Config.HEADING_COLORS), 10))
         heading_tags = ['h2', 'h3', 'h2', 'h3', 'h2', 'h4', 'h3', 'h2', 'h3', 'h3']
@@ -39,7 +98,10 @@ class WordPressPublisher:
             content = chapter.get('content', '')
 
             html_parts.append(f'<{tag} style="color:{color}">{title}</{tag}>')
-            html_parts.append(content)
+            if i < len(images):
+                src, alt = images[i]
+                html_parts.append(f'<img class="center_image" src="{html.escape(src)}" alt="{html.escape(alt)}">')
+            html_parts.append(linker.link(content))
 
             # Insert bein paragraphs after chapters 2, 5, 9
             if i == 1 and len(beins) > 0:
@@ -50,8 +112,8 @@ class WordPressPublisher:
                 html_parts.append(f'<blockquote>{beins[2]["text"]}</blockquote>')
 
         # Append FAQ
-        if article.get('faq'):
-            html_parts.append(article['faq'])
+        if faq:
+            html_parts.append(faq)
 
         # Append bullet
         if bullet:
@@ -61,12 +123,19 @@ class WordPressPublisher:
         if info:
             html_parts.append(info['text'])
 
+        if linker.count:
+            logger.info(f"Added {linker.count} internal links to article {article['_id']}")
         return '\n'.join(html_parts)
 
     def publish_article(self, project, article_id=None):
         """Publish an article to WordPress."""
         pid = str(project['_id'])
         wp = project.get('wordpress', {})
+        simulation = project.get('simulation', {})
+        if simulation.get('enabled'):
+            from services.simulation.http_stub import get_simulator
+            wp = dict(wp, url=get_simulator().base_url(simulation.get('profile', 'healthy')),
+                      username='simulated', app_password='simulated')
 
         if not wp.get('url') or not wp.get('username') or not wp.get('app_password'):
             raise ValueError("WordPress credentials not configured for this project.")
@@ -76,20 +145,23 @@ class WordPressPublisher:
             from models.content import get_article
             article = get_article(self.db, article_id)
         else:
-            article = get_random_unpublished_article(self.db, pid)
+            article = get_random_unpublished_article(self.db, pid, Config.QUALITY_MIN_SCORE)
 
         if not article:
             logger.info(f"No unpublished articles for project {pid}")
             return None
+        check_quality_gate(self.db, article, project)
 
-        # Assemble HTML
-        html_content = self._assemble_html(article, project)
-
-        # Create WordPress post
         wp_url = wp['url'].rstrip('/')
         api_url = f"{wp_url}/wp-json/wp/v2/posts"
         auth = HTTPBasicAuth(wp['username'], wp['app_password'])
 
+        # Assemble HTML
+        images = self._chapter_images(article, project, wp_url, auth)
+        html_content = self._assemble_html(article, project, images)
+
+        # Create WordPress post
+
         post_data = {
             'title': article['article_title'],
             'content': html_content,
@@ -101,7 +173,7 @@ class WordPressPublisher:
         if wp.get('category_id'):
             post_data['categories'] = [wp['category_id']]
 
-        response = requests.post(api_url, json=post_data, auth=auth, timeout=30)
+        response = self._post(api_url, post_data, auth)
         response.raise_for_status()
         wp_post = response.json()
 
@@ -110,6 +182,7 @@ class WordPressPublisher:
 
         # Mark as published
         mark_article_published(self.db, str(article['_id']), wp_post_id, wp_post_url)
+        add_link_target(self.db, pid, dict(article, wp_post_url=wp_post_url))
 
         logger.info(f"Published article to WP: {wp_post_url}")
         return {
@@ -51,6 +51,7 @@ TRANSLATIONS = {
     'total_articles': {'en': 'Total Articles', 'fa': 'کل مقالات'},
     'published': {'en': 'Published', 'fa': 'منتشر شده'},
     'unpublished': {'en': 'Unpublished', 'fa': 'منتشر نشده'},
+    'quality_score': {'en': 'Quality', 'fa': 'کیفیت'},
     'queue': {'en': 'Queue', 'fa': 'صف انتظار'},
     'project_overview': {'en': 'Project Overview', 'fa': 'نمای کلی پروژه‌ها'},
     'keywords': {'en': 'Keywords', 'fa': 'کلمات کلیدی'},
@@ -110,6 +111,10 @@ TRANSLATIONS = {
     'word_count': {'en': 'Word Count', 'fa': 'تعداد کلمات'},
     'chapters': {'en': 'Chapters', 'fa': 'فصل‌ها'},
     'ads_words': {'en': 'Ads Words', 'fa': 'کلمات تبلیغ'},
+    'simulation': {'en': 'Simulation', 'fa': 'شبیه‌سازی'},
+    'simulation_mode': {'en': 'Simulation Mode', 'fa': 'حالت شبیه‌سازی'},
+    'simulation_help': {'en': 'Use the simulated provider (keys whose value is a fault profile) and the bundled WordPress stub instead of real services.', 'fa': 'به جای سرویس‌های واقعی از ارائه‌دهنده شبیه‌سازی شده (کلیدهایی که مقدارشان نام پروفایل خطاست) و وردپرس داخلی استفاده شود.'},
+    'wp_fault_profile': {'en': 'WordPress Fault Profile', 'fa': 'پروفایل خطای وردپرس'},
     'name_key_required': {'en': 'Name and Project Key are required.', 'fa': 'نام و کلید پروژه الزامی است.'},
 
     # --- API Keys ---
@@ -174,7 +179,62 @@ TRANSLATIONS = {
     'supplementary_generated': {'en': 'Generated {b} bein paragraphs, {i} info blocks, {bl} bullets.', 'fa': '{b} بین پاراگرافی، {i} اینفو و {bl} بولت تولید شد.'},
     'pipeline_completed': {'en': 'Full pipeline completed.', 'fa': 'خط تولید کامل انجام شد.'},
     'unknown_action': {'en': 'Unknown action.', 'fa': 'عملیات ناشناخته.'},
+    'api_tokens': {'en': 'API Tokens', 'fa': 'توکن‌های API'},
+    'api_tokens_hint': {'en': 'Bearer tokens for the /api/v1 JSON API', 'fa': 'توکن‌های Bearer برای API جیسون /api/v1'},
+    'create_api_token': {'en': 'Create Token', 'fa': 'ساخت توکن'},
+    'api_token_created': {'en': 'API token created.', 'fa': 'توکن API ساخته شد.'},
+    'api_token_copy_now': {'en': 'Copy this token now; it will not be shown again.', 'fa': 'این توکن را همین حالا کپی کنید؛ دوباره نمایش داده نمی‌شود.'},
+    'api_token_revoked': {'en': 'API token revoked.', 'fa': 'توکن API باطل شد.'},
+    'revoke_api_token_confirm': {'en': 'Revoke this token? Integrations using it will stop working.', 'fa': 'این توکن باطل شود؟ یکپارچه‌سازی‌هایی که از آن استفاده می‌کنند از کار می‌افتند.'},
+    'revoke': {'en': 'Revoke', 'fa': 'ابطال'},
+    'generation_started': {'en': 'Generation started in the background.', 'fa': 'تولید محتوا در پس‌زمینه شروع شد.'},
+    'generation_already_running': {'en': 'This generation is already running.', 'fa': 'این تولید محتوا در حال اجراست.'},
+    'generation_job': {'en': 'Generation job', 'fa': 'کار تولید محتوا'},
+    'job_queued': {'en': 'Queued', 'fa': 'در صف'},
+    'job_running': {'en': 'Running', 'fa': 'در حال اجرا'},
+    'job_done': {'en': 'Done', 'fa': 'انجام شد'},
+    'job_failed': {'en': 'Failed', 'fa': 'ناموفق'},
+    'reload_page': {'en': 'Reload to see the new content', 'fa': 'برای دیدن محتوای جدید صفحه را بارگذاری کنید'},
+    'revisions': {'en': 'Revisions', 'fa': 'نسخه‌ها'},
+    'revision': {'en': 'Revision', 'fa': 'نسخه'},
+    'current_revision': {'en': 'Current', 'fa': 'نسخه فعلی'},
+    'viewing_revision': {'en': 'Viewing revision {rev}', 'fa': 'در حال مشاهده نسخه {rev}'},
+    'restore': {'en': 'Restore', 'fa': 'بازگردانی'},
+    'regenerate': {'en': 'Regenerate', 'fa': 'تولید مجدد'},
+    'revision_not_found': {'en': 'Revision not found.', 'fa': 'نسخه یافت نشد.'},
+    'revision_restored': {'en': 'Revision {rev} restored.', 'fa': 'نسخه {rev} بازگردانی شد.'},
+    'publish_at': {'en': 'Publish at', 'fa': 'زمان انتشار'},
+    'publish_slot_auto': {'en': 'set from the publish interval', 'fa': 'تعیین‌شده از فاصله انتشار'},
+    'publish_scheduled': {'en': 'Article scheduled for {when} UTC.', 'fa': 'مقاله برای {when} (UTC) زمان‌بندی شد.'},
+    'publish_unscheduled': {'en': 'Publish time cleared.', 'fa': 'زمان انتشار حذف شد.'},
+    'invalid_publish_time': {'en': 'Invalid publish time.', 'fa': 'زمان انتشار نامعتبر است.'},
+    'deleting_project': {'en': 'Deleting', 'fa': 'در حال حذف'},
+    'export_project': {'en': 'Export', 'fa': 'خروجی گرفتن'},
+    'import_project': {'en': 'Import project', 'fa': 'درون‌ریزی پروژه'},
+    'clone_project': {'en': 'Clone', 'fa': 'کپی پروژه'},
+    'project_imported': {'en': 'Project imported. Its schedules are off until you enable them.', 'fa': 'پروژه درون‌ریزی شد. زمان‌بندی آن تا فعال‌سازی شما خاموش است.'},
+    'project_cloned': {'en': 'Project cloned. The copy\'s schedules are off until you enable them.', 'fa': 'پروژه کپی شد. زمان‌بندی نسخه کپی تا فعال‌سازی شما خاموش است.'},
+    'import_list': {'en': 'Import list', 'fa': 'درون‌ریزی فهرست'},
+    'import_file_hint': {'en': 'CSV (first column) or TXT (one per line)', 'fa': 'CSV (ستون اول) یا TXT (هر خط یک مورد)'},
+    'import_started': {'en': 'Import started.', 'fa': 'درون‌ریزی آغاز شد.'},
+    'import_no_file': {'en': 'Choose a file to import.', 'fa': 'یک فایل برای درون‌ریزی انتخاب کنید.'},
+    'import_title_keyword': {'en': 'Keyword for titles', 'fa': 'کلمه کلیدی عناوین'},
+    'import_progress': {'en': 'Import', 'fa': 'درون‌ریزی'},
     'generation_error': {'en': 'Generation error: {e}', 'fa': 'خطای تولید: {e}'},
+    'image_library': {'en': 'Image Library', 'fa': 'کتابخانه تصاویر'},
+    'upload_images': {'en': 'Upload images', 'fa': 'بارگذاری تصاویر'},
+    'upload_images_hint': {'en': 'Converted to WebP at standard sizes in the background', 'fa': 'در پس‌زمینه به WebP در اندازه‌های استاندارد تبدیل می‌شود'},
+    'add_image_links': {'en': 'Add image links', 'fa': 'افزودن لینک تصاویر'},
+    'image_tags_hint': {'en': 'Tags, comma separated (match article tags)', 'fa': 'برچسب‌ها، جدا شده با کاما (مطابق برچسب مقالات)'},
+    'image_alt': {'en': 'Alt text (optional)', 'fa': 'متن جایگزین (اختیاری)'},
+    'image_processing': {'en': 'Processing…', 'fa': 'در حال پردازش…'},
+    'images_need_files_and_tags': {'en': 'Choose images and enter at least one tag.', 'fa': 'تصاویر را انتخاب کنید و حداقل یک برچسب وارد کنید.'},
+    'images_queued': {'en': '{count} images queued for conversion.', 'fa': '{count} تصویر در صف تبدیل قرار گرفت.'},
+    'images_too_large': {'en': '{count} files were larger than {mb} MB and skipped.', 'fa': '{count} فایل بزرگ‌تر از {mb} مگابایت بود و رد شد.'},
+    'images_added': {'en': '{count} image links added.', 'fa': '{count} لینک تصویر اضافه شد.'},
+    'image_deleted': {'en': 'Image deleted.', 'fa': 'تصویر حذف شد.'},
+    'delete_image_confirm': {'en': 'Delete this image?', 'fa': 'این تصویر حذف شود؟'},
+    'no_images_yet': {'en': 'No images yet. Chapter images are picked from here by the article tag.', 'fa': 'هنوز تصویری نیست. تصاویر فصل‌ها بر اساس برچسب مقاله از اینجا انتخاب می‌شوند.'},
 
     # --- Publishing ---
     'publishing_queue': {'en': 'Publishing Queue', 'fa': 'صف انتشار'},
@@ -197,6 +257,24 @@ TRANSLATIONS = {
     'published_msg': {'en': 'Published: {title} -> {url}', 'fa': 'منتشر شد: {title} -> {url}'},
     'no_articles_to_publish': {'en': 'No unpublished articles available.', 'fa': 'مقاله‌ای برای انتشار موجود نیست.'},
     'publishing_error': {'en': 'Publishing error: {e}', 'fa': 'خطای انتشار: {e}'},
+
+    # --- Profiling ---
+    'profiling': {'en': 'Profiling', 'fa': 'پروفایلینگ'},
+    'profile_request_hint': {'en': 'To profile a single page, open it with', 'fa': 'برای پروفایل یک صفحه، آن را با این پارامتر باز کنید:'},
+    'profile_next_job_run': {'en': 'Profile Next Job Run', 'fa': 'پروفایل اجرای بعدی کار'},
+    'profile_mode': {'en': 'Mode', 'fa': 'حالت'},
+    'arm': {'en': 'Arm', 'fa': 'فعال‌سازی'},
+    'stored_profiles': {'en': 'Stored Profiles', 'fa': 'پروفایل‌های ذخیره شده'},
+    'target': {'en': 'Target', 'fa': 'هدف'},
+    'duration': {'en': 'Duration', 'fa': 'مدت'},
+    'command': {'en': 'Command', 'fa': 'دستور'},
+    'slow_commands': {'en': 'Slow MongoDB Commands', 'fa': 'دستورات کند MongoDB'},
+    'memory_snapshot': {'en': 'Memory Snapshot', 'fa': 'تصویر حافظه'},
+    'no_profiles_yet': {'en': 'No profiles recorded yet.', 'fa': 'هنوز پروفایلی ثبت نشده.'},
+    'no_slow_commands': {'en': 'No slow commands recorded in this process.', 'fa': 'دستور کندی در این پردازش ثبت نشده.'},
+    'profile_armed': {'en': 'The next run of {job} will be profiled.', 'fa': 'اجرای بعدی {job} پروفایل خواهد شد.'},
+    'profile_not_found': {'en': 'Profile not found.', 'fa': 'پروفایل یافت نشد.'},
+    'profile_deleted': {'en': 'Profile deleted.', 'fa': 'پروفایل حذف شد.'},
 }
 
 